@@ -0,0 +1,263 @@
+# Micro-benchmark tahap ekstraksi Lamp1 terhadap implementasi lama (referensi di file ini).
+# Hasil implementasi baru dicek sama persis dengan referensi sebelum diukur.
+#
+# Words (dan blok kolom) diambil dari halaman PDF, dari rekaman JSON, atau dibuat sintetis:
+#   python bench_extract.py rows --pdf pdf/20251217.pdf --page 1
+#   python bench_extract.py rows --pdf pdf/20251217.pdf --page 1 --save-words page2.json
+#   python bench_extract.py columns --words page2.json
+#   python bench_extract.py columns --synthetic 6000
+# Repo tidak menyimpan PDF / rekaman halaman IDX asli: tanpa --pdf / --words yang dipakai
+# adalah words sintetis (tata letak rata, bukan tabel Lamp1 sebenarnya), jadi angka speedup
+# untuk PDF produksi perlu diukur ulang dengan --pdf atau --words.
+# Ekstraksi semua halaman, serial vs process pool:
+#   python bench_extract.py pages --pdf pdf/20251217.pdf --workers 4
+# Deteksi kolom (vector / band raster vs render penuh halaman):
+#   python bench_extract.py detect --pdf pdf/20251217.pdf
+import argparse
+import contextlib
+import json
+import os
+import random
+import time
+
+import numpy as np
+
+import extract_bounding_box as ebb
+
+
+# ----- Implementasi lama (referensi) -----
+def cluster_rows_linear(words):
+    rows = []
+    for w in words:
+        x0, y0, x1, y1, text, *_ = w
+        placed = False
+        for row in rows:
+            # check if y overlaps (toleransi ±3px)
+            if abs(row["y"] - y0) < 3:
+                x_center = (x0 + x1) / 2
+                row["words"].append((x_center, text))
+                placed = True
+                break
+        if not placed:
+            rows.append({"y": y0, "words": [(x0, text)]})
+    rows.sort(key=lambda r: r["y"])
+    for r in rows:
+        r["words"].sort(key=lambda x: x[0])
+    return rows
+
+
+def assign_words_to_columns_linear(rows, column_blocks):
+    assigned = []
+    for row in rows:
+        cols = [""] * len(column_blocks)
+        for x, text in row["words"]:
+            for idx, (x1, x2) in enumerate(column_blocks):
+                MARGIN = 1
+                if x1 - MARGIN <= x <= x2 + MARGIN:
+                    if cols[idx] == "":
+                        cols[idx] = text
+                    else:
+                        cols[idx] += " " + text
+                    break
+        # Skip header rows
+        combined = " ".join(cols).lower()
+        if cols[0].strip() == "No" or "kepemilikan per" in combined or "kepemilikan efek diatas" in combined or "berdasarkan sid" in combined or "keterangan" in combined or "font" in combined or "hitam tidak ada perubahan" in combined or "biru ada perubahan" in combined:
+            continue
+        assigned.append(cols)
+    return assigned
+
+
+def detect_columns_full_pixmap(page):
+    pix = page.get_pixmap()
+    img = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width, pix.n)
+    R, G, B = img[..., 0], img[..., 1], img[..., 2]
+    R0, G0, B0 = 136, 0, 0
+    tol = 20
+    mask = (
+        (R >= R0 - tol) & (R <= R0 + tol) &
+        (G >= G0 - tol) & (G <= G0 + tol) &
+        (B >= B0 - tol) & (B <= B0 + tol)
+    )
+    h, w = mask.shape
+    red_rows = []
+    for y in range(h - 1, -1, -1):
+        if mask[y].any():
+            red_rows.append(y)
+            if len(red_rows) >= 5:
+                break
+    if len(red_rows) < 5:
+        raise ValueError(f"Hanya ditemukan {len(red_rows)} baris pixel merah, minimal 5 baris diperlukan.")
+    all_xs = set()
+    for y in red_rows:
+        xs = np.where(mask[y])[0]
+        all_xs.update(xs.tolist())
+    xs = sorted(list(all_xs))
+    blocks = []
+    start = xs[0]
+    for i in range(1, len(xs)):
+        if xs[i] != xs[i - 1] + 1:
+            width = xs[i - 1] - start + 1
+            if width >= 2:
+                blocks.append([start, xs[i - 1]])
+            start = xs[i]
+    width = xs[-1] - start + 1
+    if width >= 1:
+        blocks.append([start, xs[-1]])
+    adjust_indices = [11, 12, 13, 15, 16, 17]
+    for idx in adjust_indices:
+        if idx < len(blocks):
+            blocks[idx][1] += 1
+    return blocks
+
+
+# ----- Sumber words -----
+def synthetic_words(count, seed=1, per_row=18):
+    """Words mirip halaman Lamp1 padat: baris berjarak ~9px, y sedikit bergoyang, urutan acak sebagian"""
+    rnd = random.Random(seed)
+    words = []
+    for i in range(count):
+        row, col = divmod(i, per_row)
+        y = 60 + row * 9 + rnd.uniform(-1.2, 1.2)
+        x = 20 + col * 40 + rnd.uniform(0, 20)
+        words.append((x, y, x + rnd.uniform(5, 30), y + 5, f"w{i}", 0, 0, 0))
+    # get_text("words") tidak selalu urut atas-bawah (blok teks / kolom)
+    for _ in range(count // 10):
+        a, b = rnd.randrange(count), rnd.randrange(count)
+        words[a], words[b] = words[b], words[a]
+    return words
+
+
+def synthetic_blocks(columns=18):
+    """Blok kolom untuk synthetic_words (lebar 38px, jarak antar kolom 2px)"""
+    return [[20 + c * 40 - 1, 20 + c * 40 + 37] for c in range(columns)]
+
+
+def load_page(args):
+    """Return (words, col_blocks) dari --words, --pdf, atau sintetis"""
+    if args.words:
+        with open(args.words, encoding="utf-8") as f:
+            data = json.load(f)
+        if isinstance(data, list):  # rekaman lama: hanya words
+            data = {"words": data, "col_blocks": synthetic_blocks()}
+        return [tuple(w) for w in data["words"]], data["col_blocks"]
+    if args.pdf:
+        pdf = ebb.open_pdf(args.pdf)
+        words = [tuple(w) for w in pdf[args.page].get_text("words")]
+        pdf.close()
+        col_blocks = ebb.detect_columns_from_red_pixel(args.pdf, ebb.COLUMN_PAGE_INDEX)
+        if args.save_words:
+            with open(args.save_words, "w", encoding="utf-8") as f:
+                json.dump({"words": words, "col_blocks": col_blocks}, f)
+            print(f"💾 Words halaman {args.page + 1} disimpan ke {args.save_words}")
+        return words, col_blocks
+    print(f"⚠ Memakai {args.synthetic} words sintetis (bukan halaman PDF asli); pakai --pdf / --words untuk data rekaman")
+    return synthetic_words(args.synthetic), synthetic_blocks()
+
+
+def timeit(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def report(name, old_time, new_time):
+    print(f"{name:<10} lama {old_time * 1000:9.2f} ms   baru {new_time * 1000:9.2f} ms   "
+          f"speedup {old_time / new_time if new_time else float('inf'):6.1f}x")
+
+
+# ----- Benchmark -----
+def bench_rows(args):
+    words, col_blocks = load_page(args)
+    repeat = args.repeat
+    old_time, expected = timeit(lambda: cluster_rows_linear(words), repeat)
+    new_time, actual = timeit(lambda: ebb.cluster_rows(words), repeat)
+    assert actual == expected, "cluster_rows berbeda dari implementasi lama"
+    print(f"{len(words)} words, {len(expected)} rows")
+    report("rows", old_time, new_time)
+
+
+def bench_columns(args):
+    words, col_blocks = load_page(args)
+    repeat = args.repeat
+    rows = ebb.cluster_rows(words)
+    old_time, expected = timeit(lambda: assign_words_to_columns_linear(rows, col_blocks), repeat)
+    new_time, actual = timeit(lambda: ebb.assign_words_to_columns(rows, col_blocks), repeat)
+    assert actual == expected, "assign_words_to_columns berbeda dari implementasi lama"
+    print(f"{len(words)} words, {len(rows)} rows, {len(col_blocks)} kolom")
+    report("columns", old_time, new_time)
+
+
+def bench_pages(args):
+    if not args.pdf:
+        raise SystemExit("bench pages butuh --pdf")
+    with open(args.pdf, "rb") as f:
+        source = f.read()
+    col_blocks = ebb.detect_columns_from_red_pixel(source, ebb.COLUMN_PAGE_INDEX)
+
+    def run(workers):
+        doc = ebb.LampDocument(source)
+        try:
+            return ebb.extract_table(doc, col_blocks, workers=workers)
+        finally:
+            doc.close()
+
+    # print "Processing page ..." tidak ikut diukur di terminal
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        serial_time, expected = timeit(lambda: run(1), args.repeat)
+        parallel_time, actual = timeit(lambda: run(args.workers), args.repeat)
+        # Retry kolom kode: rows sudah di-cache, hanya assign yang diulang
+        doc = ebb.LampDocument(source)
+        ebb.extract_table(doc, col_blocks, workers=1)
+        retry_time, _ = timeit(lambda: ebb.extract_table(doc, col_blocks, workers=1), args.repeat)
+        page_count = len(doc)
+        doc.close()
+    assert actual == expected, "hasil process pool berbeda dari serial"
+    print(f"{page_count} halaman, {len(expected)} baris, {args.workers} worker, {os.cpu_count()} CPU")
+    if page_count - 1 < ebb.EXTRACT_PARALLEL_MIN_PAGES:
+        print(f"⚠ Di bawah EXTRACT_PARALLEL_MIN_PAGES={ebb.EXTRACT_PARALLEL_MIN_PAGES}, keduanya serial")
+    print(f"{'pages':<10} serial {serial_time * 1000:9.2f} ms   pool {parallel_time * 1000:9.2f} ms   "
+          f"speedup {serial_time / parallel_time:6.1f}x")
+    print(f"{'retry':<10} parse ulang {serial_time * 1000:9.2f} ms   dari cache {retry_time * 1000:9.2f} ms")
+
+
+def bench_detect(args):
+    if not args.pdf:
+        raise SystemExit("bench detect butuh --pdf")
+    pdf = ebb.open_pdf(args.pdf)
+    page = pdf[args.page]
+    old_time, expected = timeit(lambda: detect_columns_full_pixmap(page), args.repeat)
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        vector_time, vector = timeit(lambda: ebb.detect_columns_from_drawings(page), args.repeat)
+        raster_time, raster = timeit(lambda: ebb.detect_columns_from_raster(page), args.repeat)
+        auto_time, actual = timeit(lambda: ebb.detect_columns_from_page(page), args.repeat)
+    pdf.close()
+    print(f"{len(expected)} kolom, vector {'dipakai' if vector is not None else 'tidak bisa dipastikan (fallback raster)'}")
+    assert actual == expected, f"deteksi kolom berbeda dari render penuh:\n{actual}\n{expected}"
+    # detect_columns_from_drawings / _raster mengembalikan blok sebelum adjust +1
+    report("detect", old_time, auto_time)
+    print(f"{'':<10} vector {vector_time * 1000:7.2f} ms   band raster {raster_time * 1000:7.2f} ms")
+
+
+BENCHES = {"rows": bench_rows, "columns": bench_columns, "pages": bench_pages, "detect": bench_detect}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark ekstraksi Lamp1")
+    parser.add_argument("bench", choices=list(BENCHES))
+    parser.add_argument("--pdf", help="PDF Lamp1 sumber words")
+    parser.add_argument("--page", type=int, default=1, help="Index halaman (0-based, default 1 = halaman 2)")
+    parser.add_argument("--words", help="Rekaman words JSON (dari --save-words)")
+    parser.add_argument("--save-words", help="Simpan words halaman --pdf ke JSON")
+    parser.add_argument("--synthetic", type=int, default=6000, help="Jumlah words sintetis jika tanpa --pdf/--words")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=ebb.EXTRACT_WORKERS, help="Worker untuk bench pages")
+    args = parser.parse_args()
+    BENCHES[args.bench](args)
+
+
+if __name__ == "__main__":
+    main()
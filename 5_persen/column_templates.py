@@ -0,0 +1,68 @@
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+# Template layout kolom Lamp1: col_blocks yang sudah terbukti benar (termasuk adjust kolom kode
+# dari retry), disimpan per sidik layout halaman (ukuran halaman + posisi word header).
+# PDF berikutnya dengan sidik yang sama langsung memakai col_blocks ini tanpa deteksi kolom.
+#
+#   templates = get_templates()
+#   col_blocks = templates.get(fingerprint)      # None jika belum ada
+#   templates.put(fingerprint, col_blocks)
+
+DEFAULT_TEMPLATE_PATH = Path(os.environ.get("COLUMN_TEMPLATE_PATH", Path(__file__).parent / "column_templates.json"))
+COLUMN_TEMPLATES_ENABLED = os.environ.get("COLUMN_TEMPLATES", "1") != "0"
+
+
+class ColumnTemplates:
+    def __init__(self, path=DEFAULT_TEMPLATE_PATH):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if not self.path.exists():
+            return {}
+        try:
+            return json.loads(self.path.read_text())
+        except (ValueError, OSError):
+            return {}
+
+    def get(self, fingerprint):
+        """Salinan col_blocks untuk sidik layout ini, atau None"""
+        with self._lock:
+            template = self._load().get(fingerprint)
+        if not template:
+            return None
+        return [list(block) for block in template["col_blocks"]]
+
+    def put(self, fingerprint, col_blocks, page_size=None):
+        """Simpan col_blocks untuk sidik layout (ditulis hanya jika baru / berubah)"""
+        col_blocks = [[int(x1), int(x2)] for x1, x2 in col_blocks]
+        with self._lock:
+            state = self._load()
+            if state.get(fingerprint, {}).get("col_blocks") == col_blocks:
+                return
+            state[fingerprint] = {"col_blocks": col_blocks, "page_size": page_size, "updated_at": time.time()}
+            tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+            try:
+                tmp.write_text(json.dumps(state, indent=2))
+                os.replace(tmp, self.path)
+            except OSError as e:
+                print(f"⚠ Gagal menyimpan template kolom: {e}")
+                return
+        print(f"📐 Template kolom disimpan ({fingerprint[:12]})")
+
+
+_templates = None
+
+
+def get_templates():
+    """Store template bersama untuk proses ini, atau None jika COLUMN_TEMPLATES=0"""
+    global _templates
+    if not COLUMN_TEMPLATES_ENABLED:
+        return None
+    if _templates is None:
+        _templates = ColumnTemplates()
+    return _templates
@@ -1,12 +1,22 @@
 import os
+import sys
 import requests
 from dotenv import load_dotenv
 
+# retry_helper ada di root repo (satu level di atas folder ini)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from retry_helper import RetryPolicy, host_of, retry_call
+import metrics
+
 load_dotenv()  # load .env
 
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_ANON_KEY")
 
+UPSERT_RETRY_POLICY = RetryPolicy(max_attempts=4, base_delay=1, max_delay=20)
+# Status sementara dari Supabase yang layak di-retry
+TRANSIENT_STATUSES = {408, 429, 500, 502, 503, 504}
+
 def upsertKepemilikan(data):
     url = f"{SUPABASE_URL}/rest/v1/report_kepemilikan_lima_persen"
 
@@ -17,7 +27,16 @@ def upsertKepemilikan(data):
         "Prefer": "return=representation,resolution=merge-duplicates"
     }
 
-    response = requests.post(url, headers=headers, json=data)
+    def post():
+        with metrics.timed("supabase_write", table="report_kepemilikan_lima_persen", op="upsert",
+                           rows=len(data) if isinstance(data, list) else 1):
+            response = requests.post(url, headers=headers, json=data, timeout=60)
+            # Hanya status sementara yang di-retry; error lain dikembalikan apa adanya ke pemanggil
+            if response.status_code in TRANSIENT_STATUSES:
+                response.raise_for_status()
+        return response
+
+    response = retry_call(post, host=host_of(url), policy=UPSERT_RETRY_POLICY, label="Upsert kepemilikan")
 
     try:
         json_response = response.json()
@@ -1,15 +1,36 @@
 import fitz
 import numpy as np
 import csv
+import hashlib
+import math
 import os
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# metrics ada di root repo (satu level di atas folder ini)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import metrics
 from conn import upsertKepemilikan
+from column_templates import get_templates
 from dotenv import load_dotenv
 
 load_dotenv()
 
-PDF_PATH = sys.argv[1] if len(sys.argv) > 1 else "pdf/20251217.pdf"
+# Bisa dijalankan sebagai script:
+#   python extract_bounding_box.py pdf/20251217.pdf
+#   python extract_bounding_box.py - 20251217_lamp1.pdf < file.pdf   (PDF dari stdin)
+# atau di-import (scrape.py lewat lamp1_extract.py):
+#   result = extract_pdf(pdf_bytes_or_path, "20251217_lamp1.pdf")
+#   result.rows -> list KepemilikanRow, result.stats -> ExtractionStats
 COLUMN_PAGE_INDEX = 1   # halaman khusus untuk baca kolom dari pixel merah
+# Folder output CSV (relatif ke folder script ini, tidak tergantung cwd pemanggil)
+CSV_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "csv")
+REQUIRED_INDICES = [0, 1, 2, 4, 12, 13, 15, 16]
+# Ekstraksi halaman paralel: jumlah proses worker (1 = serial). Tiap worker membuka PDF sendiri
+EXTRACT_WORKERS = int(os.environ.get("EXTRACT_WORKERS", str(os.cpu_count() or 1)))
+# PDF dengan halaman lebih sedikit dari ini tetap serial (overhead pool tidak sebanding)
+EXTRACT_PARALLEL_MIN_PAGES = int(os.environ.get("EXTRACT_PARALLEL_MIN_PAGES", "40"))
 
 # Headers for CSV
 headers = [
@@ -26,15 +47,27 @@ MONTH_MAP = {
     'SEP': '09', 'OCT': '10', 'NOV': '11', 'DEC': '12'
 }
 
+def open_pdf(source):
+    """Buka PDF dari path file atau bytes di memory (fitz.open(stream=...))"""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return fitz.open(stream=bytes(source), filetype="pdf")
+    return fitz.open(source)
+
 # Fungsi untuk extract tanggal dari halaman pertama PDF
 def extract_date_from_pdf(pdf_path):
-    """Extract tanggal dengan format DD-MMM-YYYY dari halaman pertama PDF"""
+    """Extract tanggal dengan format DD-MMM-YYYY dari halaman pertama PDF (path atau bytes)"""
     try:
-        pdf = fitz.open(pdf_path)
-        first_page = pdf[0]
-        text = first_page.get_text()
+        pdf = open_pdf(pdf_path)
+        text = pdf[0].get_text()
         pdf.close()
-        
+    except Exception as e:
+        print(f"❌ Error saat extract tanggal dari PDF: {str(e)}")
+        return None
+    return extract_date_from_text(text)
+
+def extract_date_from_text(text):
+    """Extract tanggal DD-MMM-YYYY dari teks halaman pertama (sudah dibaca LampDocument)"""
+    try:
         print("\n🔍 Mencari tanggal dari halaman pertama PDF...")
         
         # Pattern untuk DD-MMM-YYYY (misal: 16-DEC-2025)
@@ -72,19 +105,19 @@ def upsertToSupabase(all_rows, filtered_rows, fileName, tanggal=None):
     
     if not filtered_rows:
         print("ℹ Tidak ada data untuk di-upsert.")
-        return
+        return False
 
     print(f"ℹ Total baris untuk upsert: {len(filtered_rows)}")
     
     # Tanggal sudah diekstrak dari PDF, jika tidak ada maka fail
     if not tanggal:
         print("❌ Tanggal tidak ditemukan dari PDF. Upsert dibatalkan.")
-        return
+        return False
 
     # Simpan semua rows ke CSV file
     csvFileName = fileName.replace('.pdf', '.csv')
-    csvFilePath = os.path.join("csv", csvFileName)
-    os.makedirs("csv", exist_ok=True)
+    csvFilePath = os.path.join(CSV_DIR, csvFileName)
+    os.makedirs(CSV_DIR, exist_ok=True)
     
     try:
         with open(csvFilePath, "w", newline="", encoding="utf-8") as f:
@@ -129,8 +162,10 @@ def upsertToSupabase(all_rows, filtered_rows, fileName, tanggal=None):
                 print("No missing numbers")
         else:
             print('No numbers found')
+        return True
     except Exception as err:
         print("Error upsert ke Supabase:", str(err))
+        return False
 
 # Fungsi untuk menghitung total unique kode (4 huruf kapital) dari list of list (all_rows)
 def count_unique_kodes_from_list(rows):
@@ -216,81 +251,197 @@ def check_and_adjust_kode_column(filtered_rows, col_blocks):
             return col_blocks, True
     
     return col_blocks, False
+# Header tabel Lamp1 berwarna #880000; batas kolom diambil dari 5 baris pixel merah paling bawah
+RED_RGB = (136, 0, 0)
+RED_TOLERANCE = 20
+RED_ROWS = 5
+# "vector": batas kolom dari rect merah di vector drawing halaman (tanpa render), fallback ke
+# raster jika drawing tidak bisa dipastikan sama dengan pixel. "raster": selalu dari pixel
+COLUMN_DETECT_MODE = os.environ.get("COLUMN_DETECT_MODE", "vector")
+# Render 1 pixel = 1 point PDF (72 dpi) secara eksplisit, tidak tergantung DPI default get_pixmap()
+PIXEL_MATRIX = fitz.Matrix(1, 1)
+# Render kasar seluruh halaman hanya untuk mencari posisi y header
+LOCATE_MATRIX = fitz.Matrix(0.25, 0.25)
+# Anti-aliasing MuPDF (17x15 subsample per pixel): pixel di tepi rect masih dalam toleransi
+# warna hanya jika rect menutupnya sampai kurang dari 1 subsample dari tepi pixel
+AA_EDGE_X = (2 / 17, 16 / 17)
+AA_EDGE_Y = (2 / 15, 14 / 15)
+
+
 def detect_columns_from_red_pixel(pdf_path, page_index):
-    pdf = fitz.open(pdf_path)
-    page = pdf[page_index]
-    pix = page.get_pixmap()
+    pdf = open_pdf(pdf_path)
+    try:
+        return detect_columns_from_page(pdf[page_index])
+    finally:
+        pdf.close()
+
+def red_mask(pix):
+    """Mask pixel berwarna #880000 (+- toleransi) dari pixmap"""
     img = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width, pix.n)
     R, G, B = img[..., 0], img[..., 1], img[..., 2]
-    # target warna merah #880000
-    R0, G0, B0 = 136, 0, 0
-    tol = 20
-    mask = (
+    R0, G0, B0 = RED_RGB
+    tol = RED_TOLERANCE
+    return (
         (R >= R0 - tol) & (R <= R0 + tol) &
         (G >= G0 - tol) & (G <= G0 + tol) &
         (B >= B0 - tol) & (B <= B0 + tol)
     )
-    h, w = mask.shape
-    # cari 3 baris paling bawah yang mengandung pixel merah
-    red_rows = []
-    for y in range(h - 1, -1, -1):
-        if mask[y].any():
-            red_rows.append(y)
-            if len(red_rows) >= 5:
-                break
-    
-    if len(red_rows) < 5:
-        raise ValueError(f"Hanya ditemukan {len(red_rows)} baris pixel merah, minimal 5 baris diperlukan.")
-    
-    # ambil semua x dari 3 baris paling bawah
-    all_xs = set()
-    for y in red_rows:
-        xs = np.where(mask[y])[0]
-        all_xs.update(xs.tolist())
-    
-    xs = sorted(list(all_xs))
-    
-    # buat blok kolom dengan minimal width 2
-    blocks = []
-    start = xs[0]
-    for i in range(1, len(xs)):
-        if xs[i] != xs[i - 1] + 1:
-            width = xs[i - 1] - start + 1
-            if width >= 2:  # hanya simpan blok dengan minimal width 2
-                blocks.append([start, xs[i - 1]])
-            start = xs[i]
-    # tambahkan blok terakhir
-    width = xs[-1] - start + 1
-    if width >= 1:
-        blocks.append([start, xs[-1]])
-    
+
+def blocks_from_xs(xs):
+    """
+    Blok kolom dari x pixel merah (urut, unik): deretan x yang bersambung jadi satu blok,
+    blok dengan width < 2 dibuang kecuali blok terakhir
+    """
+    xs = np.asarray(xs)
+    breaks = np.nonzero(np.diff(xs) != 1)[0]
+    starts = np.concatenate(([xs[0]], xs[breaks + 1]))
+    ends = np.concatenate((xs[breaks], [xs[-1]]))
+    keep = ends - starts + 1 >= 2
+    keep[-1] = True
+    return [[int(start), int(end)] for start, end in zip(starts[keep], ends[keep])]
+
+def _is_red(color):
+    if color is None or len(color) != 3:
+        return False
+    return all(abs(round(c * 255) - target) <= RED_TOLERANCE for c, target in zip(color, RED_RGB))
+
+def detect_columns_from_drawings(page):
+    """
+    Blok kolom dari rect merah di vector drawing (tanpa render). Return None jika hasilnya
+    tidak bisa dipastikan sama dengan pixel: drawing merah bukan rect biasa, ada drawing lain
+    yang digambar di atas header, halaman diputar, atau jumlah blok tidak sama dengan kolom.
+    """
+    if page.rotation:
+        return None
+    red_rects = []
+    painted_over = []  # drawing lain yang digambar setelah rect merah pertama
+    # get_cdrawings: versi C get_drawings (format item sama, lebih cepat)
+    get_drawings = getattr(page, "get_cdrawings", page.get_drawings)
+    for drawing in get_drawings():
+        if drawing.get("type") == "f" and _is_red(drawing.get("fill")) and drawing.get("fill_opacity", 1) == 1:
+            for item in drawing["items"]:
+                if item[0] != "re":
+                    return None
+                red_rects.append(fitz.Rect(item[1]))
+        elif red_rects:
+            # rect garis (stroke) bisa setinggi 0, tambahkan setengah lebar garis
+            half = (drawing.get("width") or 1) / 2
+            painted_over.append(fitz.Rect(drawing["rect"]) + (-half, -half, half, half))
+    if not red_rects:
+        return None
+
+    width, height = page.rect.width, page.rect.height
+    spans = []  # (top, bottom, first, last) pixel yang tertutup penuh tiap rect
+    for rect in red_rects:
+        top = max(math.floor(rect.y0 - AA_EDGE_Y[0]) + 1, 0)
+        bottom = min(math.ceil(rect.y1 - AA_EDGE_Y[1]) - 1, math.ceil(height) - 1)
+        first = max(math.floor(rect.x0 - AA_EDGE_X[0]) + 1, 0)
+        last = min(math.floor(rect.x1 - AA_EDGE_X[1]), math.ceil(width) - 1)
+        if top <= bottom and first <= last:
+            spans.append((top, bottom, first, last))
+    if not spans:
+        return None
+    red_rows = set()
+    for top, bottom, _, _ in spans:
+        red_rows.update(range(max(top, bottom - RED_ROWS + 1), bottom + 1))
+    red_rows = sorted(red_rows)[-RED_ROWS:]
+    if len(red_rows) < RED_ROWS:
+        return None
+    band = fitz.Rect(0, red_rows[0], width, red_rows[-1] + 1)
+    if any(rect.intersects(band) for rect in painted_over):
+        return None
+
+    xs = np.unique(np.concatenate([
+        np.arange(first, last + 1) for top, bottom, first, last in spans
+        if any(top <= y <= bottom for y in red_rows)
+    ]))
+    blocks = blocks_from_xs(xs)
+    if len(blocks) != len(headers):
+        return None
+    return blocks
+
+def _red_pixels(display_list, clip=None):
+    """(jumlah baris merah, x pixel merah di 5 baris merah paling bawah) dari render 1:1"""
+    pix = display_list.get_pixmap(matrix=PIXEL_MATRIX, clip=clip)
+    mask = red_mask(pix)
+    red_rows = np.nonzero(mask.any(axis=1))[0][-RED_ROWS:]
+    if len(red_rows) < RED_ROWS:
+        return len(red_rows), None
+    return len(red_rows), np.nonzero(mask[red_rows].any(axis=0))[0]
+
+def detect_columns_from_raster(page):
+    """
+    Blok kolom dari pixel merah. Posisi header dicari dari render kasar seluruh halaman, lalu
+    hanya band header (selebar halaman, jadi x pixel sama dengan render penuh) yang dirender
+    1:1. Jika band tidak ketemu, render penuh halaman seperti sebelumnya.
+    """
+    # Isi halaman di-interpretasi sekali, dipakai untuk kedua render
+    display_list = page.get_displaylist()
+    xs = None
+    locate = red_mask(display_list.get_pixmap(matrix=LOCATE_MATRIX))
+    rows = np.nonzero(locate.any(axis=1))[0]
+    if len(rows):
+        scale = LOCATE_MATRIX.d
+        bottom = (rows[-1] + 1) / scale
+        area = page.rect
+        clip = fitz.Rect(area.x0, max(area.y0, math.floor(bottom - 1 / scale - RED_ROWS - 4)),
+                         area.x1, min(area.y1, math.ceil(bottom + 1 / scale + 2)))
+        _, xs = _red_pixels(display_list, clip)
+    if xs is None:
+        found, xs = _red_pixels(display_list)
+        if xs is None:
+            raise ValueError(f"Hanya ditemukan {found} baris pixel merah, minimal 5 baris diperlukan.")
+    return blocks_from_xs(xs)
+
+def detect_columns_from_page(page):
+    blocks = None
+    if COLUMN_DETECT_MODE == "vector":
+        blocks = detect_columns_from_drawings(page)
+    source = "VECTOR"
+    if blocks is None:
+        blocks = detect_columns_from_raster(page)
+        source = "PIXEL"
+
     # Adjust end boundaries for specific columns (indices 12,13,15,16,17)
     adjust_indices = [11, 12, 13, 15, 16, 17]
     for idx in adjust_indices:
         if idx < len(blocks):
             blocks[idx][1] += 1
     
-    print("\n=== COLUMN DETECTED FROM PIXEL (PAGE 2) ===")
+    print(f"\n=== COLUMN DETECTED FROM {source} (PAGE 2) ===")
     for i, (x1, x2) in enumerate(blocks, 1):
         print(f"Kolom {i}: x={x1} → {x2}, width={x2-x1+1}")
     return blocks
 # =======================================================
 # 2. EXTRACT WORDS PER HALAMAN
 # =======================================================
-def extract_words_by_rows(page):
-    words = page.get_text("words")  # x0, y0, x1, y1, text
+ROW_TOLERANCE = 3  # word masuk ke row yang y-nya berbeda < 3px
+
+
+def cluster_rows(words):
+    """
+    Kelompokkan words (x0, y0, x1, y1, text, ...) menjadi rows. Word masuk ke row pertama
+    (urutan dibuat) dengan abs(row["y"] - y0) < 3; jika tidak ada, jadi row baru dengan
+    y = y0 word itu. Row dicari lewat index bucket y selebar 3px: dua row selalu berjarak
+    >= 3px, jadi satu bucket berisi paling banyak satu row dan cukup cek bucket sekitarnya
+    (O(n) + sort, bukan O(words x rows)).
+    """
     rows = []
+    buckets = {}  # floor(y / 3) -> list index row (urut dibuat)
     for w in words:
         x0, y0, x1, y1, text, *_ = w
-        placed = False
-        for row in rows:
-            # check if y overlaps (toleransi ±3px)
-            if abs(row["y"] - y0) < 3:
-                x_center = (x0 + x1) / 2
-                row["words"].append((x_center, text))
-                placed = True
-                break
-        if not placed:
+        key = math.floor(y0 / ROW_TOLERANCE)
+        match = None
+        # +-2 bucket sebagai pengaman pembulatan float di batas bucket
+        for k in range(key - 2, key + 3):
+            for idx in buckets.get(k, ()):
+                if abs(rows[idx]["y"] - y0) < ROW_TOLERANCE and (match is None or idx < match):
+                    match = idx
+        if match is not None:
+            x_center = (x0 + x1) / 2
+            rows[match]["words"].append((x_center, text))
+        else:
+            buckets.setdefault(key, []).append(len(rows))
             rows.append({"y": y0, "words": [(x0, text)]})
     # sort rows berdasarkan Y (atas → bawah)
     rows.sort(key=lambda r: r["y"])
@@ -299,22 +450,131 @@ def extract_words_by_rows(page):
         r["words"].sort(key=lambda x: x[0])
     return rows
 
+
+def extract_words_by_rows(page):
+    return cluster_rows(page.get_text("words"))  # x0, y0, x1, y1, text
+
+
+# PDF milik proses worker pool (dibuka sekali per worker oleh _open_worker_pdf)
+_worker_pdf = None
+
+
+def _open_worker_pdf(source):
+    global _worker_pdf
+    _worker_pdf = open_pdf(source)
+
+
+def _worker_rows(start, stop):
+    """Rows halaman index start sampai stop - 1, dijalankan di worker pool"""
+    page_rows = []
+    for page_index in range(start, stop):
+        print(f"Processing page {page_index + 1} ...")
+        page_rows.append(extract_words_by_rows(_worker_pdf[page_index]))
+    return page_rows
+
+
+class LampDocument:
+    """
+    PDF Lamp1 yang dibuka sekali untuk satu ekstraksi. Teks dan rows (words yang sudah
+    dikelompokkan per baris) tiap halaman di-cache, jadi retry dengan blok kolom lain hanya
+    mengulang assign_words_to_columns, dan tanggal dibaca dari teks halaman pertama yang sama.
+    """
+
+    def __init__(self, source):
+        self.source = source
+        self.pdf = open_pdf(source)
+        self._rows = {}  # page_index -> rows
+        self._text = {}  # page_index -> page.get_text()
+
+    def __len__(self):
+        return len(self.pdf)
+
+    def __getitem__(self, page_index):
+        return self.pdf[page_index]
+
+    def text(self, page_index):
+        if page_index not in self._text:
+            self._text[page_index] = self.pdf[page_index].get_text()
+        return self._text[page_index]
+
+    def rows(self, page_index):
+        if page_index not in self._rows:
+            print(f"Processing page {page_index + 1} ...")
+            self._rows[page_index] = extract_words_by_rows(self.pdf[page_index])
+        return self._rows[page_index]
+
+    def load_rows(self, start, stop, workers=None):
+        """
+        Isi cache rows halaman start sampai stop - 1. Jika PDF cukup besar, rentang halaman
+        dibagi ke process pool (tiap worker membuka PDF sendiri); hasil disimpan per halaman.
+        """
+        workers = EXTRACT_WORKERS if workers is None else workers
+        missing = [i for i in range(start, stop) if i not in self._rows]
+        if workers <= 1 or len(missing) < EXTRACT_PARALLEL_MIN_PAGES:
+            for page_index in missing:
+                self.rows(page_index)
+            return
+        start, stop = missing[0], missing[-1] + 1
+        # Beberapa rentang per worker supaya halaman padat tidak menumpuk di satu worker
+        chunks = min(stop - start, workers * 4)
+        bounds = [start + (stop - start) * i // chunks for i in range(chunks + 1)]
+        with metrics.timed("extract_pages", workers=workers, pages=stop - start):
+            with ProcessPoolExecutor(max_workers=workers, initializer=_open_worker_pdf,
+                                     initargs=(self.source,)) as pool:
+                for range_start, page_rows in zip(bounds, pool.map(_worker_rows, bounds[:-1], bounds[1:])):
+                    for offset, rows in enumerate(page_rows):
+                        self._rows.setdefault(range_start + offset, rows)
+
+    def close(self):
+        self.pdf.close()
+        self._rows.clear()
+        self._text.clear()
+
 # =======================================================
 # 3. MASUKKAN KE KOLOM SESUAI BLOK X
 # =======================================================
+MARGIN = 1  # word masuk kolom jika x1 - 1 <= x <= x2 + 1
+
+
+def column_indices(xs, column_blocks):
+    """
+    Index kolom untuk setiap x (array NumPy), -1 jika tidak masuk kolom manapun. Sama seperti
+    scan linear: blok pertama dengan x1 - MARGIN <= x <= x2 + MARGIN. Jika batas bawah dan atas
+    blok sama-sama urut naik, blok pertama yang batas atasnya >= x dicari dengan searchsorted;
+    jika tidak urut (blok tumpang tindih aneh), pakai scan linear.
+    """
+    xs = np.asarray(xs, dtype=float)
+    result = np.full(len(xs), -1, dtype=np.intp)
+    if not len(column_blocks) or not len(xs):
+        return result
+    lows = np.array([x1 - MARGIN for x1, _ in column_blocks], dtype=float)
+    highs = np.array([x2 + MARGIN for _, x2 in column_blocks], dtype=float)
+    if np.all(np.diff(lows) >= 0) and np.all(np.diff(highs) >= 0):
+        idx = np.searchsorted(highs, xs, side="left")
+        found = idx < len(highs)
+        found[found] = lows[idx[found]] <= xs[found]
+        result[found] = idx[found]
+        return result
+    for col in range(len(column_blocks) - 1, -1, -1):
+        # dari belakang, supaya blok pertama yang cocok yang menang
+        result[(lows[col] <= xs) & (xs <= highs[col])] = col
+    return result
+
+
 def assign_words_to_columns(rows, column_blocks):
+    # semua x satu halaman di-assign sekaligus, lalu dipecah lagi per row
+    xs = [x for row in rows for x, _ in row["words"]]
+    indices = column_indices(xs, column_blocks).tolist()
     assigned = []
+    pos = 0
     for row in rows:
-        cols = [""] * len(column_blocks)
-        for x, text in row["words"]:
-            for idx, (x1, x2) in enumerate(column_blocks):
-                MARGIN = 1
-                if x1 - MARGIN <= x <= x2 + MARGIN:
-                    if cols[idx] == "":
-                        cols[idx] = text
-                    else:
-                        cols[idx] += " " + text
-                    break
+        cells = [[] for _ in column_blocks]
+        for _, text in row["words"]:
+            col = indices[pos]
+            pos += 1
+            if col >= 0:
+                cells[col].append(text)
+        cols = [" ".join(cell) for cell in cells]
         # Skip header rows
         combined = " ".join(cols).lower()
         if cols[0].strip() == "No" or "kepemilikan per" in combined or "kepemilikan efek diatas" in combined or "berdasarkan sid" in combined or "keterangan" in combined or "font" in combined or "hitam tidak ada perubahan" in combined or "biru ada perubahan" in combined:
@@ -325,16 +585,22 @@ def assign_words_to_columns(rows, column_blocks):
 # Fungsi untuk fill missing kode berdasarkan required columns
 def fill_missing_kode(all_rows, required_indices):
     # Iterate tanpa sort, asumsikan urutan sudah berdasarkan No
-    for i in range(len(all_rows)):
+    # Grup = deretan baris berurutan dengan No yang sama. Awal & akhir grup dihitung sekali per
+    # grup dan dipakai lagi oleh baris berikutnya di grup yang sama (total O(n)), bukan scan ke
+    # atas / bawah untuk setiap baris yang kodenya kosong
+    n = len(all_rows)
+    group_start = group_end = -1
+    other_indices = [idx for idx in required_indices if idx != 1]  # Skip kode index
+
+    for i in range(n):
         # Check jika kolom kode (index 1) kosong
         if not all_rows[i][1].strip():
             # Check apakah baris ini memiliki semua required columns (kecuali kode)
             has_required = True
-            for idx in required_indices:
-                if idx != 1:  # Skip kode index
-                    if idx >= len(all_rows[i]) or not all_rows[i][idx].strip():
-                        has_required = False
-                        break
+            for idx in other_indices:
+                if idx >= len(all_rows[i]) or not all_rows[i][idx].strip():
+                    has_required = False
+                    break
             
             # Jika punya required columns lain, coba fill kode
             if has_required:
@@ -342,24 +608,20 @@ def fill_missing_kode(all_rows, required_indices):
                 
                 # Strategy 1: Cek baris langsung atas dan bawah (original logic)
                 kode_atas = all_rows[i-1][1].strip() if i > 0 else ''
-                kode_bawah = all_rows[i+1][1].strip() if i < len(all_rows)-1 else ''
+                kode_bawah = all_rows[i+1][1].strip() if i < n-1 else ''
                 
                 # Strategy 2: Jika nomor baris saat ini ada, cari grup dengan nomor yang sama
-                # Cari kode di atas grup nomor yang sama dan di bawah grup
+                # Ambil kode baris tepat sebelum dan sesudah grup. Dibaca langsung dari all_rows,
+                # jadi kode yang sudah di-fill di iterasi sebelumnya ikut terpakai
                 if current_no:
-                    # Cari kode sebelum grup nomor ini
-                    kode_before_group = ''
-                    for j in range(i - 1, -1, -1):
-                        if all_rows[j][0].strip() != current_no:
-                            kode_before_group = all_rows[j][1].strip()
-                            break
-                    
-                    # Cari kode setelah grup nomor ini
-                    kode_after_group = ''
-                    for j in range(i + 1, len(all_rows)):
-                        if all_rows[j][0].strip() != current_no:
-                            kode_after_group = all_rows[j][1].strip()
-                            break
+                    if not group_start <= i <= group_end:
+                        group_start = group_end = i
+                        while group_start > 0 and all_rows[group_start - 1][0].strip() == current_no:
+                            group_start -= 1
+                        while group_end < n - 1 and all_rows[group_end + 1][0].strip() == current_no:
+                            group_end += 1
+                    kode_before_group = all_rows[group_start - 1][1].strip() if group_start > 0 else ''
+                    kode_after_group = all_rows[group_end + 1][1].strip() if group_end < n - 1 else ''
                     
                     # Gunakan kode dari grup logic jika tersedia dan sama
                     if kode_before_group and kode_after_group and kode_before_group == kode_after_group:
@@ -372,42 +634,119 @@ def fill_missing_kode(all_rows, required_indices):
                     print(f"✓ Filled missing kode for No {no_val} with {kode_atas}")
 
 # =======================================================
-# MAIN
+# HASIL EKSTRAKSI (dipakai scraper lewat extract_pdf)
 # =======================================================
-if __name__ == "__main__":
-    pdf = fitz.open(PDF_PATH)
-    fileName = os.path.basename(PDF_PATH)  # Define fileName here
-    # 1) ambil kolom dari pixel merah (hanya halaman index 2)
-    col_blocks = detect_columns_from_red_pixel(PDF_PATH, COLUMN_PAGE_INDEX)
+class ExtractionError(Exception):
+    """Ekstraksi PDF gagal (PDF rusak, kolom tidak terdeteksi, ...)"""
+
+
+class KepemilikanRow:
+    """Satu baris tabel kepemilikan 5% (atribut = kolom `headers` + percent_difference)"""
+    __slots__ = tuple(headers) + ("percent_difference",)
+
+    def __init__(self, **values):
+        for name in self.__slots__:
+            setattr(self, name, values.get(name))
+
+    def to_dict(self):
+        """Format payload upsert (percent_difference hanya ada jika bisa dihitung)"""
+        obj = {header: getattr(self, header) for header in headers}
+        if self.percent_difference is not None:
+            obj['percent_difference'] = self.percent_difference
+        return obj
+
+    def __repr__(self):
+        return f"KepemilikanRow(No={self.No!r}, kode={self.kode!r}, pemegang_saham={self.pemegang_saham!r})"
+
+
+class ExtractionStats:
+    def __init__(self, pages=0, raw_rows=0, rows=0, retried=False, seconds=0.0, upserted=False, template=False):
+        self.pages = pages
+        self.raw_rows = raw_rows
+        self.rows = rows
+        self.retried = retried
+        self.seconds = seconds
+        self.upserted = upserted
+        self.template = template  # col_blocks dari template layout (tanpa deteksi kolom)
+
+    def __repr__(self):
+        return (f"ExtractionStats(pages={self.pages}, raw_rows={self.raw_rows}, rows={self.rows}, "
+                f"retried={self.retried}, template={self.template}, seconds={self.seconds:.2f}, "
+                f"upserted={self.upserted})")
+
+
+class ExtractionResult:
+    def __init__(self, file_name, tanggal, rows, all_rows, col_blocks, stats):
+        self.file_name = file_name
+        self.tanggal = tanggal
+        self.rows = rows            # list KepemilikanRow (lolos filter required columns)
+        self.all_rows = all_rows    # semua baris mentah (list kolom) setelah fill kode
+        self.col_blocks = col_blocks
+        self.stats = stats
+
+    def __repr__(self):
+        return f"ExtractionResult({self.file_name!r}, tanggal={self.tanggal!r}, {self.stats!r})"
+
+
+def extract_table(doc, col_blocks, workers=None):
+    """
+    Baris tabel mentah dari halaman 2 sampai terakhir (urut halaman; fill_missing_kode
+    bergantung pada urutan baris). Rows per halaman diambil dari cache LampDocument;
+    halaman yang belum dibaca di-parse dulu (paralel jika PDF besar).
+    """
+    doc.load_rows(1, len(doc), workers)
     all_rows = []
-    # 2) proses semua halaman dari 2 sampai terakhir
-    for page_index in range(1, len(pdf)):
-        page = pdf[page_index]
-        print(f"Processing page {page_index + 1} ...")
-        rows = extract_words_by_rows(page)
-        table_rows = assign_words_to_columns(rows, col_blocks)
-        all_rows.extend(table_rows)
-    
-    # Simpan raw CSV sebelum fill (urutan asli)
-    rawCsvFileName = fileName.replace('.pdf', '_raw.csv')
-    rawCsvFilePath = os.path.join("csv", rawCsvFileName)
-    os.makedirs("csv", exist_ok=True)
+    for page_index in range(1, len(doc)):
+        all_rows.extend(assign_words_to_columns(doc.rows(page_index), col_blocks))
+    return all_rows
+
+
+def layout_fingerprint(doc, page_index=COLUMN_PAGE_INDEX):
+    """
+    Sidik layout halaman kolom: ukuran halaman + posisi word header (semua baris di atas baris
+    data pertama, yaitu baris yang word pertamanya angka No). Word yang mengandung angka
+    (tanggal di judul) diabaikan supaya layout yang sama tetap cocok setiap hari.
+    None jika baris data tidak ditemukan.
+    """
+    page = doc[page_index]
+    parts = [f"{round(page.rect.width)}x{round(page.rect.height)}"]
+    for row in doc.rows(page_index):
+        if row["words"] and row["words"][0][1].strip().isdigit():
+            break
+        parts.append(f"y{round(row['y'])}")
+        parts.extend(f"{round(x)}:{text}" for x, text in row["words"] if not any(ch.isdigit() for ch in text))
+    else:
+        return None
+    return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()
+
+
+def detect_columns(doc):
+    try:
+        with metrics.timed("extract_columns"):
+            return detect_columns_from_page(doc[COLUMN_PAGE_INDEX])
+    except Exception as e:
+        raise ExtractionError(f"Kolom tidak terdeteksi: {e}") from e
+
+
+def has_kode(filtered_rows):
+    return any((row.kode or "").strip() for row in filtered_rows)
+
+
+def write_raw_csv(all_rows, rawCsvFilePath, updated=False):
+    os.makedirs(CSV_DIR, exist_ok=True)
     try:
         with open(rawCsvFilePath, "w", newline="", encoding="utf-8") as f:
             writer = csv.writer(f)
             writer.writerow(headers)
             for r in all_rows:
                 writer.writerow(r)
-        print(f"💾 Raw CSV tersimpan: {rawCsvFilePath}")
+        print(f"💾 Raw CSV {'updated' if updated else 'tersimpan'}: {rawCsvFilePath}")
     except Exception as rawCsvErr:
         print("❌ Error menyimpan raw CSV:", str(rawCsvErr))
-    
-    # Filter rows yang memiliki kolom required
-    required_indices = [0, 1, 2, 4, 12, 13, 15, 16]
-    
-    # Fill missing kode untuk baris yang punya required columns
-    fill_missing_kode(all_rows, required_indices)
-    
+
+
+def filter_rows(all_rows, required_indices=REQUIRED_INDICES):
+    """Baris yang punya semua required columns, sebagai KepemilikanRow"""
     filtered_rows = []
     for row in all_rows:
         if all(row[i].strip() for i in required_indices if i < len(row)):
@@ -431,69 +770,109 @@ if __name__ == "__main__":
             except ValueError:
                 pass
             
-            filtered_rows.append(obj)
-    
-    print(f"✔ Ekstraksi selesai: {len(filtered_rows)} baris")
-    
-    # Check dan adjust kode column jika kosong semua
-    col_blocks, should_retry = check_and_adjust_kode_column(filtered_rows, col_blocks)
-    
-    if should_retry:
-        print("\n🔄 Re-extracting dengan adjusted column blocks...")
-        all_rows = []
-        
-        for page_index in range(1, len(pdf)):
-            page = pdf[page_index]
-            print(f"Processing page {page_index + 1} ...")
-            rows = extract_words_by_rows(page)
-            table_rows = assign_words_to_columns(rows, col_blocks)
-            all_rows.extend(table_rows)
-        
-        # Simpan raw CSV lagi dengan adjusted blocks
+            filtered_rows.append(KepemilikanRow(**obj))
+    return filtered_rows
+
+
+def extract_pdf(source, name=None, upsert=True):
+    """
+    Ekstrak tabel kepemilikan dari PDF Lamp1 (path file atau bytes), simpan CSV, dan
+    upsert ke Supabase jika `upsert`. Return ExtractionResult; raise ExtractionError jika gagal.
+    """
+    extract_start = time.perf_counter()
+    if name is None:
+        name = source if isinstance(source, str) else "stdin.pdf"
+    fileName = os.path.basename(name)
+    try:
+        doc = LampDocument(source)
+    except Exception as e:
+        raise ExtractionError(f"PDF tidak bisa dibuka: {e}") from e
+
+    try:
+        # 1) ambil kolom dari template layout yang cocok, atau deteksi dari header merah (halaman 2)
+        templates = get_templates()
+        fingerprint = layout_fingerprint(doc) if templates else None
+        col_blocks = templates.get(fingerprint) if fingerprint else None
+        from_template = col_blocks is not None
+        if from_template:
+            print(f"\n📐 Template kolom dipakai ({fingerprint[:12]}), deteksi kolom dilewati")
+        else:
+            col_blocks = detect_columns(doc)
+
+        # 2) proses semua halaman dari 2 sampai terakhir
+        all_rows = extract_table(doc, col_blocks)
+
+        # Simpan raw CSV sebelum fill (urutan asli)
+        rawCsvFilePath = os.path.join(CSV_DIR, fileName.replace('.pdf', '_raw.csv'))
+        write_raw_csv(all_rows, rawCsvFilePath)
+
+        # Fill missing kode untuk baris yang punya required columns
+        fill_missing_kode(all_rows, REQUIRED_INDICES)
+        filtered_rows = filter_rows(all_rows)
+        print(f"✔ Ekstraksi selesai: {len(filtered_rows)} baris")
+
+        if from_template and not has_kode(filtered_rows):
+            # Template tidak cocok lagi dengan PDF ini: deteksi ulang, template diganti di bawah
+            print("\n⚠ Template kolom tidak cocok (kode kosong semua), deteksi ulang kolom...")
+            from_template = False
+            col_blocks = detect_columns(doc)
+            all_rows = extract_table(doc, col_blocks)
+            write_raw_csv(all_rows, rawCsvFilePath, updated=True)
+            fill_missing_kode(all_rows, REQUIRED_INDICES)
+            filtered_rows = filter_rows(all_rows)
+            print(f"✔ Ekstraksi selesai: {len(filtered_rows)} baris")
+
+        # Check dan adjust kode column jika kosong semua
+        col_blocks, should_retry = check_and_adjust_kode_column([r.to_dict() for r in filtered_rows], col_blocks)
+
+        if should_retry:
+            print("\n🔄 Re-extracting dengan adjusted column blocks...")
+            # rows per halaman sudah di-cache, hanya assign kolom yang diulang
+            all_rows = extract_table(doc, col_blocks)
+            # Simpan raw CSV lagi dengan adjusted blocks
+            write_raw_csv(all_rows, rawCsvFilePath, updated=True)
+            # Fill missing kode lagi, lalu filter lagi
+            fill_missing_kode(all_rows, REQUIRED_INDICES)
+            filtered_rows = filter_rows(all_rows)
+            print(f"✔ Re-ekstraksi selesai: {len(filtered_rows)} baris")
+
+        # Kolom yang terbukti benar (kode terisi) disimpan sebagai template untuk layout ini
+        if fingerprint and has_kode(filtered_rows):
+            page = doc[COLUMN_PAGE_INDEX]
+            templates.put(fingerprint, col_blocks, [round(page.rect.width), round(page.rect.height)])
+
+        stats = ExtractionStats(pages=len(doc) - 1, raw_rows=len(all_rows), rows=len(filtered_rows),
+                                retried=should_retry, template=from_template)
+
+        # Extract tanggal dari teks halaman pertama (PDF yang sama, tidak dibuka ulang)
         try:
-            with open(rawCsvFilePath, "w", newline="", encoding="utf-8") as f:
-                writer = csv.writer(f)
-                writer.writerow(headers)
-                for r in all_rows:
-                    writer.writerow(r)
-            print(f"💾 Raw CSV updated: {rawCsvFilePath}")
-        except Exception as rawCsvErr:
-            print("❌ Error menyimpan raw CSV:", str(rawCsvErr))
-        
-        # Fill missing kode lagi
-        fill_missing_kode(all_rows, required_indices)
-        
-        # Filter lagi
-        filtered_rows = []
-        for row in all_rows:
-            if all(row[i].strip() for i in required_indices if i < len(row)):
-                obj = {}
-                for idx, header in enumerate(headers):
-                    value = row[idx] if idx < len(row) else None
-                    obj[header] = value
-                
-                # Tambah percent_difference jika ada perbedaan
-                try:
-                    pa_str = obj.get('percent_after', '').replace(',', '').replace(' ', '').strip()
-                    pb_str = obj.get('percent_before', '').replace(',', '').replace(' ', '').strip()
-                    if pb_str == '-':
-                        obj['percent_before'] = '0'
-                        pb = 0
-                    else:
-                        pb = float(pb_str) if pb_str else None
-                    pa = float(pa_str) if pa_str else None
-                    if pa is not None and pb is not None:
-                        obj['percent_difference'] = pa - pb
-                except ValueError:
-                    pass
-                
-                filtered_rows.append(obj)
-        
-        print(f"✔ Re-ekstraksi selesai: {len(filtered_rows)} baris")
-    
-    # Extract tanggal dari halaman pertama PDF
-    tanggal = extract_date_from_pdf(PDF_PATH)
-    
-    # Upsert ke Supabase
-    fileName = os.path.basename(PDF_PATH)
-    upsertToSupabase(all_rows, filtered_rows, fileName, tanggal)
+            first_page_text = doc.text(0)
+        except Exception as e:
+            print(f"❌ Error saat extract tanggal dari PDF: {str(e)}")
+            first_page_text = ""
+        tanggal = extract_date_from_text(first_page_text) if first_page_text else None
+    finally:
+        doc.close()
+
+    if upsert:
+        # Upsert ke Supabase
+        stats.upserted = upsertToSupabase(all_rows, [r.to_dict() for r in filtered_rows], fileName, tanggal)
+
+    stats.seconds = time.perf_counter() - extract_start
+    metrics.record("extract", stats.seconds, pages=stats.pages, rows=stats.rows, retried=stats.retried,
+                   template=stats.template)
+    return ExtractionResult(fileName, tanggal, filtered_rows, all_rows, col_blocks, stats)
+
+# =======================================================
+# MAIN
+# =======================================================
+if __name__ == "__main__":
+    # PDF_PATH "-" = baca PDF dari stdin (bytes langsung, tanpa file di disk);
+    # nama file untuk CSV diambil dari argumen kedua
+    PDF_PATH = sys.argv[1] if len(sys.argv) > 1 else "pdf/20251217.pdf"
+    PDF_NAME = sys.argv[2] if len(sys.argv) > 2 else ("stdin.pdf" if PDF_PATH == "-" else PDF_PATH)
+    pdf_source = sys.stdin.buffer.read() if PDF_PATH == "-" else PDF_PATH
+    try:
+        extract_pdf(pdf_source, PDF_NAME)
+    finally:
+        metrics.write_textfile("idx_extract")
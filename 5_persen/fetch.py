@@ -3,9 +3,16 @@
 import json
 from urllib.parse import urlencode
 from pathlib import Path
-import cloudscraper
 import time
 import datetime
+import os
+import sys
+
+# pdf_cache & download_manager ada di root repo (satu level di atas folder ini)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from pdf_cache import get_cache
+from download_manager import get_manager
+from retry_helper import host_of
 
 BASE = "https://www.idx.co.id"
 SEARCH_API = BASE + "/primary/Search/GetSearch"
@@ -48,22 +55,30 @@ def fetch_lamp1_pdfs(scraper, keyword, index_from=0, page_size=10, date_from=Non
     links = [it.get("link") for it in lamp1 if it.get("link")]
     return links
 
-def download_pdf(scraper, url, out_folder="pdf", date_from=""):
+def download_pdf(url, out_folder="pdf", date_from=""):
     Path(out_folder).mkdir(parents=True, exist_ok=True)
     filename = f"{format_date(date_from)}.pdf"
     out_path = Path(out_folder) / filename
-    try:
+
+    def download():
         # gunakan stream untuk file besar
-        with scraper.get(url, stream=True, timeout=60) as r:
+        with get_manager().stream(url, timeout=60) as r:
             print(f"Downloading {url} -> {out_path} (status {r.status_code})")
             if r.status_code != 200:
                 print("Failed to download:", r.status_code, r.text[:400])
-                return False
-            with open(out_path, "wb") as f:
-                for chunk in r.iter_content(8192):
-                    if chunk:
-                        f.write(chunk)
-        print("Saved:", out_path)
+                raise RuntimeError(f"HTTP {r.status_code}")
+            content = b"".join(chunk for chunk in r.iter_content(get_manager().chunk_size) if chunk)
+            length = r.headers.get("Content-Length")
+            # Ukuran dicek pdf_cache terhadap Content-Length sebelum disimpan (kecuali body
+            # di-encode gzip: iter_content mengembalikan byte hasil decode)
+            if not length or not length.isdigit() or r.headers.get("Content-Encoding", "identity") != "identity":
+                return content, None
+            return content, int(length)
+
+    try:
+        # cek cache PDF dulu sebelum ke network
+        _, hit = get_cache().fetch_to(url, out_path, download)
+        print("Saved (cache):" if hit else "Saved:", out_path)
         return True
     except Exception as e:
         print("Download error:", e)
@@ -80,10 +95,8 @@ def main():
     index_from = 0
     page_size = 10
 
-    # create cloudscraper session
-    scraper = cloudscraper.create_scraper(
-        browser={'custom': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120 Safari/537.36'}
-    )
+    # session cloudscraper keep-alive dari download manager (dipakai juga untuk download PDF)
+    scraper = get_manager().session(host_of(BASE))
 
     # step 0: visit homepage to get cookies / possible JS challenge solved
     try:
@@ -108,7 +121,7 @@ def main():
         # some links might be relative — make absolute
         if link.startswith("/"):
             link = BASE + link
-        download_pdf(scraper, link, date_from=date_from)
+        download_pdf(link, date_from=date_from)
     else:
         print("No Lamp1 links found to download.")
 
@@ -0,0 +1,134 @@
+# Test fill_missing_kode (versi O(n)) terhadap versi lama (scan atas/bawah per baris, disalin di
+# bawah sebagai referensi) pada tabel sintetis besar: hasil kode dan pesan print harus sama persis.
+#   python test_fill_missing_kode.py        (atau lewat pytest)
+import contextlib
+import copy
+import io
+import random
+import time
+
+from extract_bounding_box import REQUIRED_INDICES, fill_missing_kode
+
+
+def fill_missing_kode_reference(all_rows, required_indices):
+    for i in range(len(all_rows)):
+        if not all_rows[i][1].strip():
+            has_required = True
+            for idx in required_indices:
+                if idx != 1:
+                    if idx >= len(all_rows[i]) or not all_rows[i][idx].strip():
+                        has_required = False
+                        break
+            if has_required:
+                current_no = all_rows[i][0].strip()
+                kode_atas = all_rows[i-1][1].strip() if i > 0 else ''
+                kode_bawah = all_rows[i+1][1].strip() if i < len(all_rows)-1 else ''
+                if current_no:
+                    kode_before_group = ''
+                    for j in range(i - 1, -1, -1):
+                        if all_rows[j][0].strip() != current_no:
+                            kode_before_group = all_rows[j][1].strip()
+                            break
+                    kode_after_group = ''
+                    for j in range(i + 1, len(all_rows)):
+                        if all_rows[j][0].strip() != current_no:
+                            kode_after_group = all_rows[j][1].strip()
+                            break
+                    if kode_before_group and kode_after_group and kode_before_group == kode_after_group:
+                        kode_atas = kode_before_group
+                        kode_bawah = kode_after_group
+                if kode_atas and kode_bawah and kode_atas == kode_bawah:
+                    all_rows[i][1] = kode_atas
+                    no_val = current_no if current_no else "unknown"
+                    print(f"✓ Filled missing kode for No {no_val} with {kode_atas}")
+
+
+def synthetic_table(rows, seed, missing=0.3, groups=(1, 1, 2, 3, 5, 12), messy_no=True):
+    """
+    Tabel mirip hasil ekstraksi Lamp1 yang berantakan: grup No multi-baris, kode kosong (kadang
+    satu grup penuh), No kosong / berspasi, No yang muncul lagi di tempat lain, kolom wajib kosong,
+    dan baris yang lebih pendek dari 18 kolom.
+    """
+    rnd = random.Random(seed)
+    kodes = ["BBCA", "TLKM", "ASII", "GOTO", "BBRI"]
+    table = []
+    no = 1
+    kode = rnd.choice(kodes)
+    while len(table) < rows:
+        group = rnd.choice(groups)
+        if rnd.random() < 0.7:
+            kode = rnd.choice(kodes)
+        all_missing = rnd.random() < 0.1
+        for _ in range(group):
+            row = ["x"] * 18
+            if messy_no:
+                row[0] = rnd.choice([str(no), str(no), f" {no} ", "", str(max(1, no - rnd.randint(1, 3)))])
+            else:
+                row[0] = str(no)
+            row[1] = "" if all_missing or rnd.random() < missing else rnd.choice([kode, kode, f" {kode} ", "  "])
+            for idx in REQUIRED_INDICES:
+                if idx > 1 and rnd.random() < 0.03:
+                    row[idx] = rnd.choice(["", " "])
+            if rnd.random() < 0.01:
+                row = row[:rnd.randint(2, 17)]
+            table.append(row)
+        no += 1
+    return table[:rows]
+
+
+def run(fn, table):
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        start = time.perf_counter()
+        fn(table, REQUIRED_INDICES)
+        elapsed = time.perf_counter() - start
+    return out.getvalue(), elapsed
+
+
+def check(table):
+    expected_rows, actual_rows = copy.deepcopy(table), copy.deepcopy(table)
+    expected_out, old_time = run(fill_missing_kode_reference, expected_rows)
+    actual_out, new_time = run(fill_missing_kode, actual_rows)
+    assert actual_rows == expected_rows, "hasil fill kode berbeda dari versi lama"
+    assert actual_out == expected_out, "pesan print berbeda dari versi lama"
+    return expected_out.count("\n"), old_time, new_time
+
+
+def test_small_edge_cases():
+    cases = [
+        [],
+        [["1", ""] + ["x"] * 16],
+        [["1", "AAAA"] + ["x"] * 16, ["1", ""] + ["x"] * 16],
+        [["1", "AAAA"] + ["x"] * 16, ["2", ""] + ["x"] * 16, ["3", "AAAA"] + ["x"] * 16],
+        # grup di awal / akhir tabel, dan fill berantai dari baris yang baru diisi
+        [["", ""] + ["x"] * 16, ["", "BBBB"] + ["x"] * 16, ["", ""] + ["x"] * 16, ["", ""] + ["x"] * 16],
+        [["7", "CCCC"] + ["x"] * 16, ["8", ""] + ["x"] * 16, ["8", ""] + ["x"] * 16, ["9", "CCCC"] + ["x"] * 16],
+    ]
+    for table in cases:
+        check(table)
+
+
+def test_random_tables():
+    for seed in range(200):
+        check(synthetic_table(random.Random(seed).randint(1, 300), seed))
+
+
+def test_large_table():
+    filled, old_time, new_time = check(synthetic_table(20000, seed=1, missing=0.6))
+    assert filled > 0
+
+
+def test_long_groups():
+    # Kasus terburuk versi lama: grup No panjang dengan banyak kode kosong
+    filled, old_time, new_time = check(synthetic_table(6000, seed=2, missing=0.8, groups=(300, 1500), messy_no=False))
+    assert filled > 0
+
+
+if __name__ == "__main__":
+    test_small_edge_cases()
+    test_random_tables()
+    print("✔ 200 tabel acak + edge case: hasil sama dengan versi lama")
+    filled, old_time, new_time = check(synthetic_table(20000, seed=1, missing=0.6))
+    print(f"✔ 20000 baris ({filled} kode di-fill): lama {old_time:.3f}s, baru {new_time:.3f}s")
+    filled, old_time, new_time = check(synthetic_table(6000, seed=2, missing=0.8, groups=(300, 1500), messy_no=False))
+    print(f"✔ 6000 baris, grup No panjang ({filled} kode di-fill): lama {old_time:.3f}s, baru {new_time:.3f}s")
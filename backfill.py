@@ -0,0 +1,166 @@
+# Backfill pengumuman historis IDX untuk rentang tanggal.
+# Rentang dipecah menjadi shard per hari; setiap shard dijalankan sebagai proses
+# `scrape.py --date <hari> --full --no-jobs` (jalur insert + dedup yang sama dengan
+# crawl live) dengan worker pool terbatas. Status tiap shard disimpan di checkpoint,
+# sehingga jika backfill terputus, run berikutnya hanya mengulang shard yang belum selesai.
+# Shard yang terputus di tengah aman diulang: baris yang sudah masuk dilewati dedup.
+#
+# Job background (ekstraksi Lamp1 & summarization) di-enqueue oleh shard ke antrian
+# job dan dijalankan worker di proses ini (atau run scrape.py berikutnya jika --skip-jobs).
+# Shard (--no-jobs) hanya enqueue dan tidak pernah menjalankan recovery antrian, jadi job
+# yang sedang dikerjakan worker di sini tidak dikembalikan ke pending oleh shard yang baru
+# start; recovery juga hanya mengambil job yang pemiliknya mati / lease-nya habis.
+#
+# Contoh:
+#   python backfill.py --from 2025-11-01 --to 2025-11-30
+#   python backfill.py --from 2025-11-01 --workers 3 --skip-jobs
+import argparse
+import datetime
+import json
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+ROOT = Path(__file__).parent
+SCRAPE_SCRIPT = ROOT / "scrape.py"
+DEFAULT_CHECKPOINT_PATH = ROOT / "backfill_checkpoint.json"
+DEFAULT_LOG_DIR = ROOT / "backfill_logs"
+BACKFILL_WORKERS = int(os.environ.get("BACKFILL_WORKERS", "2"))
+
+
+class Checkpoint:
+    """Status shard {hari: {"status": running|done|failed, ...}} di file JSON"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self.state = {}
+        if self.path.exists():
+            try:
+                self.state = json.loads(self.path.read_text())
+            except (ValueError, OSError) as e:
+                print(f"⚠ Checkpoint tidak bisa dibaca, mulai dari awal: {e}")
+
+    def is_done(self, day):
+        return self.state.get(day, {}).get("status") == "done"
+
+    def mark(self, day, status, **info):
+        with self._lock:
+            self.state[day] = dict(info, status=status, updated_at=datetime.datetime.now().isoformat(timespec="seconds"))
+            tmp = self.path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(self.state, indent=2, sort_keys=True))
+            os.replace(tmp, self.path)
+
+
+def day_shards(date_from, date_to):
+    """Daftar hari (YYYY-MM-DD) dari date_from sampai date_to (inklusif)"""
+    days = []
+    day = date_from
+    while day <= date_to:
+        days.append(day.isoformat())
+        day += datetime.timedelta(days=1)
+    return days
+
+
+def run_shard(day, env, log_dir, checkpoint):
+    """Crawl satu hari di proses terpisah. Return (ok, jumlah pengumuman baru, durasi)"""
+    checkpoint.mark(day, "running")
+    log_path = Path(log_dir) / f"{day}.log"
+    start = time.monotonic()
+    with open(log_path, "w", encoding="utf-8") as log:
+        result = subprocess.run(
+            [sys.executable, str(SCRAPE_SCRIPT), "--date", day, "--full", "--no-jobs"],
+            cwd=str(ROOT),
+            env=env,
+            stdout=log,
+            stderr=subprocess.STDOUT,
+        )
+    elapsed = time.monotonic() - start
+    match = re.search(r"Total pengumuman yang diproses: (\d+)", log_path.read_text(encoding="utf-8", errors="replace"))
+    new_count = int(match.group(1)) if match else 0
+    return result.returncode == 0, new_count, elapsed
+
+
+def main():
+    yesterday = datetime.date.today() - datetime.timedelta(days=1)
+    parser = argparse.ArgumentParser(description="Backfill pengumuman IDX untuk rentang tanggal")
+    parser.add_argument("--from", dest="date_from", type=datetime.date.fromisoformat, required=True,
+                        help="Tanggal awal (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="date_to", type=datetime.date.fromisoformat, default=yesterday,
+                        help="Tanggal akhir, inklusif (default: kemarin)")
+    parser.add_argument("--workers", type=int, default=BACKFILL_WORKERS, help="Jumlah shard yang berjalan bersamaan")
+    parser.add_argument("--rate", type=float, default=float(os.environ.get("CRAWL_RATE", "2")),
+                        help="Total request per detik ke IDX, dibagi rata ke semua worker")
+    parser.add_argument("--checkpoint", default=str(DEFAULT_CHECKPOINT_PATH))
+    parser.add_argument("--log-dir", default=str(DEFAULT_LOG_DIR))
+    parser.add_argument("--restart", action="store_true", help="Abaikan checkpoint, ulang semua shard")
+    parser.add_argument("--skip-jobs", action="store_true",
+                        help="Jangan jalankan job background di sini (tetap di antrian untuk scrape.py)")
+    args = parser.parse_args()
+
+    if args.date_from > args.date_to:
+        parser.error("--from harus sebelum atau sama dengan --to")
+    workers = max(1, args.workers)
+
+    checkpoint = Checkpoint(args.checkpoint)
+    Path(args.log_dir).mkdir(parents=True, exist_ok=True)
+    days = day_shards(args.date_from, args.date_to)
+    pending = [day for day in days if args.restart or not checkpoint.is_done(day)]
+    print(f"🗂 Backfill {args.date_from} s/d {args.date_to}: {len(days)} shard, "
+          f"{len(days) - len(pending)} sudah selesai, {len(pending)} dijalankan ({workers} worker)")
+    if not pending:
+        return
+
+    env = dict(os.environ)
+    # Batas rate per proses, supaya total ke IDX tetap sekitar --rate
+    env["CRAWL_RATE"] = str(args.rate / workers if args.rate > 0 else 0)
+
+    job_queue = None
+    if not args.skip_jobs:
+        import scrape
+        job_queue = scrape.job_queue
+        # Worker + recovery hanya di parent, sebelum shard pertama dijalankan
+        job_queue.start()
+
+    start = time.monotonic()
+    failed = []
+    total_new = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {}
+        for day in pending:
+            futures[executor.submit(run_shard, day, env, args.log_dir, checkpoint)] = day
+        for future in as_completed(futures):
+            day = futures[future]
+            try:
+                ok, new_count, elapsed = future.result()
+            except Exception as e:
+                ok, new_count, elapsed = False, 0, 0.0
+                print(f"❌ Shard {day} error: {e}")
+            checkpoint.mark(day, "done" if ok else "failed", new=new_count, elapsed=round(elapsed, 1))
+            total_new += new_count
+            if ok:
+                print(f"✔ Shard {day}: {new_count} pengumuman baru ({elapsed:.1f}s)")
+            else:
+                failed.append(day)
+                print(f"❌ Shard {day} gagal, lihat {Path(args.log_dir) / (day + '.log')}")
+
+    print(f"📈 Backfill selesai dalam {time.monotonic() - start:.1f}s: {total_new} pengumuman baru, "
+          f"{len(pending) - len(failed)} shard berhasil, {len(failed)} gagal")
+
+    if job_queue is not None:
+        scrape.wait_jobs()
+        scrape.writer.close()
+        job_queue.stop()
+
+    if failed:
+        print(f"Jalankan ulang perintah yang sama untuk mengulang shard gagal: {', '.join(sorted(failed))}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
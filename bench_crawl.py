@@ -0,0 +1,105 @@
+# Benchmark crawl scrape.py terhadap server pengganti IDX + Supabase (replay.py).
+# Setiap skenario menjalankan `scrape.py --no-jobs` di proses baru dengan dedup store,
+# antrian job, cache PDF dan state transport/circuit breaker sementara, lalu melaporkan
+# pengumuman/detik, waktu sampai insert pertama dan perilaku saat 403/429/timeout.
+#
+# Contoh:
+#   python bench_crawl.py
+#   python bench_crawl.py --fixtures fixtures/2025-12-01 --scenario clean --scenario 403
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from replay import StandinServer, load_fixtures, synth
+
+ROOT = Path(__file__).parent
+
+# Opsi server per skenario (lihat StandinState)
+SCENARIOS = {
+    "clean": {},
+    "latency": {"latency": 0.2, "jitter": 0.1},
+    "403": {"error_rate": 0.2},
+    "429": {"throttle_rate": 0.2},
+    "timeout": {"timeout_rate": 0.1, "hang_seconds": 3.0},
+}
+
+
+def run_scenario(name, fixtures_dir, transport, seed, timeout, rate=None):
+    server = StandinServer(fixtures_dir, seed=seed, **SCENARIOS[name]).start()
+    with tempfile.TemporaryDirectory(prefix=f"bench_{name}_") as tmp:
+        env = dict(os.environ)
+        env.update({
+            "IDX_BASE_URL": server.base_url,
+            "SUPABASE_URL": server.base_url,
+            "SUPABASE_KEY": "bench",
+            "DEDUP_DB_PATH": str(Path(tmp) / "dedup.sqlite3"),
+            "JOB_DB_PATH": str(Path(tmp) / "jobs.sqlite3"),
+            "PDF_CACHE_DIR": str(Path(tmp) / "pdf_cache"),
+            "TRANSPORT_STATE_PATH": str(Path(tmp) / "transport_state.json"),
+            "CIRCUIT_STATE_PATH": str(Path(tmp) / "circuit_state.json"),
+            "METRICS_ENABLED": "0",
+            # Timeout & backoff dipersingkat supaya skenario gangguan selesai dalam hitungan detik
+            "PAGE_TIMEOUT": "1",
+            "PAGE_RETRY_BASE": "0.2",
+            "PAGE_MAX_ATTEMPTS": "4",
+        })
+        if rate is not None:
+            env["CRAWL_RATE"] = str(rate)
+        start = time.monotonic()
+        try:
+            result = subprocess.run(
+                [sys.executable, str(ROOT / "scrape.py"), "--no-jobs", "--transport", transport],
+                cwd=str(ROOT), env=env, capture_output=True, text=True, timeout=timeout,
+            )
+            exit_code = result.returncode
+            output = result.stdout + result.stderr
+        except subprocess.TimeoutExpired:
+            exit_code, output = "timeout", ""
+        elapsed = time.monotonic() - start
+    stats = server.state.snapshot()
+    server.stop()
+    return elapsed, exit_code, stats, output
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark crawl scrape.py terhadap server pengganti IDX")
+    parser.add_argument("--fixtures", help="Folder fixture (default: fixture sintetis sementara)")
+    parser.add_argument("--announcements", type=int, default=300, help="Jumlah pengumuman fixture sintetis")
+    parser.add_argument("--scenario", action="append", choices=list(SCENARIOS),
+                        help="Skenario yang dijalankan (default: semua)")
+    parser.add_argument("--transport", default="requests", choices=["auto", "requests", "cloudscraper"])
+    parser.add_argument("--rate", type=float, help="CRAWL_RATE untuk scrape.py (default: nilai env / bawaan)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--verbose", action="store_true", help="Tampilkan output scrape.py")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench_fixtures_") as tmp:
+        fixtures_dir = args.fixtures or synth(Path(tmp) / "synthetic", args.announcements)
+        total = len(load_fixtures(fixtures_dir)[0])
+
+        print(f"\n=== Benchmark crawl ({total} pengumuman, transport={args.transport}, "
+              f"rate={args.rate if args.rate is not None else os.environ.get('CRAWL_RATE', '2')}/s) ===")
+        print(f"{'skenario':<9} {'exit':>7} {'waktu':>8} {'insert':>7} {'ann/s':>8} {'1st ins':>8} "
+              f"{'page':>5} {'403':>4} {'429':>4} {'hang':>4}")
+        for name in args.scenario or list(SCENARIOS):
+            elapsed, exit_code, stats, output = run_scenario(
+                name, fixtures_dir, args.transport, args.seed, args.timeout, args.rate
+            )
+            if args.verbose:
+                print(output)
+            first = stats["first_insert_at"]
+            print(f"{name:<9} {str(exit_code):>7} {elapsed:>7.2f}s {stats['rows_inserted']:>7} "
+                  f"{stats['rows_inserted'] / elapsed if elapsed > 0 else 0:>8.1f} "
+                  f"{(f'{first:.2f}s' if first is not None else '-'):>8} {stats['pages']:>5} "
+                  f"{stats['injected_403']:>4} {stats['injected_429']:>4} {stats['injected_timeout']:>4}")
+            if stats["rows_inserted"] != total:
+                print(f"   ⚠ {total - stats['rows_inserted']} pengumuman tidak masuk (lihat --verbose)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+# Benchmark cold-start scrape.py untuk jalur "tidak ada pengumuman baru".
+# 1. Import: `python -X importtime -c "import scrape"` beberapa kali di proses baru;
+#    waktu import kumulatif, modul terberat, dan modul berat yang seharusnya tidak ikut
+#    ter-import (supabase, groq, pdfplumber, pdf2image, PIL, fitz).
+# 2. Run penuh: `scrape.py --no-jobs` terhadap server pengganti IDX (replay.py) yang semua
+#    pengumumannya sudah ada di dedup store (run pertama mengisi dedup). Setiap run adalah
+#    jalur "tidak ada yang baru": import, start_run, page pertama, hit dedup, selesai.
+#    Dilaporkan wall time proses, jumlah page yang di-fetch, dan modul berat yang ter-load.
+# Dedup store, antrian job dan state lain ditaruh di folder sementara, bukan di repo.
+#
+# Contoh:
+#   python bench_startup.py
+#   python bench_startup.py --runs 10 --budget-ms 300 --run-budget-ms 1500
+#   python bench_startup.py --import-only
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from replay import StandinServer, synth
+
+ROOT = Path(__file__).parent
+
+# Modul yang hanya boleh di-load saat ada job (summarization / ekstraksi / insert)
+LAZY_MODULES = ["supabase", "groq", "pdfplumber", "pdf2image", "PIL", "fitz", "numpy"]
+
+
+def parse_importtime(stderr):
+    """Parse output -X importtime. Return dict {modul: (self_us, cumulative_us)}"""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            _, self_us, cumulative_us, name = [part.strip() for part in line.replace("import time:", "|", 1).split("|")]
+            modules[name.strip()] = (int(self_us), int(cumulative_us))
+        except ValueError:
+            continue
+    return modules
+
+
+def run_once(module, env):
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=str(ROOT),
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    wall_ms = (time.perf_counter() - start) * 1000
+    if result.returncode != 0:
+        print(result.stderr[-2000:])
+        raise SystemExit(f"❌ Import {module} gagal (exit code {result.returncode})")
+    return wall_ms, parse_importtime(result.stderr)
+
+
+def run_nothing_new(env):
+    """Satu proses `scrape.py --no-jobs` penuh. Return (wall_ms, modul yang di-import)"""
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", str(ROOT / "scrape.py"), "--no-jobs", "--transport", "requests"],
+        cwd=str(ROOT),
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+    wall_ms = (time.perf_counter() - start) * 1000
+    if result.returncode != 0:
+        print(result.stdout[-2000:])
+        print(result.stderr[-2000:])
+        raise SystemExit(f"❌ scrape.py gagal (exit code {result.returncode})")
+    return wall_ms, parse_importtime(result.stderr)
+
+
+def bench_nothing_new(env, tmp, args):
+    """Ukur run penuh jalur "tidak ada pengumuman baru". Return True jika dalam budget"""
+    server = StandinServer(synth(Path(tmp) / "fixtures", args.announcements)).start()
+    env = dict(env, IDX_BASE_URL=server.base_url, SUPABASE_URL=server.base_url)
+    try:
+        # Run pertama memasukkan semua pengumuman (mengisi dedup store), tidak diukur
+        run_nothing_new(env)
+        seeded = server.state.snapshot()
+        if not seeded["rows_inserted"]:
+            raise SystemExit("❌ Run pertama tidak memasukkan pengumuman, jalur dedup tidak teruji")
+        walls, pages, modules = [], [], {}
+        for _ in range(args.runs):
+            before = server.state.snapshot()["pages"]
+            wall_ms, modules = run_nothing_new(env)
+            walls.append(wall_ms)
+            pages.append(server.state.snapshot()["pages"] - before)
+        inserted = server.state.snapshot()["rows_inserted"] - seeded["rows_inserted"]
+    finally:
+        server.stop()
+
+    print(f"\n=== Run penuh \"tidak ada yang baru\" (scrape.py --no-jobs, {args.runs} run, replay.py) ===")
+    print(f"Wall time proses : median {statistics.median(walls):.1f} ms (min {min(walls):.1f}, max {max(walls):.1f})")
+    print(f"Page di-fetch    : {', '.join(str(p) for p in pages)} per run")
+    ok = True
+    if inserted:
+        ok = False
+        print(f"❌ {inserted} baris ter-insert, padahal semua pengumuman sudah ada")
+    leaked = [m for m in LAZY_MODULES if m in modules]
+    if leaked:
+        ok = False
+        print(f"❌ Modul berat ter-load di jalur tanpa job: {', '.join(leaked)}")
+    median_wall = statistics.median(walls)
+    if median_wall > args.run_budget_ms:
+        ok = False
+        print(f"❌ Run {median_wall:.1f} ms melebihi budget {args.run_budget_ms:.0f} ms")
+    else:
+        print(f"✔ Run {median_wall:.1f} ms dalam budget {args.run_budget_ms:.0f} ms")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cold-start import scrape.py")
+    parser.add_argument("--module", default="scrape")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--budget-ms", type=float, default=float(os.environ.get("STARTUP_BUDGET_MS", "400")))
+    parser.add_argument("--run-budget-ms", type=float, default=float(os.environ.get("STARTUP_RUN_BUDGET_MS", "1500")),
+                        help="Budget wall time run penuh \"tidak ada yang baru\"")
+    parser.add_argument("--announcements", type=int, default=50, help="Jumlah pengumuman fixture sintetis")
+    parser.add_argument("--import-only", action="store_true", help="Hanya ukur import, tanpa run penuh")
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory(prefix="bench_startup_")
+    env = dict(os.environ)
+    # scrape.py butuh env ini saat import; nilai dummy cukup karena tidak ada koneksi yang dibuat
+    env.setdefault("SUPABASE_URL", "https://example.supabase.co")
+    env.setdefault("SUPABASE_KEY", "bench")
+    env.update({
+        "DEDUP_DB_PATH": str(Path(tmp.name) / "dedup.sqlite3"),
+        "JOB_DB_PATH": str(Path(tmp.name) / "jobs.sqlite3"),
+        "PDF_CACHE_DIR": str(Path(tmp.name) / "pdf_cache"),
+        "TRANSPORT_STATE_PATH": str(Path(tmp.name) / "transport_state.json"),
+        "CIRCUIT_STATE_PATH": str(Path(tmp.name) / "circuit_state.json"),
+        "METRICS_ENABLED": "0",
+    })
+
+    # Run pertama hanya untuk menghangatkan cache .pyc / disk
+    run_once(args.module, env)
+
+    walls, imports, modules = [], [], {}
+    for _ in range(args.runs):
+        wall_ms, modules = run_once(args.module, env)
+        walls.append(wall_ms)
+        imports.append(modules.get(args.module, (0, 0))[1] / 1000)
+
+    print(f"=== Cold-start {args.module} ({args.runs} run) ===")
+    print(f"Wall time proses : median {statistics.median(walls):.1f} ms (min {min(walls):.1f}, max {max(walls):.1f})")
+    print(f"Import {args.module:<11}: median {statistics.median(imports):.1f} ms (min {min(imports):.1f}, max {max(imports):.1f})")
+
+    print(f"\nTop {args.top} modul (kumulatif, run terakhir):")
+    heaviest = sorted(modules.items(), key=lambda kv: kv[1][1], reverse=True)[:args.top]
+    for name, (self_us, cumulative_us) in heaviest:
+        print(f"  {cumulative_us / 1000:8.1f} ms  (self {self_us / 1000:6.1f} ms)  {name}")
+
+    ok = True
+    leaked = [m for m in LAZY_MODULES if m in modules]
+    if leaked:
+        ok = False
+        print(f"\n❌ Modul berat ikut ter-import saat startup: {', '.join(leaked)}")
+
+    median_import = statistics.median(imports)
+    if median_import > args.budget_ms:
+        ok = False
+        print(f"\n❌ Import {args.module} {median_import:.1f} ms melebihi budget {args.budget_ms:.0f} ms")
+    else:
+        print(f"\n✔ Import {args.module} {median_import:.1f} ms dalam budget {args.budget_ms:.0f} ms")
+
+    if not args.import_only and not bench_nothing_new(env, tmp.name, args):
+        ok = False
+
+    tmp.cleanup()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+import threading
+import time
+
+import metrics
+from retry_helper import RetryPolicy, is_retryable, retry_call, status_of
+
+# Write-behind buffer untuk insert ke Supabase. Baris dikumpulkan lintas page dan
+# dikirim sebagai satu upsert saat buffer mencapai `max_rows` atau baris tertua
+# sudah menunggu `max_delay` detik. Upsert memakai on_conflict sehingga run yang
+# tumpang tindih tidak error karena duplikat.
+# Hanya error sementara yang di-retry (jaringan, HTTP 429/5xx, database tidak terjangkau);
+# error permanen PostgREST (schema, constraint, auth) langsung gagal tanpa backoff.
+
+# SQLSTATE sementara: koneksi (08), konflik transaksi (40), resource habis (53), query dibatalkan / timeout (57)
+TRANSIENT_SQLSTATE_CLASSES = {"08", "40", "53", "57"}
+# Kode PostgREST saat database tidak terjangkau / pool koneksi penuh (HTTP 503/504)
+TRANSIENT_PGRST_CODES = {"PGRST000", "PGRST001", "PGRST002", "PGRST003"}
+
+
+def is_retryable_write(exc):
+    """True jika upsert yang gagal dengan exc layak dicoba lagi"""
+    try:
+        from postgrest.exceptions import APIError
+    except ImportError:
+        APIError = None
+    if APIError is not None and isinstance(exc, APIError):
+        code = str(exc.code or "")
+        if code.isdigit() and len(code) == 3:
+            # Body error bukan JSON (mis. halaman gateway): code berisi status HTTP
+            return int(code) == 429 or int(code) >= 500
+        return code in TRANSIENT_PGRST_CODES or code[:2] in TRANSIENT_SQLSTATE_CLASSES
+    status = status_of(exc)
+    if status is not None:
+        return status == 429 or status >= 500
+    try:
+        import httpx
+    except ImportError:
+        httpx = None
+    if httpx is not None and isinstance(exc, httpx.TransportError):
+        return True
+    return is_retryable(exc)
+
+
+class BulkWriter:
+    def __init__(self, get_client, table, on_conflict="tanggal,judul", max_rows=50, max_delay=5.0,
+                 max_retries=4, backoff_base=1.0, on_flush=None, on_error=None):
+        self.get_client = get_client  # callable, client Supabase baru dibuat saat flush pertama
+        self.table = table
+        self.on_conflict = on_conflict
+        self.max_rows = max_rows
+        self.max_delay = max_delay
+        self.retry_policy = RetryPolicy(max_attempts=max_retries, base_delay=backoff_base, max_delay=30)
+        self.on_flush = on_flush    # on_flush(rows) dipanggil setelah batch berhasil ditulis
+        self.on_error = on_error    # on_error(rows, exc) dipanggil jika batch gagal setelah semua retry
+
+        self._buffer = []
+        self._oldest_at = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._closed = False
+        self._timer = threading.Thread(target=self._timer_loop, name="bulk-writer", daemon=True)
+        self._timer.start()
+
+    def add(self, rows):
+        """Tambahkan baris ke buffer, flush jika buffer sudah penuh"""
+        if not rows:
+            return
+        with self._cond:
+            if self._oldest_at is None:
+                self._oldest_at = time.monotonic()
+            self._buffer.extend(rows)
+            full = len(self._buffer) >= self.max_rows
+            self._cond.notify_all()
+        if full:
+            self.flush()
+
+    def flush(self):
+        """Tulis semua baris yang ada di buffer. Return jumlah baris yang berhasil ditulis"""
+        with self._flush_lock:
+            with self._cond:
+                rows, self._buffer = self._buffer, []
+                self._oldest_at = None
+            if not rows:
+                return 0
+
+            written = 0
+            for start in range(0, len(rows), self.max_rows):
+                batch = rows[start:start + self.max_rows]
+                try:
+                    self._write_with_retry(batch)
+                except Exception as e:
+                    print(f"Gagal memasukkan {len(batch)} data ke Supabase: {e}")
+                    if self.on_error:
+                        self.on_error(batch, e)
+                    continue
+                written += len(batch)
+                if self.on_flush:
+                    self.on_flush(batch)
+            return written
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._timer.join()
+        self.flush()
+
+    def _write_with_retry(self, batch):
+        def upsert():
+            print(f"💾 Upsert {len(batch)} baris ke {self.table}")
+            with metrics.timed("supabase_write", table=self.table, op="upsert", rows=len(batch)):
+                (
+                    self.get_client().table(self.table)
+                    .upsert(batch, on_conflict=self.on_conflict, ignore_duplicates=True)
+                    .execute()
+                )
+
+        retry_call(upsert, policy=self.retry_policy, retry_on=is_retryable_write, label="Upsert")
+
+    def _timer_loop(self):
+        """Flush otomatis saat baris tertua di buffer sudah melewati max_delay"""
+        while True:
+            with self._cond:
+                if self._closed:
+                    return
+                if self._oldest_at is None:
+                    self._cond.wait()
+                    continue
+                remaining = self._oldest_at + self.max_delay - time.monotonic()
+                if remaining > 0:
+                    self._cond.wait(remaining)
+                    continue
+            self.flush()
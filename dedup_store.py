@@ -0,0 +1,118 @@
+import sqlite3
+import threading
+import datetime
+from pathlib import Path
+
+# Penyimpanan lokal (SQLite) untuk key (tanggal, judul) pengumuman yang sudah masuk
+# ke tabel idx_keterbukaan_informasi. Dipakai supaya scraper tidak perlu select
+# semua data hari ini dari Supabase setiap run.
+
+DEFAULT_DB_PATH = Path(__file__).parent / "dedup.sqlite3"
+TABLE_NAME = "idx_keterbukaan_informasi"
+
+
+def normalize_tanggal(db_tanggal):
+    """Konversi format "2025-12-01 15:03:13+00" dari database ke "2025-12-01T15:03:13" (format IDX)"""
+    return db_tanggal.replace(" ", "T").split("+")[0].split("Z")[0]
+
+
+class DedupStore:
+    def __init__(self, db_path=DEFAULT_DB_PATH):
+        self.db_path = str(db_path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._conn:
+            # PRIMARY KEY (tanggal, judul) sekaligus jadi index untuk lookup duplikat
+            # dan untuk MAX(tanggal) (high-watermark TglPengumuman)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS announcement_keys (
+                    tanggal TEXT NOT NULL,
+                    judul TEXT NOT NULL,
+                    PRIMARY KEY (tanggal, judul)
+                )
+            """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS reconciled_days (
+                    day TEXT PRIMARY KEY,
+                    reconciled_at TEXT NOT NULL
+                )
+            """)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def contains(self, tanggal, judul):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM announcement_keys WHERE tanggal = ? AND judul = ?",
+                (tanggal, judul)
+            ).fetchone()
+        return row is not None
+
+    def add_many(self, keys):
+        """Simpan key (tanggal, judul) yang sudah berhasil di-insert ke database"""
+        keys = [(t, j) for t, j in keys if t and j is not None]
+        if not keys:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO announcement_keys (tanggal, judul) VALUES (?, ?)",
+                keys
+            )
+
+    def high_watermark(self, day):
+        """TglPengumuman terbaru yang diketahui untuk hari `day` (YYYY-MM-DD), atau None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MAX(tanggal) FROM announcement_keys WHERE tanggal >= ? AND tanggal < ?",
+                (day, day + "U")  # "U" > "T", jadi mencakup semua "YYYY-MM-DDT..."
+            ).fetchone()
+        return row[0] if row else None
+
+    def has_title_like(self, day, text):
+        """Cek apakah ada judul yang mengandung `text` pada hari `day` (tidak case-sensitive, sama seperti router)"""
+        # Dibandingkan di Python: lower() / LIKE SQLite hanya case-insensitive untuk ASCII
+        text = text.lower()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT judul FROM announcement_keys WHERE tanggal >= ? AND tanggal < ?",
+                (day, day + "U")
+            )
+            return any(text in judul.lower() for (judul,) in rows)
+
+    def is_reconciled(self, day):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM reconciled_days WHERE day = ?", (day,)
+            ).fetchone()
+        return row is not None
+
+    def reconcile(self, supabase, day, incremental=False):
+        """
+        Sinkronkan key hari `day` dari Supabase ke store lokal.
+        Jika incremental=True, hanya ambil data dengan tanggal >= high-watermark lokal.
+        Return jumlah key yang diterima dari Supabase.
+        """
+        start_of_day = day + "T00:00:00+00"
+        end_of_day = day + "T23:59:59+00"
+        watermark = self.high_watermark(day) if incremental else None
+        since = watermark + "+00" if watermark else start_of_day
+
+        response = (
+            supabase.table(TABLE_NAME)
+            .select("tanggal, judul")
+            .gte("tanggal", since)
+            .lte("tanggal", end_of_day)
+            .execute()
+        )
+        keys = [(normalize_tanggal(item["tanggal"]), item["judul"]) for item in response.data]
+        self.add_many(keys)
+
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO reconciled_days (day, reconciled_at) VALUES (?, ?)",
+                (day, datetime.datetime.now().isoformat(timespec="seconds"))
+            )
+        return len(keys)
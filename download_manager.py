@@ -0,0 +1,243 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import requests
+import urllib3
+
+from retry_helper import host_of
+
+# Download manager bersama untuk satu proses: satu session cloudscraper keep-alive per host
+# (cookie Cloudflare & koneksi TCP/TLS dipakai ulang antar PDF), dengan batas jumlah
+# download bersamaan per host. Dipakai jalur Lamp1, summarization dan 5_persen/fetch.py.
+# Download yang terputus dilanjutkan dengan HTTP Range (bukan mulai dari nol), ukuran
+# chunk menyesuaikan kecepatan koneksi, dan download ke file ditulis ke <dest>.part
+# lalu di-rename atomik, jadi tidak pernah ada PDF terpotong dengan nama final.
+#
+#   from download_manager import get_manager
+#   content = get_manager().get_bytes(url, timeout=60)
+#   size = get_manager().download_to(url, "file.pdf")
+
+DOWNLOAD_MAX_PER_HOST = int(os.environ.get("DOWNLOAD_MAX_PER_HOST", "4"))
+DOWNLOAD_CHUNK_SIZE = int(os.environ.get("DOWNLOAD_CHUNK_SIZE", str(64 * 1024)))
+# Batas chunk adaptif: membesar jika chunk datang cepat, mengecil jika lambat
+MIN_CHUNK_SIZE = 16 * 1024
+MAX_CHUNK_SIZE = 1024 * 1024
+# Berapa kali download yang terputus dilanjutkan (Range) sebelum menyerah
+DOWNLOAD_RESUME_ATTEMPTS = int(os.environ.get("DOWNLOAD_RESUME_ATTEMPTS", "3"))
+BROWSER = {'custom': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120 Safari/537.36'}
+
+
+# Error koneksi di tengah body: download bisa dilanjutkan dari byte terakhir
+INTERRUPTED_ERRORS = (
+    requests.exceptions.ChunkedEncodingError,
+    requests.exceptions.ConnectionError,
+    requests.exceptions.Timeout,
+    urllib3.exceptions.ProtocolError,
+    urllib3.exceptions.ReadTimeoutError,
+)
+
+
+class IncompleteDownload(IOError):
+    """Body lebih pendek dari Content-Length setelah semua percobaan resume"""
+    retryable = True
+
+
+def _expected_size(resp, offset):
+    """Total ukuran file dari Content-Range / Content-Length, atau None"""
+    content_range = resp.headers.get("Content-Range", "")
+    if "/" in content_range and not content_range.endswith("/*"):
+        try:
+            return int(content_range.rsplit("/", 1)[1])
+        except ValueError:
+            return None
+    length = resp.headers.get("Content-Length")
+    if length and length.isdigit():
+        return offset + int(length)
+    return None
+
+
+def _validator_of(resp):
+    """ETag kuat atau Last-Modified untuk If-Range (ETag lemah W/ tidak boleh dipakai)"""
+    etag = resp.headers.get("ETag")
+    if etag and not etag.startswith("W/"):
+        return etag
+    return resp.headers.get("Last-Modified")
+
+
+def default_session_factory():
+    import cloudscraper
+    return cloudscraper.create_scraper(browser=BROWSER)
+
+
+class DownloadManager:
+    def __init__(self, max_per_host=DOWNLOAD_MAX_PER_HOST, chunk_size=DOWNLOAD_CHUNK_SIZE,
+                 session_factory=default_session_factory):
+        self.max_per_host = max_per_host
+        self.chunk_size = chunk_size
+        self.session_factory = session_factory
+        self._lock = threading.Lock()
+        self._sessions = {}
+        self._slots = {}
+
+    def _resize_pool(self, session):
+        """Perbesar pool koneksi adapter supaya download paralel tetap keep-alive"""
+        for adapter in getattr(session, "adapters", {}).values():
+            if hasattr(adapter, "init_poolmanager"):
+                adapter._pool_maxsize = max(self.max_per_host, getattr(adapter, "_pool_maxsize", 0))
+                adapter.init_poolmanager(adapter._pool_connections, adapter._pool_maxsize,
+                                         block=adapter._pool_block)
+
+    def register_session(self, host, session):
+        """Pakai session yang sudah hangat (misal scraper crawl di scrape.py) untuk host ini"""
+        with self._lock:
+            self._resize_pool(session)
+            self._sessions[host] = session
+
+    def session(self, host):
+        """Session keep-alive untuk host (dibuat saat pertama dipakai)"""
+        with self._lock:
+            if host not in self._sessions:
+                session = self.session_factory()
+                self._resize_pool(session)
+                self._sessions[host] = session
+                self._slots.setdefault(host, threading.BoundedSemaphore(self.max_per_host))
+            return self._sessions[host]
+
+    def _slot(self, host):
+        with self._lock:
+            return self._slots.setdefault(host, threading.BoundedSemaphore(self.max_per_host))
+
+    @contextmanager
+    def stream(self, url, timeout=60, **kwargs):
+        """Response streaming; slot host dipegang sampai body selesai dibaca"""
+        host = host_of(url)
+        session = self.session(host)
+        with self._slot(host):
+            resp = session.get(url, stream=True, timeout=timeout, **kwargs)
+            try:
+                yield resp
+            finally:
+                resp.close()
+
+    def _iter_chunks(self, resp):
+        """Baca body dengan ukuran chunk adaptif sesuai waktu baca per chunk"""
+        raw = getattr(resp, "raw", None)
+        if raw is None or not hasattr(raw, "read"):
+            yield from (chunk for chunk in resp.iter_content(self.chunk_size) if chunk)
+            return
+        chunk_size = self.chunk_size
+        while True:
+            start = time.monotonic()
+            chunk = raw.read(chunk_size, decode_content=True)
+            if not chunk:
+                return
+            yield chunk
+            elapsed = time.monotonic() - start
+            if elapsed < 0.05 and len(chunk) >= chunk_size:
+                chunk_size = min(chunk_size * 2, MAX_CHUNK_SIZE)
+            elif elapsed > 0.5:
+                chunk_size = max(chunk_size // 2, MIN_CHUNK_SIZE)
+
+    def _download(self, url, write, reset, offset=0, validator=None, on_validator=None, timeout=60, **kwargs):
+        """
+        Download body ke write(chunk), mulai dari byte `offset` (Range + If-Range dengan
+        `validator` = ETag / Last-Modified dari response pertama). Jika file di server sudah
+        berubah atau server tidak mendukung Range, reset() dipanggil dan download mulai
+        dari awal. Return total byte yang sudah ditulis.
+        """
+        headers = dict(kwargs.pop("headers", None) or {})
+        attempts = 0
+        while True:
+            headers.pop("Range", None)
+            headers.pop("If-Range", None)
+            if offset and not validator:
+                # Tanpa ETag / Last-Modified tidak bisa dipastikan byte lama dari versi file yang sama
+                print(f"⚠ Tidak ada validator untuk resume, download ulang dari awal: {url}")
+                reset()
+                offset = 0
+            if offset:
+                headers["Range"] = f"bytes={offset}-"
+                headers["If-Range"] = validator
+            try:
+                with self.stream(url, timeout=timeout, headers=headers, **kwargs) as resp:
+                    if offset and resp.status_code == 416:
+                        # File sudah lengkap dari percobaan sebelumnya
+                        return offset
+                    resp.raise_for_status()
+                    if offset and resp.status_code != 206:
+                        print(f"⚠ File berubah atau server tidak mendukung Range, download ulang dari awal: {url}")
+                        reset()
+                        offset = 0
+                    if not offset:
+                        validator = _validator_of(resp)
+                        if on_validator:
+                            on_validator(validator)
+                    expected = _expected_size(resp, offset)
+                    for chunk in self._iter_chunks(resp):
+                        write(chunk)
+                        offset += len(chunk)
+                if expected is not None and offset < expected:
+                    raise IncompleteDownload(f"{url}: {offset} dari {expected} byte")
+                return offset
+            except INTERRUPTED_ERRORS + (IncompleteDownload,) as e:
+                attempts += 1
+                if attempts > DOWNLOAD_RESUME_ATTEMPTS or not offset:
+                    raise
+                print(f"↻ Download terputus di byte {offset}, lanjut dengan Range ({attempts}/{DOWNLOAD_RESUME_ATTEMPTS}): {e}")
+
+    def get_bytes(self, url, timeout=60, **kwargs):
+        """Download ke memory. HTTP error di-raise (raise_for_status)"""
+        buffer = bytearray()
+        self._download(url, buffer.extend, buffer.clear, timeout=timeout, **kwargs)
+        return bytes(buffer)
+
+    def download_to(self, url, dest, timeout=60, **kwargs):
+        """
+        Download ke file `dest` lewat `dest`.part lalu rename atomik. Sisa .part dari
+        download sebelumnya (run yang terputus) dilanjutkan dengan Range, hanya jika
+        validator yang disimpan di `dest`.part.meta masih cocok dengan file di server.
+        Return jumlah byte.
+        """
+        part = f"{dest}.part"
+        meta = f"{part}.meta"
+        offset = os.path.getsize(part) if os.path.exists(part) else 0
+        validator = None
+        if offset and os.path.exists(meta):
+            with open(meta, encoding="utf-8") as f:
+                validator = f.read().strip() or None
+
+        def save_validator(value):
+            with open(meta, "w", encoding="utf-8") as f:
+                f.write(value or "")
+
+        with open(part, "ab") as f:
+            def reset():
+                f.seek(0)
+                f.truncate()
+            size = self._download(url, f.write, reset, offset=offset, validator=validator,
+                                  on_validator=save_validator, timeout=timeout, **kwargs)
+        os.replace(part, dest)
+        if os.path.exists(meta):
+            os.remove(meta)
+        return size
+
+    def close(self):
+        with self._lock:
+            sessions, self._sessions = list(self._sessions.values()), {}
+        for session in sessions:
+            session.close()
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_manager():
+    """Download manager bersama untuk proses ini"""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = DownloadManager()
+        return _manager
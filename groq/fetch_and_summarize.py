@@ -1,11 +1,16 @@
 from io import BytesIO
-import cloudscraper
 import pdfplumber
 from dotenv import load_dotenv
 import os
 from groq import Groq
 import requests
 import base64
+import sys
+
+# pdf_cache ada di root repo (satu level di atas folder ini)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from pdf_cache import get_cache
+from download_manager import get_manager
 
 # Load API key
 load_dotenv()
@@ -13,14 +18,10 @@ api_key = os.getenv("GROQ_API_KEY")
 client = Groq(api_key=api_key)
 
 def fetch_pdf_in_memory(url):
-    """Download PDF ke memory tanpa simpan di disk"""
-    scraper = cloudscraper.create_scraper(
-        browser={'custom': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120 Safari/537.36'}
-    )
+    """Ambil PDF ke memory (dari cache PDF jika sudah pernah didownload)"""
     try:
-        resp = scraper.get(url, stream=True, timeout=60)
-        resp.raise_for_status()
-        return BytesIO(resp.content)
+        content, _ = get_cache().fetch(url, lambda: get_manager().get_bytes(url, timeout=60))
+        return BytesIO(content)
     except Exception as e:
         print("Error fetching PDF:", e)
         return None
@@ -0,0 +1,248 @@
+import os
+import socket
+import sqlite3
+import threading
+import json
+import datetime
+import time
+import traceback
+from pathlib import Path
+
+# Antrian job lokal (SQLite) dengan worker pool per tipe job.
+# Job disimpan di disk sehingga tetap ada setelah proses restart. Job yang di-claim
+# dicatat pemiliknya (host:pid) dan lease-nya; selama proses hidup lease diperpanjang
+# heartbeat. Job "running" hanya dikembalikan ke "pending" jika pemiliknya sudah mati
+# (pid tidak ada di host ini) atau lease-nya kedaluwarsa, jadi proses lain yang membuka
+# queue yang sama (mis. anak backfill) tidak mengambil alih job yang masih berjalan.
+
+DEFAULT_DB_PATH = Path(__file__).parent / "jobs.sqlite3"
+JOB_LEASE_SECONDS = float(os.environ.get("JOB_LEASE_SECONDS", "300"))
+
+
+def _now():
+    return datetime.datetime.now().isoformat(timespec="seconds")
+
+
+def _owner():
+    # Dihitung saat claim (bukan saat queue dibuat) supaya benar juga setelah fork
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _is_stale(owner, lease_until, now):
+    """True jika job running ini boleh diambil alih: pemilik mati atau lease habis"""
+    if not owner or lease_until is None:
+        # Baris dari versi lama (tanpa owner/lease)
+        return True
+    if lease_until < now:
+        return True
+    host, _, pid = owner.rpartition(":")
+    if host == socket.gethostname() and pid.isdigit():
+        return not _pid_alive(int(pid))
+    return False
+
+
+class JobQueue:
+    def __init__(self, db_path=DEFAULT_DB_PATH, max_attempts=3, lease_seconds=JOB_LEASE_SECONDS):
+        self.db_path = str(db_path)
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        self._handlers = {}
+        self._limits = {}
+        self._threads = []
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._stopping = False
+        self._running = 0
+
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                job_type TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                last_error TEXT,
+                created_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL
+            )
+        """)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        if "owner" not in columns:
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+        if "lease_until" not in columns:
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN lease_until REAL")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (job_type, status, id)")
+
+    def register(self, job_type, handler, concurrency=1):
+        """Daftarkan handler(payload) untuk job_type dengan batas worker `concurrency`"""
+        self._handlers[job_type] = handler
+        self._limits[job_type] = max(1, int(concurrency))
+
+    def enqueue(self, job_type, payload):
+        if job_type not in self._handlers:
+            raise ValueError(f"Tipe job tidak dikenal: {job_type}")
+        with self._cond:
+            self._conn.execute(
+                "INSERT INTO jobs (job_type, payload, created_at, updated_at) VALUES (?, ?, ?, ?)",
+                (job_type, json.dumps(payload, ensure_ascii=False), _now(), _now())
+            )
+            self._cond.notify_all()
+
+    def recover(self):
+        """Kembalikan job running yang pemiliknya mati / lease-nya habis ke pending. Return jumlahnya"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT id, owner, lease_until FROM jobs WHERE status = 'running'"
+                ).fetchall()
+                stale = [job_id for job_id, owner, lease_until in rows if _is_stale(owner, lease_until, now)]
+                for job_id in stale:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = 'pending', owner = NULL, lease_until = NULL, updated_at = ? "
+                        "WHERE id = ?",
+                        (_now(), job_id)
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        if stale:
+            print(f"♻ {len(stale)} job yang terputus dikembalikan ke antrian")
+            with self._cond:
+                self._cond.notify_all()
+        return len(stale)
+
+    def start(self):
+        """Recovery job terputus, lalu jalankan worker thread sesuai batas concurrency tiap tipe job"""
+        # Recovery hanya di proses yang menjalankan worker: proses yang cuma enqueue
+        # (scrape.py --no-jobs) tidak pernah menyentuh job running
+        self.recover()
+        t = threading.Thread(target=self._heartbeat, name="job-heartbeat", daemon=True)
+        t.start()
+        self._threads.append(t)
+        for job_type, limit in self._limits.items():
+            for i in range(limit):
+                t = threading.Thread(target=self._worker, args=(job_type,), name=f"job-{job_type}-{i}", daemon=True)
+                t.start()
+                self._threads.append(t)
+
+    def pending_count(self):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status IN ('pending', 'running')"
+            ).fetchone()
+        return row[0]
+
+    def join(self, timeout=None):
+        """Tunggu sampai semua job pending selesai (dipakai mode one-shot). Return True jika kosong"""
+        deadline = None if timeout is None else datetime.datetime.now().timestamp() + timeout
+        with self._cond:
+            while True:
+                remaining = self._conn.execute(
+                    "SELECT COUNT(*) FROM jobs WHERE status = 'pending' AND job_type IN (%s)"
+                    % ",".join("?" * len(self._handlers)),
+                    list(self._handlers)
+                ).fetchone()[0]
+                if remaining == 0 and self._running == 0:
+                    return True
+                wait = 1.0
+                if deadline is not None:
+                    wait = min(wait, deadline - datetime.datetime.now().timestamp())
+                    if wait <= 0:
+                        return False
+                self._cond.wait(wait)
+
+    def stop(self):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        for t in self._threads:
+            t.join()
+        self._threads = []
+
+    def _heartbeat(self):
+        """Perpanjang lease job milik proses ini, dan ambil alih job proses lain yang sudah mati"""
+        interval = max(1.0, self.lease_seconds / 3)
+        while True:
+            with self._cond:
+                # Condition juga di-notify enqueue / job selesai: tunggu sampai jadwal berikutnya
+                deadline = time.monotonic() + interval
+                while not self._stopping and time.monotonic() < deadline:
+                    self._cond.wait(deadline - time.monotonic())
+                if self._stopping:
+                    return
+                self._conn.execute(
+                    "UPDATE jobs SET lease_until = ? WHERE status = 'running' AND owner = ?",
+                    (time.time() + self.lease_seconds, _owner())
+                )
+            self.recover()
+
+    def _claim(self, job_type):
+        """Ambil satu job pending secara atomik (aman juga untuk beberapa proses)"""
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = self._conn.execute(
+                "SELECT id, payload, attempts FROM jobs WHERE job_type = ? AND status = 'pending' ORDER BY id LIMIT 1",
+                (job_type,)
+            ).fetchone()
+            if row:
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'running', attempts = attempts + 1, owner = ?, lease_until = ?, "
+                    "updated_at = ? WHERE id = ?",
+                    (_owner(), time.time() + self.lease_seconds, _now(), row[0])
+                )
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        return row
+
+    def _worker(self, job_type):
+        handler = self._handlers[job_type]
+        while True:
+            with self._cond:
+                while True:
+                    if self._stopping:
+                        return
+                    row = self._claim(job_type)
+                    if row:
+                        self._running += 1
+                        break
+                    self._cond.wait(1.0)
+
+            job_id, payload, attempts = row
+            attempts += 1
+            status, error = "done", None
+            try:
+                handler(json.loads(payload))
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                status = "pending" if attempts < self.max_attempts else "failed"
+                print(f"❌ Job {job_type} #{job_id} gagal (attempt {attempts}/{self.max_attempts}): {error}")
+                traceback.print_exc()
+
+            with self._cond:
+                updated = self._conn.execute(
+                    "UPDATE jobs SET status = ?, last_error = ?, owner = NULL, lease_until = NULL, updated_at = ? "
+                    "WHERE id = ? AND owner = ?",
+                    (status, error, _now(), job_id, _owner())
+                ).rowcount
+                if not updated:
+                    print(f"⚠ Job {job_type} #{job_id} sudah diambil alih proses lain (lease habis)")
+                self._running -= 1
+                self._cond.notify_all()
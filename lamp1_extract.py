@@ -0,0 +1,244 @@
+import atexit
+import os
+import pickle
+import subprocess
+import sys
+import threading
+import traceback
+from pathlib import Path
+
+# API ekstraksi Lamp1 untuk scraper: memanggil extract_pdf() dari 5_persen/extract_bounding_box.py
+# dan mengembalikan ExtractionResult (baris KepemilikanRow + ExtractionStats), bukan exit code.
+# Di mode worker hasil dikirim sebagai dict/list biasa dan dibangun ulang dengan class ringan
+# di bawah, supaya proses scraper tidak perlu meng-import extract_bounding_box (fitz, numpy).
+#
+# Dua mode (EXTRACT_MODE):
+#   worker    - satu proses extractor yang tetap hidup (fitz/numpy/dotenv sudah di-import),
+#               dipakai ulang untuk semua PDF. Crash / PDF yang membuat extractor hang tidak
+#               ikut menjatuhkan scraper; worker dijalankan ulang otomatis. (default)
+#   inprocess - extract_pdf dipanggil langsung di proses scraper.
+#
+#   from lamp1_extract import extract
+#   result = extract(pdf_bytes, "20251217_lamp1.pdf")
+
+EXTRACT_DIR = Path(__file__).parent / "5_persen"
+EXTRACT_MODE = os.environ.get("EXTRACT_MODE", "worker")
+# Batas waktu satu PDF di worker sebelum worker dihentikan paksa (detik)
+EXTRACT_TIMEOUT = float(os.environ.get("EXTRACT_TIMEOUT", "600"))
+
+# extract_bounding_box.py meng-import conn.py dari folder yang sama
+if str(EXTRACT_DIR) not in sys.path:
+    sys.path.insert(0, str(EXTRACT_DIR))
+
+
+def _module():
+    import extract_bounding_box
+    return extract_bounding_box
+
+
+class ExtractionError(Exception):
+    """Ekstraksi gagal: PDF tidak bisa diproses, worker crash / timeout"""
+    retryable = False
+
+
+class ExtractionWorkerError(ExtractionError):
+    """Worker crash / timeout: bukan salah PDF-nya, job boleh dicoba ulang"""
+    retryable = True
+
+
+class KepemilikanRow:
+    """Baris hasil worker; atribut sama dengan KepemilikanRow di extract_bounding_box"""
+
+    def __init__(self, values):
+        self.__dict__.update(values)
+
+    def to_dict(self):
+        """Format payload upsert (percent_difference hanya ada jika bisa dihitung)"""
+        obj = {name: value for name, value in self.__dict__.items() if name != "percent_difference"}
+        if self.__dict__.get("percent_difference") is not None:
+            obj["percent_difference"] = self.percent_difference
+        return obj
+
+    def __repr__(self):
+        return f"KepemilikanRow(No={self.No!r}, kode={self.kode!r}, pemegang_saham={self.pemegang_saham!r})"
+
+
+class ExtractionStats:
+    """Statistik hasil worker; atribut sama dengan ExtractionStats di extract_bounding_box"""
+
+    def __init__(self, values):
+        self.__dict__.update(values)
+
+    def __repr__(self):
+        return "ExtractionStats(" + ", ".join(f"{k}={v!r}" for k, v in self.__dict__.items()) + ")"
+
+
+class ExtractionResult:
+    def __init__(self, file_name, tanggal, rows, all_rows, col_blocks, stats):
+        self.file_name = file_name
+        self.tanggal = tanggal
+        self.rows = rows
+        self.all_rows = all_rows
+        self.col_blocks = col_blocks
+        self.stats = stats
+
+    def __repr__(self):
+        return f"ExtractionResult({self.file_name!r}, tanggal={self.tanggal!r}, {self.stats!r})"
+
+
+def _plain(value):
+    """Ubah nilai jadi tipe bawaan Python (angka numpy -> int/float) supaya unpickle tidak butuh numpy"""
+    if isinstance(value, dict):
+        return {k: _plain(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain(v) for v in value]
+    if hasattr(value, "item"):
+        return value.item()
+    return value
+
+
+def result_to_plain(result):
+    """ExtractionResult extract_bounding_box -> dict berisi tipe bawaan saja (dikirim worker)"""
+    return {
+        "file_name": result.file_name,
+        "tanggal": result.tanggal,
+        "rows": [{name: _plain(getattr(row, name)) for name in row.__slots__} for row in result.rows],
+        "all_rows": _plain(result.all_rows),
+        "col_blocks": _plain(result.col_blocks),
+        "stats": _plain(vars(result.stats)),
+    }
+
+
+def result_from_plain(value):
+    """Kebalikan result_to_plain: bangun ExtractionResult ringan di proses scraper"""
+    return ExtractionResult(
+        value["file_name"],
+        value["tanggal"],
+        [KepemilikanRow(row) for row in value["rows"]],
+        value["all_rows"],
+        value["col_blocks"],
+        ExtractionStats(value["stats"]),
+    )
+
+
+def extract_inprocess(source, name=None, upsert=True):
+    module = _module()
+    try:
+        return module.extract_pdf(source, name, upsert=upsert)
+    except module.ExtractionError as e:
+        raise ExtractionError(str(e)) from e
+
+
+class ExtractionWorker:
+    """
+    Proses extractor yang tetap hidup. Request/response berupa pickle tipe bawaan (tuple,
+    dict, list) lewat stdin/stdout worker; print dari extractor diarahkan ke stderr (ikut
+    tampil di log scraper).
+    """
+
+    def __init__(self, timeout=EXTRACT_TIMEOUT):
+        self.timeout = timeout
+        self._proc = None
+        self._lock = threading.Lock()
+
+    def _start(self):
+        self._proc = subprocess.Popen(
+            [sys.executable, str(Path(__file__).resolve()), "--worker"],
+            cwd=str(EXTRACT_DIR),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+        )
+        print(f"🔧 Worker ekstraksi Lamp1 dijalankan (pid {self._proc.pid})")
+
+    def _stop(self):
+        proc, self._proc = self._proc, None
+        if proc is None:
+            return
+        try:
+            proc.stdin.close()
+        except OSError:
+            pass
+        try:
+            proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+
+    def extract(self, source, name=None, upsert=True):
+        """Sama seperti extract_pdf(), dijalankan di worker. Raise ExtractionError jika gagal"""
+        with self._lock:
+            if self._proc is None or self._proc.poll() is not None:
+                self._start()
+            proc = self._proc
+            # Worker yang hang melewati timeout dihentikan supaya pembacaan hasil tidak menunggu selamanya
+            timer = threading.Timer(self.timeout, proc.kill)
+            timer.start()
+            try:
+                pickle.dump((source, name, upsert), proc.stdin, protocol=pickle.HIGHEST_PROTOCOL)
+                proc.stdin.flush()
+                status, value = pickle.load(proc.stdout)
+            except (EOFError, OSError, pickle.UnpicklingError) as e:
+                self._stop()
+                if not timer.is_alive():
+                    raise ExtractionWorkerError(f"Worker ekstraksi melewati timeout {self.timeout:g} detik") from e
+                raise ExtractionWorkerError(f"Worker ekstraksi berhenti tiba-tiba: {e!r}") from e
+            finally:
+                timer.cancel()
+        if status == "ok":
+            return result_from_plain(value)
+        if status == "extraction_error":
+            raise ExtractionError(value)
+        raise ExtractionError(f"Error tak terduga di worker ekstraksi:\n{value}")
+
+    def close(self):
+        with self._lock:
+            self._stop()
+
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def get_worker():
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = ExtractionWorker()
+            atexit.register(_worker.close)
+        return _worker
+
+
+def extract(source, name=None, upsert=True, mode=None):
+    """Ekstrak PDF Lamp1 (path atau bytes). Return ExtractionResult, raise ExtractionError"""
+    if (mode or EXTRACT_MODE) == "inprocess":
+        return extract_inprocess(source, name, upsert)
+    return get_worker().extract(source, name, upsert)
+
+
+def _serve():
+    """Loop worker: baca (source, name, upsert) dari stdin, tulis (status, hasil) ke stdout"""
+    # stdout asli khusus untuk protokol; print() extractor diarahkan ke stderr
+    channel_out = os.fdopen(os.dup(sys.stdout.fileno()), "wb")
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    channel_in = sys.stdin.buffer
+    module = _module()
+    while True:
+        try:
+            source, name, upsert = pickle.load(channel_in)
+        except EOFError:
+            break
+        try:
+            response = ("ok", result_to_plain(module.extract_pdf(source, name, upsert=upsert)))
+        except module.ExtractionError as e:
+            response = ("extraction_error", str(e))
+        except Exception:
+            response = ("error", traceback.format_exc())
+        finally:
+            sys.stdout.flush()
+        pickle.dump(response, channel_out, protocol=pickle.HIGHEST_PROTOCOL)
+        channel_out.flush()
+        module.metrics.write_textfile("idx_extract")
+
+
+if __name__ == "__main__" and "--worker" in sys.argv:
+    _serve()
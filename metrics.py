@@ -0,0 +1,204 @@
+# Metrik durasi & jumlah per tahap pipeline:
+#   page_fetch -> pdf_download -> extract -> ocr_page -> groq -> supabase_write
+# Setiap event ditulis sebagai satu baris JSON ke METRICS_LOG (bisa dipakai lintas hari),
+# dan ringkasan proses saat ini ditulis ke file Prometheus textfile-collector
+# METRICS_DIR/<job>.prom (node_exporter --collector.textfile.directory).
+#
+# Laporan p50/p95 per tahap per hari dari log JSON:
+#   python metrics.py
+#   python metrics.py --days 14 --stage page_fetch
+import argparse
+import datetime
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).parent
+METRICS_LOG = Path(os.environ.get("METRICS_LOG", ROOT / "metrics.jsonl"))
+METRICS_DIR = Path(os.environ.get("METRICS_DIR", ROOT / "metrics"))
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1") != "0"
+
+# Batas bucket histogram durasi (detik)
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+_lock = threading.Lock()
+_stats = {}  # stage -> {"count", "errors", "seconds", "buckets", "values"}
+
+
+def record(stage, seconds, ok=True, **values):
+    """Catat satu event tahap pipeline. Nilai angka di `values` ikut dijumlahkan (bytes, rows, tokens...)"""
+    if not METRICS_ENABLED:
+        return
+    event = {
+        "ts": datetime.datetime.now().isoformat(timespec="milliseconds"),
+        "stage": stage,
+        "seconds": round(seconds, 4),
+        "ok": ok,
+        "pid": os.getpid(),
+    }
+    event.update(values)
+    line = json.dumps(event, ensure_ascii=False) + "\n"
+
+    with _lock:
+        stat = _stats.setdefault(stage, {
+            "count": 0, "errors": 0, "seconds": 0.0, "buckets": [0] * len(BUCKETS), "values": {}
+        })
+        stat["count"] += 1
+        stat["seconds"] += seconds
+        if not ok:
+            stat["errors"] += 1
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                stat["buckets"][i] += 1
+        for key, value in values.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                stat["values"][key] = stat["values"].get(key, 0) + value
+        try:
+            with open(METRICS_LOG, "a", encoding="utf-8") as f:
+                f.write(line)
+        except OSError as e:
+            print(f"⚠ Gagal menulis metrics log: {e}")
+
+
+class timed:
+    """
+    Context manager untuk mengukur satu tahap:
+        with metrics.timed("pdf_download", kind="lamp1") as m:
+            ...
+            m.values["bytes"] = len(content)
+    Event dicatat dengan ok=False jika blok raise exception.
+    """
+
+    def __init__(self, stage, **values):
+        self.stage = stage
+        self.values = dict(values)
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        record(self.stage, time.perf_counter() - self._start, ok=exc_type is None, **self.values)
+        return False
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"')
+
+
+def write_textfile(job="idx_scraper"):
+    """Tulis ringkasan metrik proses ini ke METRICS_DIR/<job>.prom (atomic rename)"""
+    if not METRICS_ENABLED:
+        return
+    with _lock:
+        stats = {stage: dict(stat, buckets=list(stat["buckets"]), values=dict(stat["values"]))
+                 for stage, stat in _stats.items()}
+
+    lines = [
+        "# HELP idx_pipeline_stage_seconds Durasi tahap pipeline (detik)",
+        "# TYPE idx_pipeline_stage_seconds histogram",
+    ]
+    for stage, stat in sorted(stats.items()):
+        for bound, count in zip(BUCKETS, stat["buckets"]):
+            lines.append(f'idx_pipeline_stage_seconds_bucket{{job="{job}",stage="{_label(stage)}",le="{bound}"}} {count}')
+        lines.append(f'idx_pipeline_stage_seconds_bucket{{job="{job}",stage="{_label(stage)}",le="+Inf"}} {stat["count"]}')
+        lines.append(f'idx_pipeline_stage_seconds_sum{{job="{job}",stage="{_label(stage)}"}} {stat["seconds"]:.6f}')
+        lines.append(f'idx_pipeline_stage_seconds_count{{job="{job}",stage="{_label(stage)}"}} {stat["count"]}')
+
+    lines += [
+        "# HELP idx_pipeline_stage_errors_total Jumlah event tahap yang gagal",
+        "# TYPE idx_pipeline_stage_errors_total counter",
+    ]
+    for stage, stat in sorted(stats.items()):
+        lines.append(f'idx_pipeline_stage_errors_total{{job="{job}",stage="{_label(stage)}"}} {stat["errors"]}')
+
+    lines += [
+        "# HELP idx_pipeline_stage_items_total Jumlah item per tahap (bytes, rows, pages, tokens, ...)",
+        "# TYPE idx_pipeline_stage_items_total counter",
+    ]
+    for stage, stat in sorted(stats.items()):
+        for item, total in sorted(stat["values"].items()):
+            lines.append(f'idx_pipeline_stage_items_total{{job="{job}",stage="{_label(stage)}",item="{_label(item)}"}} {total}')
+
+    lines += [
+        "# HELP idx_pipeline_last_write_timestamp_seconds Waktu file metrik ini terakhir ditulis",
+        "# TYPE idx_pipeline_last_write_timestamp_seconds gauge",
+        f'idx_pipeline_last_write_timestamp_seconds{{job="{job}"}} {time.time():.0f}',
+    ]
+
+    try:
+        METRICS_DIR.mkdir(parents=True, exist_ok=True)
+        path = METRICS_DIR / f"{job}.prom"
+        tmp = path.with_suffix(f".prom.{os.getpid()}.tmp")
+        tmp.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        os.replace(tmp, path)
+    except OSError as e:
+        print(f"⚠ Gagal menulis file metrik Prometheus: {e}")
+
+
+def percentile(sorted_values, q):
+    """Persentil (interpolasi linear) dari list yang sudah terurut"""
+    if not sorted_values:
+        return 0.0
+    pos = (len(sorted_values) - 1) * q
+    low = int(pos)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (pos - low)
+
+
+def load_events(log_path=METRICS_LOG, since=None):
+    events = []
+    if not Path(log_path).exists():
+        return events
+    with open(log_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue
+            if since and event.get("ts", "") < since:
+                continue
+            events.append(event)
+    return events
+
+
+def report(days=7, stage=None, log_path=METRICS_LOG):
+    since = (datetime.date.today() - datetime.timedelta(days=days - 1)).isoformat()
+    groups = {}
+    for event in load_events(log_path, since):
+        if stage and event.get("stage") != stage:
+            continue
+        groups.setdefault((event["ts"][:10], event["stage"]), []).append(event)
+
+    if not groups:
+        print(f"Tidak ada event metrik sejak {since} di {log_path}")
+        return
+
+    print(f"{'tanggal':<10}  {'tahap':<22} {'n':>6} {'err':>5} {'p50 (s)':>9} {'p95 (s)':>9} {'max (s)':>9}  total")
+    for (day, stage_name), events in sorted(groups.items()):
+        durations = sorted(e["seconds"] for e in events)
+        errors = sum(1 for e in events if not e.get("ok", True))
+        totals = {}
+        for e in events:
+            for key, value in e.items():
+                if key in ("seconds", "pid") or isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                totals[key] = totals.get(key, 0) + value
+        totals_text = ", ".join(f"{k}={v:g}" for k, v in sorted(totals.items()))
+        print(f"{day:<10}  {stage_name:<22} {len(events):>6} {errors:>5} "
+              f"{percentile(durations, 0.5):>9.3f} {percentile(durations, 0.95):>9.3f} {durations[-1]:>9.3f}  {totals_text}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Laporan p50/p95 per tahap pipeline dari metrics log")
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--stage", help="Hanya tampilkan satu tahap")
+    parser.add_argument("--log", default=str(METRICS_LOG))
+    args = parser.parse_args()
+    report(args.days, args.stage, args.log)
+
+
+if __name__ == "__main__":
+    main()
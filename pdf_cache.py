@@ -0,0 +1,257 @@
+import hashlib
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import metrics
+
+try:
+    import fcntl
+except ImportError:  # Windows: lock antar proses tidak tersedia, lock thread tetap dipakai
+    fcntl = None
+
+# Cache PDF di disk yang dipakai bersama semua downloader (Lamp1, summarization,
+# 5_persen/fetch.py, test_download_pdf.py). Isi file disimpan berdasarkan sha256
+# (objects/ab/<sha256>.pdf) sehingga attachment yang sama hanya tersimpan sekali.
+# Index (FullSavePath, attachment Id) -> sha256 dan waktu akses terakhir ada di SQLite.
+# Total ukuran dibatasi PDF_CACHE_MAX_BYTES; object yang paling lama tidak dipakai
+# dihapus lebih dulu (LRU). File lock (fcntl) menjaga supaya beberapa proses / run
+# yang berjalan bersamaan tidak mendownload URL yang sama dua kali.
+# Hanya PDF utuh yang masuk cache: header %PDF harus ada dan ukuran harus sama dengan
+# Content-Length jika diketahui (halaman HTML challenge / body terpotong ditolak).
+
+DEFAULT_CACHE_DIR = Path(os.environ.get("PDF_CACHE_DIR", Path(__file__).parent / "pdf_cache"))
+DEFAULT_MAX_BYTES = int(os.environ.get("PDF_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)))
+# Header %PDF- boleh didahului sampah, asal di dalam 1024 byte pertama (toleransi pembaca PDF)
+PDF_HEADER_WINDOW = 1024
+
+
+class InvalidPdf(ValueError):
+    """Hasil download bukan PDF utuh; tidak disimpan ke cache"""
+    retryable = True
+
+
+def is_pdf(content):
+    return b"%PDF-" in content[:PDF_HEADER_WINDOW]
+
+
+def validate_pdf(content, expected_size=None):
+    """Raise InvalidPdf jika content tanpa header %PDF atau ukurannya beda dari Content-Length"""
+    if expected_size is not None and len(content) != expected_size:
+        raise InvalidPdf(f"ukuran {len(content)} byte, Content-Length {expected_size} byte")
+    if not is_pdf(content):
+        raise InvalidPdf(f"bukan PDF (diawali {bytes(content[:16])!r})")
+
+
+class PdfCache:
+    def __init__(self, root=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        (self.root / "objects").mkdir(parents=True, exist_ok=True)
+        (self.root / "locks").mkdir(exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.root / "index.sqlite3"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        with self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS cache_keys (
+                    url TEXT NOT NULL,
+                    attachment_id TEXT NOT NULL DEFAULT '',
+                    sha256 TEXT NOT NULL,
+                    PRIMARY KEY (url, attachment_id)
+                )
+            """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS cache_objects (
+                    sha256 TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_lru ON cache_objects (last_access)")
+
+    def _object_path(self, sha256):
+        return self.root / "objects" / sha256[:2] / f"{sha256}.pdf"
+
+    @contextmanager
+    def _file_lock(self, name):
+        """Lock eksklusif antar proses (dan antar thread) berdasarkan nama"""
+        path = self.root / "locks" / (hashlib.sha1(name.encode("utf-8")).hexdigest() + ".lock")
+        with open(path, "a") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def staging_path(self, url):
+        """
+        Path file sementara untuk download url sebelum masuk cache. Sisa <path>.part dari
+        run yang terputus tetap di sini dan dilanjutkan (Range) oleh download berikutnya.
+        """
+        staging = self.root / "staging"
+        staging.mkdir(exist_ok=True)
+        return staging / (hashlib.sha1(url.encode("utf-8")).hexdigest() + ".pdf")
+
+    def _lookup(self, url, attachment_id=None):
+        """sha256 untuk url (dan Id jika diberikan), atau None"""
+        with self._lock:
+            if attachment_id is None:
+                row = self._conn.execute("SELECT sha256 FROM cache_keys WHERE url = ?", (url,)).fetchone()
+            else:
+                row = self._conn.execute(
+                    "SELECT sha256 FROM cache_keys WHERE url = ? AND attachment_id = ?", (url, str(attachment_id))
+                ).fetchone()
+        return row[0] if row else None
+
+    def _touch(self, sha256):
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE cache_objects SET last_access = ? WHERE sha256 = ?", (time.time(), sha256))
+
+    def _forget(self, sha256):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM cache_keys WHERE sha256 = ?", (sha256,))
+            self._conn.execute("DELETE FROM cache_objects WHERE sha256 = ?", (sha256,))
+
+    def path_for(self, url, attachment_id=None):
+        """Path file cache untuk url, atau None jika belum ada. Dihitung sebagai akses (LRU)"""
+        sha256 = self._lookup(url, attachment_id)
+        if sha256 is None:
+            return None
+        path = self._object_path(sha256)
+        if not path.exists():
+            # Sudah di-evict proses lain
+            self._forget(sha256)
+            return None
+        self._touch(sha256)
+        return path
+
+    def get(self, url, attachment_id=None):
+        """Isi PDF dari cache, atau None"""
+        path = self.path_for(url, attachment_id)
+        if path is None:
+            return None
+        try:
+            content = path.read_bytes()
+        except FileNotFoundError:
+            return None
+        if not is_pdf(content):
+            # Entry lama dari sebelum validasi: buang supaya didownload ulang
+            print(f"⚠ PDF cache: object {path.stem[:12]} bukan PDF, dibuang")
+            path.unlink(missing_ok=True)
+            self._forget(path.stem)
+            return None
+        return content
+
+    def put(self, url, content, attachment_id=None):
+        """Simpan isi PDF untuk url. Return sha256"""
+        sha256 = hashlib.sha256(content).hexdigest()
+        path = self._object_path(sha256)
+        with self._file_lock("__store__"):
+            if not path.exists():
+                path.parent.mkdir(exist_ok=True)
+                tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+                tmp.write_bytes(content)
+                os.replace(tmp, path)
+            with self._lock, self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO cache_objects (sha256, size, last_access) VALUES (?, ?, ?)",
+                    (sha256, len(content), time.time())
+                )
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO cache_keys (url, attachment_id, sha256) VALUES (?, ?, ?)",
+                    (url, "" if attachment_id is None else str(attachment_id), sha256)
+                )
+            self._evict(keep=sha256)
+        return sha256
+
+    def _evict(self, keep=None):
+        """Hapus object paling lama tidak dipakai sampai total ukuran <= max_bytes"""
+        with self._lock:
+            total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache_objects").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            candidates = self._conn.execute(
+                "SELECT sha256, size FROM cache_objects ORDER BY last_access"
+            ).fetchall()
+        for sha256, size in candidates:
+            if total <= self.max_bytes:
+                break
+            if sha256 == keep:
+                continue
+            try:
+                self._object_path(sha256).unlink()
+            except FileNotFoundError:
+                pass
+            self._forget(sha256)
+            total -= size
+            print(f"🧹 PDF cache: evict {sha256[:12]} ({size} bytes)")
+
+    def fetch(self, url, download, attachment_id=None):
+        """
+        Isi PDF untuk url: dari cache jika ada, jika tidak panggil download() -> bytes
+        (atau (bytes, Content-Length)) lalu simpan setelah lolos validate_pdf. Proses lain
+        yang meminta url yang sama menunggu download ini selesai. Return (content, hit).
+        """
+        start = time.perf_counter()
+        content = self.get(url, attachment_id)
+        if content is None:
+            with self._file_lock(url):
+                content = self.get(url, attachment_id)
+                if content is None:
+                    content, expected_size = download(), None
+                    if isinstance(content, tuple):
+                        content, expected_size = content
+                    validate_pdf(content, expected_size)
+                    self.put(url, content, attachment_id)
+                    metrics.record("pdf_cache", time.perf_counter() - start, miss=1, bytes=len(content))
+                    return content, False
+        metrics.record("pdf_cache", time.perf_counter() - start, hit=1, bytes=len(content))
+        return content, True
+
+    def fetch_to(self, url, dest, download, attachment_id=None):
+        """
+        Seperti fetch(), tapi salin hasilnya ke file `dest` (tulis ke file sementara lalu
+        rename atomik, jadi `dest` tidak pernah berisi PDF terpotong). Return (dest, hit)
+        """
+        content, hit = self.fetch(url, download, attachment_id)
+        dest = Path(dest)
+        tmp = dest.with_name(f".{dest.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        source = self.path_for(url, attachment_id)
+        try:
+            if source is not None:
+                shutil.copyfile(source, tmp)
+            else:
+                tmp.write_bytes(content)
+            os.replace(tmp, dest)
+        finally:
+            if tmp.exists():
+                tmp.unlink()
+        return dest, hit
+
+    def stats(self):
+        with self._lock:
+            count, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache_objects"
+            ).fetchone()
+        return {"objects": count, "bytes": total, "max_bytes": self.max_bytes}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Cache bersama untuk proses ini (dibuat saat pertama dipakai)"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = PdfCache()
+        return _cache
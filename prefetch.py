@@ -0,0 +1,75 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from pdf_cache import get_cache
+
+# Prefetch spekulatif attachment: begitu satu page GetAnnouncement datang, semua PDF
+# yang akan dibutuhkan route (Lamp1 / summary) langsung didownload paralel ke cache PDF
+# dengan pool terbatas. Handler yang memprosesnya nanti cukup menunggu download yang
+# sedang berjalan (wait) lalu membaca dari cache, tanpa memulai download baru.
+# Proses lain yang meminta URL yang sama ikut menunggu lewat file lock pdf_cache.
+# shutdown(cancel=True) membatalkan prefetch yang belum mulai dan memberi sinyal stop
+# (stop_event) ke download yang sedang berjalan supaya tidak retry / menunggu rate limit.
+
+
+class Prefetcher:
+    def __init__(self, download, max_workers=4):
+        """download(url, stop_event) -> bytes, dipanggil hanya jika PDF belum ada di cache"""
+        self.download = download
+        self.max_workers = max_workers
+        self.stop_event = threading.Event()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prefetch") if max_workers > 0 else None
+        self._lock = threading.Lock()
+        self._inflight = {}  # (url, attachment_id) -> Future
+
+    def _fetch(self, url, attachment_id):
+        _, hit = get_cache().fetch(url, lambda: self.download(url, self.stop_event), attachment_id=attachment_id)
+        return hit
+
+    def prefetch(self, url, attachment_id=None):
+        """Mulai download di background (tidak memblokir). Return False jika prefetch nonaktif"""
+        if not url:
+            return False
+        key = (url, attachment_id)
+        with self._lock:
+            if self._executor is None:
+                return False
+            if key in self._inflight:
+                return True
+            # Buang prefetch yang sudah selesai tapi tidak pernah di-wait (hasilnya tetap di cache)
+            for done_key in [k for k, future in self._inflight.items() if future.done()]:
+                del self._inflight[done_key]
+            self._inflight[key] = self._executor.submit(self._fetch, url, attachment_id)
+        return True
+
+    def wait(self, url, attachment_id=None, timeout=None):
+        """
+        Tunggu prefetch url ini selesai (jika ada). Return True jika PDF sudah ada di cache.
+        Error prefetch tidak di-raise: handler akan download sendiri dengan retry-nya.
+        """
+        with self._lock:
+            future = self._inflight.pop((url, attachment_id), None)
+        if future is None:
+            return False
+        try:
+            future.result(timeout=timeout)
+            return True
+        except Exception as e:
+            print(f"⚠ Prefetch gagal ({url}): {e}")
+            return False
+
+    def pending(self):
+        with self._lock:
+            return sum(1 for future in self._inflight.values() if not future.done())
+
+    def shutdown(self, wait=True, cancel=False):
+        """Hentikan pool; prefetch() berikutnya tidak melakukan apa-apa"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+            if cancel:
+                self.stop_event.set()
+                cancelled = sum(1 for future in self._inflight.values() if future.cancel())
+                if cancelled:
+                    print(f"⏹ {cancelled} prefetch dibatalkan")
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=cancel)
@@ -0,0 +1,494 @@
+# Fixture record/replay dan server pengganti IDX (+ Supabase REST) untuk benchmark
+# dan uji regresi crawler tanpa menyentuh idx.co.id maupun Supabase.
+#
+# Layout fixture:
+#   fixtures/<nama>/meta.json          info rekaman
+#   fixtures/<nama>/pages/0000.json    balasan GetAnnouncement mentah per page
+#   fixtures/<nama>/files/<sha256>.pdf isi attachment
+#   fixtures/<nama>/files/index.json   FullSavePath asli -> nama file
+#
+# Contoh:
+#   python replay.py record --date 2025-12-01 --out fixtures/2025-12-01 --with-pdfs
+#   python replay.py synth --out fixtures/synthetic --announcements 300
+#   python replay.py serve --fixtures fixtures/synthetic --port 8765 --latency 0.05 --error-rate 0.1
+#   IDX_BASE_URL=http://127.0.0.1:8765 SUPABASE_URL=http://127.0.0.1:8765 python scrape.py --no-jobs
+import argparse
+import datetime
+import hashlib
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+ANNOUNCEMENT_PATH = "/primary/ListedCompany/GetAnnouncement"
+CHALLENGE_HTML = b"<html><head><title>Just a moment...</title></head><body>cf-chl</body></html>"
+
+
+# --- Fixture ---
+
+def load_fixtures(fixtures_dir):
+    """Return (daftar semua reply berurutan, {nama file: bytes}, {FullSavePath asli: nama file})"""
+    fixtures_dir = Path(fixtures_dir)
+    replies = []
+    for page_path in sorted((fixtures_dir / "pages").glob("*.json")):
+        replies.extend(json.loads(page_path.read_text(encoding="utf-8")).get("Replies", []))
+    files = {}
+    index = {}
+    files_dir = fixtures_dir / "files"
+    if files_dir.exists():
+        index_path = files_dir / "index.json"
+        if index_path.exists():
+            index = json.loads(index_path.read_text(encoding="utf-8"))
+        for path in files_dir.glob("*.pdf"):
+            files[path.name] = path.read_bytes()
+    return replies, files, index
+
+
+def save_file(files_dir, index, original_url, content):
+    name = hashlib.sha256(content).hexdigest() + ".pdf"
+    (files_dir / name).write_bytes(content)
+    index[original_url] = name
+    return name
+
+
+def record(date, out_dir, max_pages=None, with_pdfs=False, page_size=10):
+    """Rekam balasan GetAnnouncement (dan attachment) satu tanggal dari IDX asli"""
+    from transport import AdaptiveTransport, IDX_BASE
+    from retry_helper import host_of, retry_call
+    import cloudscraper
+
+    out_dir = Path(out_dir)
+    (out_dir / "pages").mkdir(parents=True, exist_ok=True)
+    files_dir = out_dir / "files"
+    files_dir.mkdir(exist_ok=True)
+
+    url = f"{IDX_BASE}{ANNOUNCEMENT_PATH}"
+    day = date.strftime("%Y%m%d")
+    transport = AdaptiveTransport()
+    scraper = cloudscraper.create_scraper()
+    index = {}
+    pages = 0
+    try:
+        while max_pages is None or pages < max_pages:
+            params = {"kodeEmiten": "*", "emitenType": "*", "indexFrom": pages, "pageSize": page_size,
+                      "dateFrom": day, "dateTo": day, "lang": "id", "keyword": ""}
+            data, _ = retry_call(lambda: transport.get_json(url, params=params, timeout=15),
+                                 host=host_of(url), label=f"Record page {pages}")
+            (out_dir / "pages" / f"{pages:04d}.json").write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+            replies = data.get("Replies", [])
+            print(f"📼 Page {pages}: {len(replies)} pengumuman")
+            pages += 1
+            if not replies:
+                break
+            if with_pdfs:
+                for item in replies:
+                    for att in item.get("attachments", []):
+                        pdf_url = att.get("FullSavePath")
+                        if not pdf_url or pdf_url in index:
+                            continue
+                        def download():
+                            resp = scraper.get(pdf_url, timeout=60)
+                            resp.raise_for_status()
+                            return resp.content
+                        try:
+                            save_file(files_dir, index, pdf_url, retry_call(download, host=host_of(pdf_url)))
+                        except Exception as e:
+                            print(f"⚠ Gagal merekam {pdf_url}: {e}")
+    finally:
+        transport.close()
+
+    (files_dir / "index.json").write_text(json.dumps(index, indent=2), encoding="utf-8")
+    (out_dir / "meta.json").write_text(json.dumps({
+        "source": "idx", "date": date.isoformat(), "pages": pages, "page_size": page_size,
+        "files": len(index), "recorded_at": datetime.datetime.now().isoformat(timespec="seconds"),
+    }, indent=2), encoding="utf-8")
+    print(f"✔ Fixture tersimpan di {out_dir} ({pages} page, {len(index)} file)")
+
+
+def minimal_pdf(text):
+    """PDF satu halaman berisi `text` (cukup untuk PyMuPDF / pdfplumber)"""
+    text = text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+    stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode("latin-1", "replace")
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R "
+        b"/Resources << /Font << /F1 5 0 R >> >> >>",
+        b"<< /Length " + str(len(stream)).encode() + b" >>\nstream\n" + stream + b"\nendstream",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, obj in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f"{i} 0 obj\n".encode() + obj + b"\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    for offset in offsets:
+        out += f"{offset:010d} 00000 n \n".encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return bytes(out)
+
+
+SYNTH_TITLES = [
+    "Laporan Informasi atau Fakta Material",
+    "Pemberitahuan Rencana Rapat Umum Pemegang Saham",
+    "Penyampaian Bukti Iklan",
+    "Laporan Kepemilikan Saham 5% atau Lebih",
+    "Jadwal Pembagian Dividen Tunai",
+    "Penjelasan atas Volatilitas Transaksi",
+    "Perubahan Pengurus Perseroan",
+    "Laporan Bulanan Registrasi Pemegang Efek",
+]
+
+
+def synth(out_dir, announcements=300, page_size=10, date=None, seed=1):
+    """Buat fixture sintetis (tanpa jaringan) dengan campuran judul yang memicu semua route"""
+    rng = random.Random(seed)
+    date = date or datetime.date.today()
+    out_dir = Path(out_dir)
+    (out_dir / "pages").mkdir(parents=True, exist_ok=True)
+    files_dir = out_dir / "files"
+    files_dir.mkdir(exist_ok=True)
+    index = {}
+
+    start = datetime.datetime.combine(date, datetime.time(23, 59, 0))
+    replies = []
+    for i in range(announcements):
+        kode = "".join(rng.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZ") for _ in range(4))
+        title = f"{rng.choice(SYNTH_TITLES)} {kode}"
+        tanggal = (start - datetime.timedelta(seconds=37 * i)).strftime("%Y-%m-%dT%H:%M:%S")
+        attachments = []
+        for j, suffix in enumerate(["", "_lamp1"]):
+            original_url = f"https://www.idx.co.id/StaticData/synthetic/{i:05d}{suffix}.pdf"
+            save_file(files_dir, index, original_url, minimal_pdf(f"{title} lampiran {j}"))
+            attachments.append({"Id": i * 10 + j, "OriginalFilename": f"{i:05d}{suffix}.pdf", "FullSavePath": original_url})
+        replies.append({
+            "pengumuman": {"NoPengumuman": f"SYN-{i:05d}", "TglPengumuman": tanggal, "JudulPengumuman": title,
+                           "JenisPengumuman": "Umum", "Kode_Emiten": kode + " "},
+            "attachments": attachments,
+        })
+
+    pages = 0
+    for pages, start_index in enumerate(range(0, len(replies), page_size)):
+        page = {"ResultCount": len(replies), "Replies": replies[start_index:start_index + page_size]}
+        (out_dir / "pages" / f"{pages:04d}.json").write_text(json.dumps(page, ensure_ascii=False), encoding="utf-8")
+    (files_dir / "index.json").write_text(json.dumps(index, indent=2), encoding="utf-8")
+    (out_dir / "meta.json").write_text(json.dumps({
+        "source": "synthetic", "date": date.isoformat(), "announcements": announcements,
+        "page_size": page_size, "seed": seed,
+    }, indent=2), encoding="utf-8")
+    print(f"✔ Fixture sintetis tersimpan di {out_dir} ({announcements} pengumuman)")
+    return out_dir
+
+
+# --- Server pengganti ---
+
+class StandinState:
+    """Data fixture, tabel Supabase di memory, konfigurasi gangguan dan statistik"""
+
+    def __init__(self, fixtures_dir, latency=0.0, jitter=0.0, error_rate=0.0, throttle_rate=0.0,
+                 timeout_rate=0.0, hang_seconds=20.0, seed=None):
+        self.replies, self.files, self.file_index = load_fixtures(fixtures_dir)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.timeout_rate = timeout_rate
+        self.hang_seconds = hang_seconds
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.tables = {}
+        self.started_at = time.monotonic()
+        self.stats = {"requests": 0, "pages": 0, "files": 0, "injected_403": 0, "injected_429": 0,
+                      "injected_timeout": 0, "rows_inserted": 0, "first_insert_at": None, "rest_calls": 0}
+
+    def count(self, key, n=1):
+        with self.lock:
+            self.stats[key] += n
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.stats)
+
+    def fault(self):
+        """Pilih gangguan untuk satu request IDX: None, '403', '429' atau 'timeout'"""
+        with self.lock:
+            roll = self.rng.random()
+        if roll < self.error_rate:
+            return "403"
+        roll -= self.error_rate
+        if roll < self.throttle_rate:
+            return "429"
+        roll -= self.throttle_rate
+        if roll < self.timeout_rate:
+            return "timeout"
+        return None
+
+
+def _match_filter(value, expression):
+    op, _, operand = expression.partition(".")
+    value = "" if value is None else str(value)
+    if op == "eq":
+        return value == operand
+    if op == "gte":
+        return value >= operand
+    if op == "gt":
+        return value > operand
+    if op == "lte":
+        return value <= operand
+    if op == "lt":
+        return value < operand
+    return True
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    state = None  # diisi oleh StandinServer
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body=b"", content_type="application/json", headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _send_json(self, status, data, headers=None):
+        self._send(status, json.dumps(data, ensure_ascii=False).encode("utf-8"), headers=headers)
+
+    def _idx_delay_and_fault(self):
+        """Latency + gangguan untuk endpoint IDX. Return True jika balasan sudah dikirim"""
+        state = self.state
+        delay = state.latency + (state.rng.uniform(0, state.jitter) if state.jitter else 0)
+        if delay:
+            time.sleep(delay)
+        fault = state.fault()
+        if fault == "403":
+            state.count("injected_403")
+            self._send(403, CHALLENGE_HTML, content_type="text/html")
+            return True
+        if fault == "429":
+            state.count("injected_429")
+            self._send_json(429, {"message": "Too Many Requests"}, headers={"Retry-After": "1"})
+            return True
+        if fault == "timeout":
+            state.count("injected_timeout")
+            time.sleep(state.hang_seconds)
+        return False
+
+    def do_GET(self):
+        state = self.state
+        state.count("requests")
+        parsed = urlparse(self.path)
+        query = parse_qs(parsed.query)
+
+        if parsed.path == "/__stats":
+            return self._send_json(200, state.snapshot())
+        if parsed.path.startswith("/rest/v1/"):
+            return self._rest_select(parsed.path.rsplit("/", 1)[-1], query)
+        if parsed.path in ("/", ""):
+            return self._send(200, b"<html><body>IDX stand-in</body></html>", content_type="text/html")
+
+        if parsed.path == ANNOUNCEMENT_PATH:
+            if self._idx_delay_and_fault():
+                return
+            state.count("pages")
+            index_from = int(query.get("indexFrom", ["0"])[0])
+            page_size = int(query.get("pageSize", ["10"])[0])
+            replies = state.replies[index_from * page_size:(index_from + 1) * page_size]
+            return self._send_json(200, {"ResultCount": len(state.replies), "Replies": self._rewrite(replies)})
+
+        if parsed.path.startswith("/files/"):
+            if self._idx_delay_and_fault():
+                return
+            content = state.files.get(parsed.path.rsplit("/", 1)[-1])
+            if content is None:
+                return self._send(404, b"not found", content_type="text/plain")
+            state.count("files")
+            return self._send(200, content, content_type="application/pdf")
+
+        self._send(404, b"not found", content_type="text/plain")
+
+    def _rewrite(self, replies):
+        """Arahkan FullSavePath yang ada di fixture ke server ini"""
+        base = f"http://{self.headers.get('Host')}"
+        out = []
+        for item in replies:
+            attachments = []
+            for att in item.get("attachments", []):
+                name = self.state.file_index.get(att.get("FullSavePath"))
+                attachments.append(dict(att, FullSavePath=f"{base}/files/{name}") if name else att)
+            out.append(dict(item, attachments=attachments))
+        return out
+
+    # --- Supabase PostgREST minimal (select / upsert / update) ---
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"null") if length else None
+
+    def _filters(self, query):
+        return [(key, expr) for key, values in query.items()
+                if key not in ("select", "on_conflict", "columns", "order", "limit", "offset") for expr in values]
+
+    def _rest_select(self, table, query):
+        state = self.state
+        state.count("rest_calls")
+        filters = self._filters(query)
+        columns = [c.strip() for c in query.get("select", ["*"])[0].split(",")]
+        with state.lock:
+            rows = [row for row in state.tables.get(table, [])
+                    if all(_match_filter(row.get(key), expr) for key, expr in filters)]
+        if columns != ["*"]:
+            rows = [{c: row.get(c) for c in columns} for row in rows]
+        self._send_json(200, rows)
+
+    def do_POST(self):
+        state = self.state
+        state.count("requests")
+        parsed = urlparse(self.path)
+        if not parsed.path.startswith("/rest/v1/"):
+            return self._send(404, b"not found", content_type="text/plain")
+        state.count("rest_calls")
+        table = parsed.path.rsplit("/", 1)[-1]
+        query = parse_qs(parsed.query)
+        body = self._read_body()
+        rows = body if isinstance(body, list) else [body]
+        prefer = self.headers.get("Prefer", "")
+        conflict = query.get("on_conflict", [""])[0].split(",") if query.get("on_conflict") else []
+
+        inserted = []
+        with state.lock:
+            existing = state.tables.setdefault(table, [])
+            keys = {tuple(row.get(c) for c in conflict): row for row in existing} if conflict else {}
+            for row in rows:
+                key = tuple(row.get(c) for c in conflict) if conflict else None
+                if key is not None and key in keys:
+                    if "ignore-duplicates" not in prefer:
+                        keys[key].update(row)
+                    continue
+                existing.append(dict(row))
+                if key is not None:
+                    keys[key] = existing[-1]
+                inserted.append(row)
+            state.stats["rows_inserted"] += len(inserted)
+            if inserted and state.stats["first_insert_at"] is None:
+                state.stats["first_insert_at"] = time.monotonic() - state.started_at
+        self._send_json(201, inserted if "return=representation" in prefer else [])
+
+    def do_PATCH(self):
+        state = self.state
+        state.count("requests")
+        parsed = urlparse(self.path)
+        if not parsed.path.startswith("/rest/v1/"):
+            return self._send(404, b"not found", content_type="text/plain")
+        state.count("rest_calls")
+        table = parsed.path.rsplit("/", 1)[-1]
+        filters = self._filters(parse_qs(parsed.query))
+        update = self._read_body() or {}
+        updated = []
+        with state.lock:
+            for row in state.tables.get(table, []):
+                if all(_match_filter(row.get(key), expr) for key, expr in filters):
+                    row.update(update)
+                    updated.append(dict(row))
+        self._send_json(200, updated if "return=representation" in self.headers.get("Prefer", "") else [])
+
+    do_HEAD = do_GET
+
+
+class _QuietHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Client yang memutus koneksi (timeout yang disengaja) bukan error server
+        if isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            return
+        super().handle_error(request, client_address)
+
+
+class StandinServer:
+    """Server pengganti IDX + Supabase REST di thread background"""
+
+    def __init__(self, fixtures_dir, host="127.0.0.1", port=0, **options):
+        self.state = StandinState(fixtures_dir, **options)
+        handler = type("BoundStandinHandler", (StandinHandler,), {"state": self.state})
+        self.httpd = _QuietHTTPServer((host, port), handler)
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.state.started_at = time.monotonic()
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="idx-standin", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fixture record/replay dan server pengganti IDX")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    rec = sub.add_parser("record", help="Rekam GetAnnouncement (dan PDF) dari IDX asli")
+    rec.add_argument("--date", type=datetime.date.fromisoformat, default=datetime.date.today())
+    rec.add_argument("--out", required=True)
+    rec.add_argument("--max-pages", type=int)
+    rec.add_argument("--with-pdfs", action="store_true")
+
+    syn = sub.add_parser("synth", help="Buat fixture sintetis tanpa jaringan")
+    syn.add_argument("--out", required=True)
+    syn.add_argument("--announcements", type=int, default=300)
+    syn.add_argument("--seed", type=int, default=1)
+
+    srv = sub.add_parser("serve", help="Jalankan server pengganti dari fixture")
+    srv.add_argument("--fixtures", required=True)
+    srv.add_argument("--host", default="127.0.0.1")
+    srv.add_argument("--port", type=int, default=8765)
+    srv.add_argument("--latency", type=float, default=0.0, help="Latency dasar per request IDX (detik)")
+    srv.add_argument("--jitter", type=float, default=0.0, help="Tambahan latency acak 0..jitter detik")
+    srv.add_argument("--error-rate", type=float, default=0.0, help="Peluang balasan 403 challenge Cloudflare")
+    srv.add_argument("--throttle-rate", type=float, default=0.0, help="Peluang balasan 429 + Retry-After")
+    srv.add_argument("--timeout-rate", type=float, default=0.0, help="Peluang request menggantung --hang-seconds")
+    srv.add_argument("--hang-seconds", type=float, default=20.0)
+    srv.add_argument("--seed", type=int)
+
+    args = parser.parse_args()
+    if args.command == "record":
+        record(args.date, args.out, args.max_pages, args.with_pdfs)
+    elif args.command == "synth":
+        synth(args.out, args.announcements, seed=args.seed)
+    else:
+        server = StandinServer(
+            args.fixtures, args.host, args.port, latency=args.latency, jitter=args.jitter,
+            error_rate=args.error_rate, throttle_rate=args.throttle_rate, timeout_rate=args.timeout_rate,
+            hang_seconds=args.hang_seconds, seed=args.seed,
+        )
+        print(f"🛰 Server pengganti IDX di {server.base_url} ({len(server.state.replies)} pengumuman)")
+        print(f"   IDX_BASE_URL={server.base_url} SUPABASE_URL={server.base_url}")
+        try:
+            server.httpd.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
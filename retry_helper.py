@@ -0,0 +1,315 @@
+import json
+import os
+import random
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlparse
+from email.utils import parsedate_to_datetime
+
+import requests
+
+# Retry & rate limit bersama untuk semua request keluar (page IDX, download PDF,
+# upsert Supabase):
+#   - RetryPolicy    : exponential backoff + jitter, menghormati Retry-After (429/503)
+#   - TokenBucket    : batas request per detik per host
+#   - CircuitBreaker : setelah beberapa kegagalan beruntun host dianggap down dan
+#                      request langsung ditolak sampai cooldown selesai. Status "open"
+#                      disimpan di file supaya run cron berikutnya juga langsung skip.
+
+RETRY_STATUSES = {403, 408, 425, 429, 500, 502, 503, 504}
+DEFAULT_CIRCUIT_STATE_PATH = Path(os.environ.get("CIRCUIT_STATE_PATH", Path(__file__).parent / "circuit_state.json"))
+
+
+class CircuitOpenError(Exception):
+    """Host sedang dianggap down oleh circuit breaker"""
+
+    def __init__(self, host, retry_in):
+        super().__init__(f"Circuit breaker terbuka untuk {host}, coba lagi dalam {retry_in:.0f} detik")
+        self.host = host
+        self.retry_in = retry_in
+
+
+class RetryPolicy:
+    def __init__(self, max_attempts=4, base_delay=1.0, max_delay=60.0, max_retry_after=120.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after  # Retry-After lebih lama dari ini -> menyerah
+
+    def delay_for(self, attempt, retry_after=None):
+        """Delay sebelum attempt berikutnya (attempt mulai dari 1). Return None jika tidak perlu retry"""
+        delay = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        # Equal jitter: setengah tetap, setengah acak supaya worker tidak retry serempak
+        delay = delay / 2 + random.uniform(0, delay / 2)
+        if retry_after is not None:
+            if retry_after > self.max_retry_after:
+                return None
+            delay = max(delay, retry_after)
+        return delay
+
+
+DEFAULT_POLICY = RetryPolicy()
+
+
+def host_of(url):
+    return urlparse(url).hostname or ""
+
+
+def parse_retry_after(value):
+    """Header Retry-After (detik atau HTTP-date) -> detik, atau None"""
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def status_of(exc):
+    status = getattr(exc, "status_code", None)
+    response = getattr(exc, "response", None)
+    if status is None and response is not None:
+        status = response.status_code
+    return status
+
+
+def retry_after_of(exc):
+    value = getattr(exc, "retry_after", None)
+    response = getattr(exc, "response", None)
+    if value is None and response is not None:
+        value = response.headers.get("Retry-After")
+    return parse_retry_after(value)
+
+
+def is_retryable(exc):
+    """Error jaringan, timeout dan status 403/429/5xx layak di-retry; 4xx lain tidak"""
+    if isinstance(exc, CircuitOpenError):
+        return False
+    status = status_of(exc)
+    if status is not None:
+        return status in RETRY_STATUSES
+    return getattr(exc, "retryable", False) or isinstance(exc, (requests.exceptions.RequestException, OSError))
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity=1):
+        self.rate = rate          # token per detik (<= 0 berarti tanpa batas)
+        self.capacity = max(1, capacity)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=1, stop_event=None):
+        """Ambil token; tunggu jika bucket kosong. Token boleh minus (reservasi untuk batch)"""
+        if self.rate <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= tokens
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0
+        if wait > 0:
+            if stop_event is not None:
+                stop_event.wait(wait)
+            else:
+                time.sleep(wait)
+
+
+# Nilai allow() untuk request percobaan half-open (truthy, sama seperti True)
+PROBE = "probe"
+
+
+class CircuitBreaker:
+    def __init__(self, host, failure_threshold=5, reset_timeout=300, state_path=DEFAULT_CIRCUIT_STATE_PATH):
+        self.host = host
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state_path = Path(state_path) if state_path else None
+        self._failures = 0
+        self._open_until = self._load_open_until()
+        self._half_open = False
+        self._lock = threading.Lock()
+
+    def _load_state(self):
+        if not self.state_path or not self.state_path.exists():
+            return {}
+        try:
+            return json.loads(self.state_path.read_text())
+        except (ValueError, OSError):
+            return {}
+
+    def _load_open_until(self):
+        return float(self._load_state().get(self.host, 0))
+
+    def _save_open_until(self):
+        if not self.state_path:
+            return
+        state = self._load_state()
+        if self._open_until > time.time():
+            state[self.host] = self._open_until
+        else:
+            state.pop(self.host, None)
+        tmp = self.state_path.with_suffix(f".{os.getpid()}.tmp")
+        try:
+            tmp.write_text(json.dumps(state))
+            os.replace(tmp, self.state_path)
+        except OSError as e:
+            print(f"⚠ Gagal menyimpan state circuit breaker: {e}")
+
+    def retry_in(self):
+        return max(0.0, self._open_until - time.time())
+
+    def is_open(self):
+        with self._lock:
+            return self._open_until > time.time()
+
+    def allow(self):
+        """
+        True jika request boleh dikirim, False jika tidak. Setelah cooldown satu request
+        percobaan diizinkan: untuk request itu return PROBE, dan hanya pemanggil itu yang
+        boleh release_probe() / record_failure(probe=True)
+        """
+        with self._lock:
+            if self._open_until <= 0:
+                return True
+            if self._open_until > time.time():
+                return False
+            if self._half_open:
+                return False
+            self._half_open = True
+            return PROBE
+
+    def release_probe(self):
+        """
+        Request percobaan (half-open) selesai tanpa tercatat sukses / gagal, misal error
+        non-retryable: izinkan percobaan berikutnya, jangan kunci breaker selamanya.
+        Hanya dipanggil oleh pemegang probe (allow() == PROBE)
+        """
+        with self._lock:
+            self._half_open = False
+
+    def record_success(self):
+        with self._lock:
+            was_open = self._open_until > 0
+            self._failures = 0
+            self._half_open = False
+            self._open_until = 0
+            if was_open:
+                print(f"✔ Circuit breaker {self.host} tertutup kembali")
+                self._save_open_until()
+
+    def record_failure(self, probe=False):
+        """
+        Catat satu kegagalan. Probe half-open yang gagal langsung membuka breaker lagi;
+        kegagalan request lain (mis. yang sudah berjalan sebelum breaker terbuka) hanya
+        dihitung terhadap failure_threshold
+        """
+        with self._lock:
+            self._failures += 1
+            if probe or self._failures >= self.failure_threshold:
+                self._open_until = time.time() + self.reset_timeout
+                if probe:
+                    self._half_open = False
+                print(f"⛔ Circuit breaker {self.host} terbuka selama {self.reset_timeout:.0f} detik "
+                      f"({self._failures} kegagalan beruntun)")
+                self._failures = 0
+                self._save_open_until()
+
+
+# --- Registry per host ---
+_registry_lock = threading.Lock()
+_buckets = {}
+_breakers = {}
+_host_config = {}
+
+
+def configure_host(host, rate=None, capacity=None, failure_threshold=None, reset_timeout=None):
+    """Atur batas rate dan circuit breaker untuk satu host (panggil sebelum request pertama)"""
+    with _registry_lock:
+        config = _host_config.setdefault(host, {})
+        for key, value in (("rate", rate), ("capacity", capacity),
+                           ("failure_threshold", failure_threshold), ("reset_timeout", reset_timeout)):
+            if value is not None:
+                config[key] = value
+        _buckets.pop(host, None)
+        _breakers.pop(host, None)
+
+
+def get_bucket(host):
+    with _registry_lock:
+        config = _host_config.get(host, {})
+        if "rate" not in config:
+            return None
+        if host not in _buckets:
+            _buckets[host] = TokenBucket(config["rate"], config.get("capacity", 1))
+        return _buckets[host]
+
+
+def get_breaker(host):
+    with _registry_lock:
+        if host not in _breakers:
+            config = _host_config.get(host, {})
+            _breakers[host] = CircuitBreaker(
+                host,
+                failure_threshold=config.get("failure_threshold", 5),
+                reset_timeout=config.get("reset_timeout", 300),
+            )
+        return _breakers[host]
+
+
+def retry_call(fn, host=None, policy=None, retry_on=is_retryable, stop_event=None, tokens=1, label="request",
+               bucket=None):
+    """
+    Panggil fn() dengan retry. Jika host diberikan, request ikut rate limit (token bucket)
+    dan circuit breaker host tersebut. `bucket` mengganti token bucket host (mis. budget
+    download terpisah dari budget page). Raise exception terakhir jika semua attempt gagal,
+    atau CircuitOpenError jika host sedang down.
+    """
+    policy = policy or DEFAULT_POLICY
+    breaker = get_breaker(host) if host else None
+    if bucket is None and host:
+        bucket = get_bucket(host)
+
+    for attempt in range(1, policy.max_attempts + 1):
+        allowed = breaker.allow() if breaker is not None else True
+        if not allowed:
+            raise CircuitOpenError(host, breaker.retry_in())
+        probe = allowed == PROBE
+        if bucket is not None:
+            bucket.acquire(tokens, stop_event=stop_event)
+        try:
+            result = fn()
+        except Exception as e:
+            if not retry_on(e):
+                raise
+            if breaker is not None:
+                breaker.record_failure(probe=probe)
+                if breaker.is_open():
+                    raise
+            error = e
+        else:
+            if breaker is not None:
+                breaker.record_success()
+            return result
+        finally:
+            # Apa pun hasilnya (termasuk error non-retryable / KeyboardInterrupt), request
+            # percobaan half-open sudah selesai. Request biasa tidak menyentuh status probe
+            if probe:
+                breaker.release_probe()
+        delay = policy.delay_for(attempt, retry_after_of(error)) if attempt < policy.max_attempts else None
+        if delay is None or (stop_event is not None and stop_event.is_set()):
+            raise error
+        print(f"{label} gagal (attempt {attempt}/{policy.max_attempts}): {error}")
+        print(f"Retry dalam {delay:.1f} detik...")
+        if stop_event is not None:
+            if stop_event.wait(delay):
+                raise error
+        else:
+            time.sleep(delay)
@@ -0,0 +1,141 @@
+import bisect
+import json
+import os
+import re
+import threading
+from pathlib import Path
+
+# Routing judul pengumuman ke handler (ekstraksi Lamp1, summarization, ...).
+# Tabel routing dibaca dari routes.json: tiap route punya daftar pola (substring,
+# case-insensitive), handler, prompt summary dan selector attachment. Semua pola
+# dikompilasi menjadi satu regex gabungan, dan satu page balasan diklasifikasikan
+# dengan satu kali scan atas gabungan semua judul. routes.json dibaca ulang otomatis
+# saat file berubah, jadi menambah keyword tidak perlu mengubah kode.
+
+DEFAULT_ROUTES_PATH = Path(os.environ.get("ROUTES_PATH", Path(__file__).parent / "routes.json"))
+
+
+def select_attachment(attachments, selector):
+    """
+    Pilih attachment sesuai selector:
+      contains:<teks> -> attachment pertama yang nama filenya mengandung teks (atau None)
+      prefer:<teks>   -> attachment pertama yang mengandung teks, jika tidak ada
+                         attachment terakhir yang punya URL
+    Tanpa selector: attachment pertama yang punya URL.
+    """
+    if not selector:
+        return next((att for att in attachments if att.get("FullSavePath")), None)
+    kind, _, text = selector.partition(":")
+    text = text.lower()
+    if kind == "contains":
+        for att in attachments:
+            if text in (att.get("OriginalFilename") or "").lower():
+                return att
+        return None
+    if kind == "prefer":
+        chosen = None
+        for att in attachments:
+            if att.get("FullSavePath"):
+                chosen = att
+                if text in (att.get("OriginalFilename") or "").lower():
+                    break
+        return chosen
+    raise ValueError(f"Selector attachment tidak dikenal: {selector}")
+
+
+class Route:
+    def __init__(self, name, patterns, handler, prompt=None, attachment=None):
+        self.name = name
+        self.patterns = list(patterns)
+        self.handler = handler
+        self.prompt = prompt
+        self.attachment = attachment
+
+    def select_attachment(self, attachments):
+        return select_attachment(attachments, self.attachment)
+
+    def __repr__(self):
+        return f"Route({self.name!r}, handler={self.handler!r})"
+
+
+def route_for_handler(routes, handler):
+    """Route pertama (urutan tabel) untuk handler tertentu, atau None"""
+    return next((route for route in routes if route.handler == handler), None)
+
+
+class Router:
+    def __init__(self, routes):
+        self.routes = list(routes)
+
+        pattern_routes = {}  # pola (lowercase) -> index route
+        for i, route in enumerate(self.routes):
+            for pattern in route.patterns:
+                pattern_routes.setdefault(pattern.lower(), set()).add(i)
+
+        # Regex gabungan memakai lookahead supaya match yang tumpang tindih tetap
+        # ditemukan; pola terpanjang dicoba dulu, dan pola yang merupakan prefix
+        # dari pola yang cocok ikut dihitung cocok.
+        self._routes_for = {}
+        for pattern in pattern_routes:
+            self._routes_for[pattern] = set().union(
+                *(ids for other, ids in pattern_routes.items() if pattern.startswith(other))
+            )
+        alternation = "|".join(re.escape(p) for p in sorted(pattern_routes, key=len, reverse=True))
+        self._regex = re.compile(f"(?=({alternation}))", re.IGNORECASE) if pattern_routes else None
+
+    def classify_page(self, titles):
+        """Klasifikasikan semua judul dalam satu scan. Return list route per judul (urutan tabel)"""
+        matched = [set() for _ in titles]
+        if self._regex is None or not titles:
+            return [[] for _ in titles]
+
+        starts = []
+        offset = 0
+        for title in titles:
+            starts.append(offset)
+            offset += len(title or "") + 1
+        text = "\n".join(title or "" for title in titles)
+
+        for match in self._regex.finditer(text):
+            index = bisect.bisect_right(starts, match.start()) - 1
+            matched[index] |= self._routes_for.get(match.group(1).lower(), set())
+        return [[self.routes[i] for i in sorted(ids)] for ids in matched]
+
+    def classify(self, title):
+        return self.classify_page([title])[0]
+
+
+def load_router(path=DEFAULT_ROUTES_PATH):
+    config = json.loads(Path(path).read_text(encoding="utf-8"))
+    return Router([Route(**route) for route in config["routes"]])
+
+
+_routers = {}  # path -> (mtime, Router)
+_router_lock = threading.Lock()
+
+
+def get_router(path=DEFAULT_ROUTES_PATH):
+    """Router aktif; routes.json dibaca ulang jika file berubah sejak load terakhir"""
+    key = str(path)
+    with _router_lock:
+        cached = _routers.get(key)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            if cached is None:
+                raise
+            return cached[1]
+        if cached is not None and mtime == cached[0]:
+            return cached[1]
+        try:
+            router = load_router(path)
+        except (ValueError, KeyError, TypeError) as e:
+            if cached is None:
+                raise
+            print(f"⚠ {path} tidak valid, tetap memakai routing sebelumnya: {e}")
+            router = cached[1]
+        else:
+            if cached is not None:
+                print(f"🔀 Routing dimuat ulang dari {path} ({len(router.routes)} route)")
+        _routers[key] = (mtime, router)
+        return router
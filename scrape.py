@@ -1,8 +1,8 @@
 import sys
 import os
-import psutil
 
 # --- 0. Prevent multiple instances ---
+# import psutil
 # current_pid = os.getpid()
 # script_name = "scrape.py"
 
@@ -15,20 +15,33 @@ import psutil
 #         continue
 
 # --- 1. Your existing imports ---
+# supabase dan summarize_helper (groq, pdfplumber, pdf2image) sengaja di-import
+# lazy: sebagian besar run tidak menemukan pengumuman baru dan tidak butuh keduanya.
+# Cek cold-start dengan: python bench_startup.py
 import requests
 import cloudscraper
 import json
 import datetime
 import os
 import time
-from supabase import create_client, Client
 from dotenv import load_dotenv
-import random
-import subprocess
 from pathlib import Path
 from send_message_only import send_message_only
-import csv
-from summarize_helper import process_summary
+import threading
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from zoneinfo import ZoneInfo
+from dedup_store import DedupStore
+from transport import AdaptiveTransport, CloudscraperTransport, PlaywrightTransport, RequestsTransport, TransportBlocked, TRANSPORT_ORDER, IDX_BASE
+from job_queue import JobQueue
+from bulk_writer import BulkWriter
+from retry_helper import RetryPolicy, CircuitOpenError, TokenBucket, configure_host, get_breaker, host_of, is_retryable, retry_call
+from routing import get_router, route_for_handler, select_attachment
+import metrics
+from pdf_cache import get_cache, validate_pdf
+from download_manager import get_manager
+from prefetch import Prefetcher
+import lamp1_extract
 
 # --- 2. Configuration ---
 load_dotenv()
@@ -37,88 +50,228 @@ SUPABASE_KEY = os.environ.get("SUPABASE_KEY")
 if not SUPABASE_URL or not SUPABASE_KEY:
     raise EnvironmentError("SUPABASE_URL dan SUPABASE_KEY harus diset.")
 
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+_supabase = None
+_supabase_lock = threading.Lock()
 
-url = "https://www.idx.co.id/primary/ListedCompany/GetAnnouncement"
+def get_supabase():
+    """Client Supabase, dibuat saat pertama kali benar-benar dibutuhkan"""
+    global _supabase
+    with _supabase_lock:
+        if _supabase is None:
+            from supabase import create_client
+            _supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+    return _supabase
 
-today = datetime.date.today().strftime("%Y%m%d")
-yesterday_date = (datetime.date.today() - datetime.timedelta(days=1)).strftime("%d-%m-%Y")
-start_of_day = datetime.date.today().strftime("%Y-%m-%d") + "T00:00:00+00"
-end_of_day = datetime.date.today().strftime("%Y-%m-%d") + "T23:59:59+00"
+url = f"{IDX_BASE}/primary/ListedCompany/GetAnnouncement"
+
+# Tanggal dihitung ulang oleh start_run() setiap run (mode daemon bisa melewati pergantian hari)
+today = None
+yesterday_date = None
+today_iso = None
+
+# Jumlah pengumuman per page GetAnnouncement; mode --single-page mengambil SINGLE_PAGE_SIZE
+# pengumuman dalam satu request saja
+PAGE_SIZE = 10
+SINGLE_PAGE_SIZE = int(os.environ.get("SINGLE_PAGE_SIZE", "100"))
 
 params = {
     "kodeEmiten": "*",
     "emitenType": "*",
     "indexFrom": 0,
-    "pageSize": 10,
+    "pageSize": PAGE_SIZE,
     "dateFrom": today,
     "dateTo": today,
     "lang": "id",
     "keyword": ""
 }
 
+# Session cloudscraper dipakai ulang antar run supaya cookie Cloudflare tetap hangat
 scraper = cloudscraper.create_scraper()
+
+# Transport untuk GetAnnouncement: mulai dari yang termurah / terakhir berhasil,
+# eskalasi ke Playwright hanya jika diblokir Cloudflare (lihat transport.py)
+TRANSPORT_FACTORIES = {
+    "requests": RequestsTransport,
+    "cloudscraper": lambda: CloudscraperTransport(scraper),
+    "playwright": PlaywrightTransport,
+}
+transport = AdaptiveTransport(factories=TRANSPORT_FACTORIES)
+
+def set_transport(name):
+    """Paksa satu transport (--transport), atau 'auto' untuk adaptif"""
+    global transport
+    transport.close()
+    if name == "auto":
+        transport = AdaptiveTransport(factories=TRANSPORT_FACTORIES)
+    else:
+        transport = AdaptiveTransport(order=[name], state_path=None, factories=TRANSPORT_FACTORIES)
 all_data = []
-to_insert = []
-stop_scraping = False
-
-# Define keywords for summarization
-SUMMARY_KEYWORDS = [
-    "volatilitas",
-    "rapat",
-    "dividen",
-    "laporan kepemilikan",
-    "perubahan pengurus",
-    "kembali"
-]
 
+# Keyword summarization, pola "5%" dan pilihan attachment ada di routes.json (lihat routing.py)
 SUMMARY_LOG_FILE = "summary_logs.csv"
 
+# --- 2a. Konfigurasi crawler paralel ---
+# Jumlah page GetAnnouncement yang boleh di-fetch bersamaan (window)
+CRAWL_CONCURRENCY = max(1, int(os.environ.get("CRAWL_CONCURRENCY", "3")))
+# Maksimum request page per detik ke IDX (0 = tanpa batas)
+CRAWL_RATE = float(os.environ.get("CRAWL_RATE", "2"))
+# Timeout (detik) satu request page GetAnnouncement
+PAGE_TIMEOUT = float(os.environ.get("PAGE_TIMEOUT", "15"))
+# Jumlah page per panggilan evaluate saat transport Playwright aktif (fetch paralel di browser)
+PLAYWRIGHT_BATCH_SIZE = max(1, int(os.environ.get("PLAYWRIGHT_BATCH_SIZE", "5")))
+# Jumlah download attachment yang di-prefetch bersamaan begitu page datang (0 = nonaktif)
+PREFETCH_WORKERS = max(0, int(os.environ.get("PREFETCH_WORKERS", "4")))
+# Maksimum download PDF per detik ke IDX (0 = tanpa batas). Budget terpisah dari CRAWL_RATE
+# supaya prefetch attachment tidak memperlambat pagination GetAnnouncement
+DOWNLOAD_RATE = float(os.environ.get("DOWNLOAD_RATE", "2"))
+
+# Retry & circuit breaker host IDX (lihat retry_helper.py). Rate limit CRAWL_RATE berlaku
+# untuk request page lewat token bucket host; download PDF memakai DOWNLOAD_BUCKET sendiri.
+IDX_HOST = host_of(url)
+PAGE_RETRY_POLICY = RetryPolicy(
+    max_attempts=int(os.environ.get("PAGE_MAX_ATTEMPTS", "3")),
+    base_delay=float(os.environ.get("PAGE_RETRY_BASE", "5")),
+    max_delay=30,
+)
+DOWNLOAD_RETRY_POLICY = RetryPolicy(max_attempts=4, base_delay=2, max_delay=30)
+configure_host(
+    IDX_HOST,
+    rate=CRAWL_RATE,
+    capacity=CRAWL_CONCURRENCY,
+    failure_threshold=int(os.environ.get("IDX_BREAKER_THRESHOLD", "5")),
+    reset_timeout=float(os.environ.get("IDX_BREAKER_COOLDOWN", "300")),
+)
+DOWNLOAD_BUCKET = TokenBucket(DOWNLOAD_RATE, capacity=max(1, PREFETCH_WORKERS))
+# Download PDF dari host IDX memakai session crawl yang sama (cookie Cloudflare sudah hangat)
+get_manager().register_session(IDX_HOST, scraper)
+
+def download_attachment(url_pdf, kind="lamp1", timeout=30, stop_event=None):
+    """
+    Download satu attachment (rate limit, retry & circuit breaker per host). File ditulis ke
+    staging cache PDF lewat .part + rename atomik, jadi download yang terputus (timeout, run
+    dihentikan) dilanjutkan dengan Range dan tidak pernah meninggalkan PDF terpotong.
+    """
+    staging = get_cache().staging_path(url_pdf)
+
+    def download():
+        with metrics.timed("pdf_download", kind=kind) as m:
+            size = get_manager().download_to(url_pdf, staging, timeout=timeout)
+            content = staging.read_bytes()
+            # Di dalam retry: halaman HTML (challenge / error) dengan status 200 didownload ulang
+            validate_pdf(content, size)
+            m.values["bytes"] = len(content)
+        return content
+
+    try:
+        host = host_of(url_pdf)
+        return retry_call(download, host=host, policy=DOWNLOAD_RETRY_POLICY, label=f"Download {url_pdf}",
+                          stop_event=stop_event, bucket=DOWNLOAD_BUCKET if host == IDX_HOST else None)
+    finally:
+        # File lengkap sudah masuk cache; .part yang belum selesai dibiarkan untuk resume
+        if staging.exists():
+            staging.unlink()
+
+# Attachment yang dibutuhkan route langsung didownload ke cache PDF saat page diproses;
+# job Lamp1 / summary menunggu download yang sedang berjalan (lihat prefetch.py)
+prefetcher = Prefetcher(lambda url_pdf, stop_event: download_attachment(url_pdf, kind="prefetch", timeout=60,
+                                                                        stop_event=stop_event),
+                        max_workers=PREFETCH_WORKERS)
+
+# Lokasi dedup store lokal (SQLite) untuk key (tanggal, judul)
+DEDUP_DB_PATH = os.environ.get("DEDUP_DB_PATH", str(Path(__file__).parent / "dedup.sqlite3"))
+
+# Antrian job background (ekstraksi Lamp1 & summarization) dan batas worker per tipe
+JOB_DB_PATH = os.environ.get("JOB_DB_PATH", str(Path(__file__).parent / "jobs.sqlite3"))
+LAMP1_WORKERS = int(os.environ.get("LAMP1_WORKERS", "1"))
+SUMMARY_WORKERS = int(os.environ.get("SUMMARY_WORKERS", "2"))
+
+# Write-behind buffer insert: flush saat jumlah baris atau umur baris tertua tercapai
+WRITE_BATCH_SIZE = int(os.environ.get("WRITE_BATCH_SIZE", "50"))
+WRITE_MAX_DELAY = float(os.environ.get("WRITE_MAX_DELAY", "5"))
+
 # --- 2b. Setup folder untuk PDF Lamp1 ---
 lamp1_folder = Path(__file__).parent / "5_persen/pdf"
 lamp1_folder.mkdir(parents=True, exist_ok=True)
+# PDF Lamp1 dikirim langsung (bytes) ke extractor. Salinan di lamp1_folder tetap ditulis
+# (atomik) untuk extract.py & tool lain; LAMP1_SAVE_PDF=0 untuk mematikannya
+LAMP1_SAVE_PDF = os.environ.get("LAMP1_SAVE_PDF", "1") == "1"
 
-print(f"=== {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')} ===")
+# --- 3. Dedup store lokal ---
+# Key yang sudah ada di database disimpan di SQLite lokal. Supabase hanya dibaca
+# saat hari ini belum pernah direkonsiliasi, atau saat ada pengumuman yang tidak
+# dikenal (miss) - itu pun hanya data setelah high-watermark lokal.
+dedup = DedupStore(DEDUP_DB_PATH)
+existing_keys = set()  # key yang ditemukan di run ini
+reconciled_this_run = False
 
-# --- 3. Ambil data dari Supabase untuk hari ini ---
-# print(f"Mengambil data dari Supabase untuk hari ini ({today})...")
-existing_keys = set()
-has_5percent_today = False
+def reconcile_dedup(incremental):
+    """Sinkronkan dedup store dengan Supabase untuk hari ini"""
+    global reconciled_this_run
+    reconciled_this_run = True
+    try:
+        count = dedup.reconcile(get_supabase(), today_iso, incremental=incremental)
+        mode = "incremental" if incremental else "penuh"
+        print(f"🔄 Rekonsiliasi dedup store ({mode}): {count} key dari Supabase")
+    except Exception as e:
+        print(f"Gagal mengambil data dari Supabase: {e}")
 
-try:
-    response = (
-        supabase.table("idx_keterbukaan_informasi")
-        .select("tanggal, judul")
-        .gte("tanggal", start_of_day)
-        .lte("tanggal", end_of_day)
-        .execute()
-    )
-    # Normalisasi format tanggal dari database (hapus spasi dan timezone, gunakan format ISO)
-    for item in response.data:
-        db_tanggal = item['tanggal']
-        # Konversi format "2025-12-01 15:03:13+00" ke "2025-12-01T15:03:13"
-        normalized_tanggal = db_tanggal.replace(" ", "T").split("+")[0].split("Z")[0]
-        judul = item['judul']
-        existing_keys.add((normalized_tanggal, judul))
-        
+def is_duplicate(key):
+    """Cek key di run ini, di dedup store, dan (sekali per run) ke Supabase saat miss"""
+    if key in existing_keys or dedup.contains(*key):
+        return True
+    if not reconciled_this_run:
+        reconcile_dedup(incremental=True)
+        refresh_has_5percent()
+        return dedup.contains(*key)
+    return False
+
+def refresh_has_5percent():
+    global has_5percent_today
+    lamp1_patterns = [p for route in get_router().routes if route.handler == "lamp1" for p in route.patterns]
+    has_5percent_today = any(dedup.has_title_like(today_iso, p) for p in lamp1_patterns)
+    if has_5percent_today:
         # Cek apakah sudah ada pengumuman dengan "5%" di database hari ini
-        if "5%" in judul:
-            has_5percent_today = True
-            print(f"📌 Pengumuman dengan '5%' sudah ada di database: {judul}")
-except Exception as e:
-    print(f"Gagal mengambil data dari Supabase: {e}")
+        print("📌 Pengumuman dengan '5%' sudah ada di database hari ini")
+
+has_5percent_today = False
+# False saat backfill (--full): seluruh page hari itu di-crawl, duplikat hanya dilewati
+stop_on_duplicate = True
+# True saat --single-page (dulu scrape_alternative.py): satu page, hanya route Lamp1, dan
+# Lamp1 selalu diekstrak walau pengumumannya sudah ada di DB / sudah ada '5%' hari ini
+single_page_mode = False
+
+def start_run(day=None, full=False, single_page=False):
+    """Reset state per-run, hitung tanggal (default hari ini) dan siapkan dedup store"""
+    global today, yesterday_date, today_iso, all_data, existing_keys, reconciled_this_run, stop_event, stop_on_duplicate
+    global failed_row_count, single_page_mode
+    now = day or datetime.date.today()
+    today = now.strftime("%Y%m%d")
+    yesterday_date = (now - datetime.timedelta(days=1)).strftime("%d-%m-%Y")
+    today_iso = now.strftime("%Y-%m-%d")
+    params.update(indexFrom=0, dateFrom=today, dateTo=today, pageSize=SINGLE_PAGE_SIZE if single_page else PAGE_SIZE)
+
+    all_data = []
+    existing_keys = set()
+    reconciled_this_run = False
+    stop_on_duplicate = not full
+    single_page_mode = single_page
+    failed_row_count = 0
+    stop_event = threading.Event()
+    transport.reload()
+
+    if not dedup.is_reconciled(today_iso):
+        reconcile_dedup(incremental=False)
+    refresh_has_5percent()
 
 # --- 3b. Fungsi untuk download dan extract PDF Lamp1 ---
-def process_lamp1_pdf(attachments):
+def process_lamp1_pdf(attachments, notify_date=None, selector="contains:lamp1"):
     """
-    Download PDF dengan 'Lamp1' di nama file dan ekstrak menggunakan extract_pdf_to_csv.js
+    Download PDF dengan 'Lamp1' di nama file dan ekstrak menggunakan extract_pdf_to_csv.js.
+    Error sementara (download / IDX down / worker crash) di-raise supaya job diulang antrian;
+    error permanen hanya dicatat dan dikirim notifikasi.
     """
-    lamp1_attachment = None
-    for att in attachments:
-        filename = att.get("OriginalFilename", "")
-        if "lamp1" in filename.lower():
-            lamp1_attachment = att
-            break
+    notify_date = notify_date or yesterday_date
+    lamp1_attachment = select_attachment(attachments, selector)
     
     if not lamp1_attachment:
         print("⚠ Tidak ada attachment dengan 'Lamp1'")
@@ -129,94 +282,227 @@ def process_lamp1_pdf(attachments):
         filename = lamp1_attachment.get("OriginalFilename")
         
         print(f"📥 Download: {filename}")
-        resp = scraper.get(url_pdf, stream=True, timeout=30)
-        resp.raise_for_status()
-        
-        filepath = lamp1_folder / filename
-        with open(filepath, 'wb') as f:
-            for chunk in resp.iter_content(8192):
-                if chunk:
-                    f.write(chunk)
-        print(f"✔ Download selesai: {filepath}")
-        
-        # Panggil extract_bounding_box.py
-        print(f"🔄 Menjalankan extract_bounding_box.py...")
-        result = subprocess.run(
-            [sys.executable, "extract_bounding_box.py", str(filepath)],
-            cwd=str(Path(__file__).parent / "5_persen"),
-            capture_output=True,
-            text=True,
-        )
+
+        # Tunggu prefetch yang sedang berjalan, lalu cek cache PDF; download hanya jika
+        # belum pernah diambil (prefetch gagal / run lain / backfill)
+        attachment_id = lamp1_attachment.get("Id")
+        prefetcher.wait(url_pdf, attachment_id)
+        content, hit = get_cache().fetch(url_pdf, lambda: download_attachment(url_pdf), attachment_id=attachment_id)
+        print(f"✔ {'Diambil dari cache' if hit else 'Download selesai'}: {filename} ({len(content)} bytes)")
+        if LAMP1_SAVE_PDF:
+            get_cache().fetch_to(url_pdf, lamp1_folder / filename, lambda: content, attachment_id=attachment_id)
         
-        if result.returncode == 0:
-            print("✔ Ekstraksi PDF berhasil")
-            if result.stdout:
-                print(result.stdout)
+        # Ekstraksi lewat worker extractor yang tetap hidup (lihat lamp1_extract.py)
+        print(f"🔄 Ekstraksi {filename} (mode {lamp1_extract.EXTRACT_MODE})...")
+        try:
+            with metrics.timed("extract_call", mode=lamp1_extract.EXTRACT_MODE):
+                result = lamp1_extract.extract(content, filename)
+        except lamp1_extract.ExtractionError as e:
+            if e.retryable:
+                raise
+            print(f"❌ Ekstraksi PDF gagal: {e}")
+            # Kirim notifikasi gagal
+            send_message_only(
+                title="Data kepemilikan 5% - GAGAL",
+                message=f"{notify_date} - Ekstraksi PDF gagal: {e}"
+            )
+            return
+
+        stats = result.stats
+        print(f"✔ Ekstraksi PDF selesai: {stats.rows} baris dari {stats.pages} halaman "
+              f"({stats.seconds:.1f}s, tanggal {result.tanggal})")
+        if stats.upserted:
             # Kirim notifikasi berhasil
             send_message_only(
                 title="✅ Data kepemilikan 5%",
-                message=f"Berhasil ({yesterday_date})"
+                message=f"Berhasil ({notify_date}, {stats.rows} baris)"
             )
         else:
-            print("❌ Ekstraksi PDF gagal")
-            if result.stderr:
-                print(result.stderr)
             # Kirim notifikasi gagal
+            reason = "tidak ada baris" if not stats.rows else ("tanggal tidak ditemukan" if not result.tanggal else "upsert gagal")
             send_message_only(
                 title="Data kepemilikan 5% - GAGAL",
-                message=f"{yesterday_date} - Ekstraksi PDF gagal"
+                message=f"{notify_date} - Ekstraksi PDF gagal ({reason})"
             )
     except Exception as e:
+        if isinstance(e, CircuitOpenError) or is_retryable(e):
+            print(f"↻ Error sementara processing Lamp1, job akan diulang: {e}")
+            raise
         print(f"❌ Error processing Lamp1: {e}")
         # Kirim notifikasi error
         send_message_only(
             title="Data kepemilikan 5% - ERROR",
-            message=f"{yesterday_date} - {str(e)}"
+            message=f"{notify_date} - {str(e)}"
         )
 
-# --- 4. Loop Scraping ---
-while True:
-    if stop_scraping:
-        # print("Scraping dihentikan karena duplikat ditemukan.")
-        break
+# --- 3c. Job background: ekstraksi Lamp1 dan summarization ---
+# Crawler langsung insert baris pengumuman (summary masih kosong), lalu job di bawah
+# dijalankan worker pool. Job summary mengisi kolom `summary` setelah selesai.
+def run_lamp1_job(payload):
+    process_lamp1_pdf(payload["attachments"], payload.get("notify_date"), payload.get("selector", "contains:lamp1"))
 
-    print(f"Checking page: {params['indexFrom']}")
-    
-    # Retry logic untuk handle 403 atau error lainnya
-    max_retries = 3
-    retry_delay = 30
-    success = False
-    
-    for attempt in range(max_retries):
-        try:
-            resp = scraper.get(url, params=params, timeout=15)
-            resp.raise_for_status()
-            success = True
-            break
-        except requests.exceptions.RequestException as e:
-            if attempt < max_retries - 1:
-                print(f"Request gagal (attempt {attempt + 1}/{max_retries}): {e}")
-                print(f"Retry dalam {retry_delay} detik...")
-                time.sleep(retry_delay)
-            else:
-                print(f"Request gagal setelah {max_retries} percobaan: {e}")
-                break
-    
-    if not success:
-        break
-
-    data = resp.json()
-    replies = data.get("Replies", [])
-    print(f"Response status: {resp.status_code}")
-    print(f"Number of replies: {len(replies)}")
-    if not replies:
-        print("Full response data:", json.dumps(data, indent=2))
-        print("Tidak ada balasan lagi, scraping dihentikan.")
-        break
+def run_summary_job(payload):
+    from summarize_helper import process_summary
+
+    print(f"   Processing PDF: {payload['url']}")
+    prefetcher.wait(payload["url"], payload.get("attachment_id"))
+    with metrics.timed("summary_job"):
+        summary_result = process_summary(payload["url"], payload["tanggal"], payload["judul"], payload["kode_emiten"],
+                                         prompt_name=payload.get("prompt"),
+                                         attachment_id=payload.get("attachment_id"))
+    print(f"   ✅ Summary logged to {SUMMARY_LOG_FILE}")
+    if not summary_result["success"]:
+        return
+    with metrics.timed("supabase_write", table="idx_keterbukaan_informasi", op="update", rows=1):
+        (
+            get_supabase().table("idx_keterbukaan_informasi")
+            .update({"summary": summary_result["summary"]})
+            .eq("tanggal", payload["tanggal"])
+            .eq("judul", payload["judul"])
+            .execute()
+        )
+    print(f"📝 Summary tersimpan: {payload['tanggal']} - {payload['judul']}")
+
+job_queue = JobQueue(JOB_DB_PATH)
+job_queue.register("lamp1", run_lamp1_job, concurrency=LAMP1_WORKERS)
+job_queue.register("summary", run_summary_job, concurrency=SUMMARY_WORKERS)
+
+# --- 3c-2. Bulk writer ke idx_keterbukaan_informasi ---
+# Job summary untuk baris yang masih di buffer ditahan di sini, lalu di-enqueue
+# setelah barisnya benar-benar masuk database.
+pending_summary_jobs = {}
+pending_summary_lock = threading.Lock()
+
+def on_rows_written(rows):
+    keys = [(row["tanggal"], row["judul"]) for row in rows]
+    dedup.add_many(keys)
+    with pending_summary_lock:
+        payloads = [pending_summary_jobs.pop(key, None) for key in keys]
+    for payload in payloads:
+        if payload:
+            job_queue.enqueue("summary", payload)
+
+failed_row_count = 0
+
+def on_rows_failed(rows, error):
+    global failed_row_count
+    # Summary hanya bisa di-update jika barisnya berhasil masuk database
+    with pending_summary_lock:
+        failed_row_count += len(rows)
+        for row in rows:
+            pending_summary_jobs.pop((row["tanggal"], row["judul"]), None)
+
+writer = BulkWriter(
+    get_supabase,
+    "idx_keterbukaan_informasi",
+    on_conflict="tanggal,judul",
+    max_rows=WRITE_BATCH_SIZE,
+    max_delay=WRITE_MAX_DELAY,
+    on_flush=on_rows_written,
+    on_error=on_rows_failed,
+)
 
+# --- 3d. Fetch satu page GetAnnouncement (dipanggil dari worker thread) ---
+stop_event = threading.Event()
+
+def get_page(page_params):
+    with metrics.timed("page_fetch", transport=transport.current):
+        return transport.get_json(url, params=page_params, timeout=PAGE_TIMEOUT)
+
+def fetch_page(index_from):
+    """
+    Ambil satu page GetAnnouncement dengan retry (backoff + jitter, Retry-After, circuit breaker).
+    Return (data, status_code) atau None jika gagal / crawl sudah dihentikan.
+    """
+    page_params = dict(params, indexFrom=index_from)
+    if stop_event.is_set():
+        return None
+    try:
+        return retry_call(
+            lambda: get_page(page_params),
+            host=IDX_HOST,
+            policy=PAGE_RETRY_POLICY,
+            stop_event=stop_event,
+            label=f"Request page {index_from}",
+        )
+    except CircuitOpenError as e:
+        print(f"⛔ Page {index_from} dilewati: {e}")
+    except (requests.exceptions.RequestException, TransportBlocked) as e:
+        if not stop_event.is_set():
+            print(f"Request gagal page {index_from} setelah retry: {e}")
+    return None
+
+def fetch_batch(indices):
+    """
+    Ambil beberapa page dalam satu panggilan transport (Playwright: satu evaluate).
+    Page yang gagal di dalam batch diulang satu per satu lewat fetch_page (dengan retry).
+    Return list hasil seperti fetch_page, urut sesuai indices.
+    """
+    if stop_event.is_set():
+        return [None] * len(indices)
+    def get_batch():
+        with metrics.timed("page_fetch_batch", transport=transport.current, pages=len(indices)):
+            return transport.get_json_batch(url, [dict(params, indexFrom=i) for i in indices], timeout=PAGE_TIMEOUT)
+
+    try:
+        # Satu attempt untuk seluruh batch (token sebanyak jumlah page); retry per page di fetch_page
+        batch = retry_call(
+            get_batch,
+            host=IDX_HOST,
+            policy=RetryPolicy(max_attempts=1),
+            stop_event=stop_event,
+            tokens=len(indices),
+        )
+    except CircuitOpenError as e:
+        print(f"⛔ Batch page {indices[0]}-{indices[-1]} dilewati: {e}")
+        return [None] * len(indices)
+    except (requests.exceptions.RequestException, TransportBlocked) as e:
+        print(f"Batch page {indices[0]}-{indices[-1]} gagal: {e}")
+        batch = [e] * len(indices)
+
+    results = []
+    for index_from, result in zip(indices, batch):
+        if isinstance(result, Exception):
+            print(f"Request gagal page {index_from} di batch: {result}")
+            result = fetch_page(index_from)
+        results.append(result)
+    return results
+
+# --- 3e. Proses satu page balasan ---
+def lamp1_job(attachments, route):
+    """Job ekstraksi Lamp1 untuk route ini; PDF-nya langsung di-prefetch"""
+    lamp1_att = select_attachment(attachments, route.attachment)
+    if lamp1_att:
+        prefetcher.prefetch(lamp1_att["FullSavePath"], lamp1_att.get("Id"))
+    return ("lamp1", {
+        "attachments": attachments,
+        "notify_date": yesterday_date,
+        "selector": route.attachment
+    })
+
+def announcement_row(tanggal, judul, kode_emiten, attachments):
+    return {
+        "tanggal": tanggal,
+        "judul": judul,
+        "kode_emiten": kode_emiten,
+        "attachment": attachments,
+        "summary": None
+    }
+
+def process_replies(replies):
+    """
+    Proses semua pengumuman di satu page secara berurutan.
+    Return (to_insert_page, jobs, stop_scraping) - jobs berisi (job_type, payload) yang
+    di-enqueue setelah insert, stop_scraping True jika duplikat ditemukan.
+    """
     to_insert_page = []
+    jobs = []
+    stop_scraping = False
 
-    for item in replies:
+    # Satu scan routing untuk semua judul di page ini
+    page_routes = get_router().classify_page([item["pengumuman"].get("JudulPengumuman") or "" for item in replies])
+
+    for item, routes in zip(replies, page_routes):
         peng = item["pengumuman"]
         tanggal = peng.get("TglPengumuman")  # misal '2025-12-01T11:56:05'
         judul = peng.get("JudulPengumuman")
@@ -231,53 +517,52 @@ while True:
             })
 
         key = (tanggal, judul)
-        if key in existing_keys:
+        if single_page_mode:
+            # Insert tetap idempotent (upsert ignore_duplicates), summarization tidak dijalankan
+            lamp1_route = route_for_handler(routes, "lamp1")
+            if lamp1_route:
+                print(f"✅ Ditemukan '5%' di judul: {judul}")
+                jobs.append(lamp1_job(cleaned_attachments, lamp1_route))
+                to_insert_page.append(announcement_row(tanggal, judul, kode_emiten, cleaned_attachments))
+                existing_keys.add(key)
+        elif is_duplicate(key):
+            if not stop_on_duplicate:
+                # Backfill: halaman lama bisa sebagian sudah masuk (run sebelumnya terputus)
+                continue
             print(f"Duplikat ditemukan: {tanggal} - {judul}")
             stop_scraping = True
             break
         else:
             print(f"Pengumuman baru: {tanggal} - {judul}")
             
-            # Initialize summary
-            summary = None
-            
-            # --- Check untuk "5%" di judul ---
-            if "5%" in judul and not has_5percent_today:
+            # --- Route ekstraksi Lamp1 (judul mengandung "5%") ---
+            lamp1_route = route_for_handler(routes, "lamp1")
+            if lamp1_route and not has_5percent_today:
                 print(f"✅ Ditemukan '5%' di judul (belum ada di DB): {judul}")
-                process_lamp1_pdf(cleaned_attachments)
-            elif "5%" in judul and has_5percent_today:
+                jobs.append(lamp1_job(cleaned_attachments, lamp1_route))
+            elif lamp1_route and has_5percent_today:
                 print(f"⏭ Pengumuman '5%' sudah pernah diproses hari ini, skip ekstraksi.")
 
-            # --- Check untuk summarization keywords ---
-            should_summarize = any(k.lower() in judul.lower() for k in SUMMARY_KEYWORDS)
-            if should_summarize:
-                print(f"🔍 Judul mengandung keyword penting, melakukan summarization...")
-                # Find PDF attachment (prefer Lamp1 or just the first one)
-                target_pdf_url = None
-                for att in cleaned_attachments:
-                    if att.get("FullSavePath"):
-                        target_pdf_url = att.get("FullSavePath")
-                        # Prefer lampiran over others if multiple? Usually just take the first valid PDF.
-                        if "lamp" in att.get("OriginalFilename", "").lower():
-                             break
+            # --- Route summarization (keyword penting di judul) ---
+            summary_route = route_for_handler(routes, "summary")
+            if summary_route:
+                print(f"🔍 Judul mengandung keyword penting ({summary_route.name}), melakukan summarization...")
+                target_att = summary_route.select_attachment(cleaned_attachments)
                 
-                if target_pdf_url:
-                    print(f"   Processing PDF: {target_pdf_url}")
-                    summary_result = process_summary(target_pdf_url, tanggal, judul, kode_emiten)
-                    if summary_result["success"]:
-                        summary = summary_result["summary"]
-                    
-                    print(f"   ✅ Summary logged to {SUMMARY_LOG_FILE}")
+                if target_att:
+                    prefetcher.prefetch(target_att["FullSavePath"], target_att.get("Id"))
+                    jobs.append(("summary", {
+                        "url": target_att["FullSavePath"],
+                        "attachment_id": target_att.get("Id"),
+                        "tanggal": tanggal,
+                        "judul": judul,
+                        "kode_emiten": kode_emiten,
+                        "prompt": summary_route.prompt
+                    }))
                 else:
                     print("   ⚠ No PDF attachment found for summarization.")
             
-            to_insert_page.append({
-                "tanggal": tanggal,
-                "judul": judul,
-                "kode_emiten": kode_emiten,
-                "attachment": cleaned_attachments,
-                "summary": summary
-            })
+            to_insert_page.append(announcement_row(tanggal, judul, kode_emiten, cleaned_attachments))
             existing_keys.add(key)
 
         cleaned_item = {
@@ -292,20 +577,236 @@ while True:
         }
         all_data.append(cleaned_item)
 
-    # --- 5. Insert batch ke Supabase ---
-    if to_insert_page:
-        print(f"Memasukkan {len(to_insert_page)} pengumuman baru ke database.")
+    return to_insert_page, jobs, stop_scraping
+
+# --- 4. Loop Scraping ---
+# Page 0 di-fetch sendiri dulu: pada run "tidak ada yang baru" duplikat sudah ada di
+# page 0, jadi cukup satu request. Jika page 0 tidak berisi duplikat, page berikutnya
+# di-fetch paralel dalam window CRAWL_CONCURRENCY, tapi diproses berurutan
+# sesuai indexFrom. Begitu duplikat ditemukan, page setelahnya dibatalkan.
+# Jika transport mendukung batch (Playwright), satu window = satu panggilan batch
+# berisi PLAYWRIGHT_BATCH_SIZE page.
+def crawl():
+    """Jalankan satu putaran crawl GetAnnouncement. Return (ok, jumlah pengumuman baru)"""
+    breaker = get_breaker(IDX_HOST)
+    if breaker.is_open():
+        # IDX baru saja gagal beruntun (run ini atau run sebelumnya): jangan buang waktu retry
+        print(f"⛔ IDX dianggap down, crawl dilewati (coba lagi dalam {breaker.retry_in():.0f} detik)")
+        return False, 0
+
+    crawl_start = time.monotonic()
+    pages_fetched = 0
+    pages_processed = 0
+    new_count = 0
+    ok = True
+
+    # Window dibuka setelah page 0 diproses tanpa duplikat (mode --single-page: tidak pernah)
+    window, batch_size = 1, 1
+    concurrency = 1 if single_page_mode else CRAWL_CONCURRENCY
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+    pending_pages = {}  # indexFrom -> (future, posisi di batch atau None)
+    next_index = params["indexFrom"]
+
+    while True:
+        # Isi window dengan page berikutnya
+        if transport.supports_batch:
+            if not pending_pages:
+                indices = list(range(next_index, next_index + batch_size))
+                future = executor.submit(fetch_batch, indices)
+                for pos, index_from in enumerate(indices):
+                    pending_pages[index_from] = (future, pos)
+                next_index += batch_size
+        else:
+            while len(pending_pages) < window:
+                pending_pages[next_index] = (executor.submit(fetch_page, next_index), None)
+                next_index += 1
+
+        print(f"Checking page: {params['indexFrom']}")
+        future, pos = pending_pages.pop(params["indexFrom"])
+        result = future.result() if pos is None else future.result()[pos]
+        if result is None:
+            ok = False
+            break
+        pages_fetched += 1
+
+        data, status_code = result
+        replies = data.get("Replies", [])
+        print(f"Response status: {status_code}")
+        print(f"Number of replies: {len(replies)}")
+        if not replies:
+            print("Full response data:", json.dumps(data, indent=2))
+            print("Tidak ada balasan lagi, scraping dihentikan.")
+            break
+
+        to_insert_page, jobs, stop_scraping = process_replies(replies)
+        pages_processed += 1
+        new_count += len(to_insert_page)
+
+        # --- 5. Job background & insert ke buffer Supabase ---
+        for job_type, payload in jobs:
+            if job_type == "summary":
+                with pending_summary_lock:
+                    pending_summary_jobs[(payload["tanggal"], payload["judul"])] = payload
+            else:
+                job_queue.enqueue(job_type, payload)
+
+        if to_insert_page:
+            print(f"Memasukkan {len(to_insert_page)} pengumuman baru ke database.")
+            writer.add(to_insert_page)
+
+        if stop_scraping or single_page_mode:
+            # print("Scraping dihentikan karena duplikat ditemukan.")
+            break
+
+        params["indexFrom"] += 1
+        window, batch_size = concurrency, 1 if single_page_mode else PLAYWRIGHT_BATCH_SIZE
+
+    # Batalkan page di luar batas duplikat / akhir data
+    stop_event.set()
+    for future, _ in pending_pages.values():
+        future.cancel()
+    executor.shutdown(wait=True, cancel_futures=True)
+    writer.flush()
+    if failed_row_count:
+        print(f"❌ {failed_row_count} baris gagal ditulis ke Supabase")
+        ok = False
+    for future, pos in pending_pages.values():
+        if future.cancelled() or future.exception() is not None:
+            continue
+        result = future.result() if pos is None else future.result()[pos]
+        if result is not None:
+            pages_fetched += 1
+
+    crawl_elapsed = time.monotonic() - crawl_start
+    print(
+        f"📈 Crawl: {pages_processed} page diproses, {pages_fetched} page di-fetch "
+        f"dalam {crawl_elapsed:.2f}s ({pages_fetched / crawl_elapsed if crawl_elapsed > 0 else 0:.2f} page/detik, "
+        f"concurrency={concurrency}, rate={CRAWL_RATE}/s, transport={transport.current})"
+    )
+    return ok, new_count
+
+def wait_jobs():
+    """Tunggu semua job background selesai (mode one-shot)"""
+    remaining = job_queue.pending_count()
+    if remaining:
+        print(f"⏳ Menunggu {remaining} job background selesai...")
+    job_queue.join()
+
+def run_once(wait_for_jobs=True, day=None, full=False, single_page=False):
+    """Satu run lengkap: reset state, crawl, lalu cetak ringkasan"""
+    print(f"=== {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')} ===")
+    start_run(day, full, single_page)
+    ok, new_count = crawl()
+    if wait_for_jobs:
+        wait_jobs()
+    metrics.write_textfile("idx_scraper")
+
+    print(f"Total pengumuman yang diproses: {len(all_data)}")
+    for item in all_data[:5]:
+        peng = item["pengumuman"]
+        print("Tanggal:", peng.get("TglPengumuman"))
+        print("Judul:", peng.get("JudulPengumuman"))
+        print("Kode:", peng.get("Kode_Emiten").strip())
+        print("-------------------------")
+    return ok, new_count
+
+# --- 6. Mode daemon ---
+# Polling GetAnnouncement terus-menerus dengan session cloudscraper, client Supabase
+# dan dedup store yang tetap hangat. Interval mengikuti jam publikasi IDX (WIB):
+# rapat saat jendela sibuk, longgar di malam hari dan akhir pekan.
+WIB = ZoneInfo("Asia/Jakarta")
+POLL_BUSY_SECONDS = float(os.environ.get("POLL_BUSY_SECONDS", "10"))
+POLL_NORMAL_SECONDS = float(os.environ.get("POLL_NORMAL_SECONDS", "60"))
+POLL_QUIET_SECONDS = float(os.environ.get("POLL_QUIET_SECONDS", "600"))
+
+# (jam, menit) mulai - selesai: pra-pembukaan, istirahat siang, setelah penutupan pasar
+BUSY_WINDOWS = [
+    ((6, 30), (9, 30)),
+    ((11, 30), (14, 0)),
+    ((15, 30), (19, 30)),
+]
+NORMAL_HOURS = ((6, 0), (22, 0))
+
+def poll_interval(now=None):
+    """Interval polling (detik) berdasarkan waktu WIB"""
+    now = now or datetime.datetime.now(WIB)
+    if now.weekday() >= 5:  # Sabtu / Minggu
+        return POLL_QUIET_SECONDS
+    hm = (now.hour, now.minute)
+    for start, end in BUSY_WINDOWS:
+        if start <= hm < end:
+            return POLL_BUSY_SECONDS
+    if NORMAL_HOURS[0] <= hm < NORMAL_HOURS[1]:
+        return POLL_NORMAL_SECONDS
+    return POLL_QUIET_SECONDS
+
+def run_daemon():
+    print(f"🛰 Mode daemon aktif (busy={POLL_BUSY_SECONDS}s, normal={POLL_NORMAL_SECONDS}s, quiet={POLL_QUIET_SECONDS}s)")
+    failures = 0
+    while True:
         try:
-            supabase.table("idx_keterbukaan_informasi").insert(to_insert_page).execute()
+            ok, new_count = run_once(wait_for_jobs=False)
         except Exception as e:
-            print(f"Gagal memasukkan data ke Supabase: {e}")
+            print(f"❌ Error saat polling: {e}")
+            ok, new_count = False, 0
+
+        interval = poll_interval()
+        if not ok:
+            # Backoff eksponensial saat IDX / jaringan bermasalah
+            failures += 1
+            interval = min(POLL_QUIET_SECONDS, interval * (2 ** failures))
+        else:
+            failures = 0
+            if new_count:
+                # Pengumuman cenderung datang beruntun, cek lagi secepatnya
+                interval = min(interval, POLL_BUSY_SECONDS)
+
+        print(f"⏱ Polling berikutnya dalam {interval:.0f} detik")
+        time.sleep(interval)
 
-    params["indexFrom"] += 1
+def main():
+    parser = argparse.ArgumentParser(description="Scraper keterbukaan informasi IDX")
+    parser.add_argument("--daemon", action="store_true", help="Jalankan terus-menerus dengan interval polling adaptif")
+    parser.add_argument("--transport", choices=["auto"] + TRANSPORT_ORDER, default="auto",
+                        help="Transport untuk GetAnnouncement (default: auto, eskalasi otomatis)")
+    parser.add_argument("--date", type=datetime.date.fromisoformat,
+                        help="Crawl satu tanggal (YYYY-MM-DD) alih-alih hari ini (dipakai backfill.py)")
+    parser.add_argument("--full", action="store_true",
+                        help="Crawl semua page tanggal itu, jangan berhenti di duplikat pertama")
+    parser.add_argument("--no-jobs", action="store_true",
+                        help="Hanya enqueue job background, worker dijalankan proses lain")
+    parser.add_argument("--single-page", action="store_true",
+                        help=f"Satu request page berisi {SINGLE_PAGE_SIZE} pengumuman, hanya ekstraksi Lamp1 "
+                             f"(selalu diekstrak ulang); pengganti scrape_alternative.py")
+    args = parser.parse_args()
+    if args.single_page and (args.daemon or args.full):
+        parser.error("--single-page tidak bisa digabung dengan --daemon / --full")
+
+    if args.transport != "auto":
+        set_transport(args.transport)
+
+    if args.no_jobs:
+        # Job (yang memakai hasil prefetch) dijalankan proses lain: jangan download di sini
+        prefetcher.shutdown(wait=False)
+    else:
+        job_queue.start()
+    ok = True
+    if args.daemon:
+        try:
+            run_daemon()
+        except KeyboardInterrupt:
+            print("Daemon dihentikan.")
+    else:
+        ok, _ = run_once(wait_for_jobs=not args.no_jobs, day=args.date, full=args.full, single_page=args.single_page)
+    # Prefetch yang tidak pernah ditunggu job (mis. daemon dihentikan) tidak menahan exit
+    prefetcher.shutdown(wait=False, cancel=True)
+    writer.close()
+    job_queue.stop()
+    transport.close()
+    metrics.write_textfile("idx_scraper")
+    if args.date and not ok:
+        # Exit code dibaca backfill.py untuk menandai shard gagal
+        sys.exit(1)
 
-print(f"Total pengumuman yang diproses: {len(all_data)}")
-for item in all_data[:5]:
-    peng = item["pengumuman"]
-    print("Tanggal:", peng.get("TglPengumuman"))
-    print("Judul:", peng.get("JudulPengumuman"))
-    print("Kode:", peng.get("Kode_Emiten").strip())
-    print("-------------------------")
+if __name__ == "__main__":
+    main()
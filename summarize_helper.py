@@ -1,39 +1,59 @@
 from io import BytesIO
-import cloudscraper
-import pdfplumber
 from dotenv import load_dotenv
 import os
 import requests
-from groq import Groq
 import csv
 import datetime
-from pdf2image import convert_from_bytes
-from PIL import Image
 import time
-from prompts.default_prompt import default_system_prompt
-from prompts.volatilitas_prompt import volatilitas_system_prompt
+import importlib
+import metrics
+from retry_helper import RetryPolicy, host_of, retry_call
+from pdf_cache import get_cache
+from download_manager import get_manager
+
+# Library berat (groq, pdfplumber, pdf2image, cloudscraper) di-import di dalam fungsi
+# yang memakainya, supaya import modul ini murah.
 
 # Load API key
 load_dotenv()
 api_key_groq = os.getenv("GROQ_API_KEY")
 api_key_ocr = os.getenv("OCR_SPACE_API_KEY")
-client = Groq(api_key=api_key_groq)
+_client = None
+
+DOWNLOAD_RETRY_POLICY = RetryPolicy(max_attempts=4, base_delay=2, max_delay=30)
+
+def get_client():
+    """Client Groq, dibuat saat pertama kali dipakai"""
+    global _client
+    if _client is None:
+        from groq import Groq
+        _client = Groq(api_key=api_key_groq)
+    return _client
+
+def fetch_pdf_in_memory(url, attachment_id=None):
+    """Ambil PDF ke memory (dari cache PDF jika sudah pernah didownload)"""
+    def download():
+        with metrics.timed("pdf_download", kind="summary") as m:
+            # Session keep-alive per host dari download manager (tidak membuat scraper baru per PDF)
+            content = get_manager().get_bytes(url, timeout=60)
+            m.values["bytes"] = len(content)
+        return content
 
-def fetch_pdf_in_memory(url):
-    """Download PDF ke memory tanpa simpan di disk"""
-    scraper = cloudscraper.create_scraper(
-        browser={'custom': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120 Safari/537.36'}
-    )
     try:
-        resp = scraper.get(url, stream=True, timeout=60)
-        resp.raise_for_status()
-        return BytesIO(resp.content)
+        content, _ = get_cache().fetch(
+            url,
+            lambda: retry_call(download, host=host_of(url), policy=DOWNLOAD_RETRY_POLICY, label="Download PDF"),
+            attachment_id=attachment_id,
+        )
+        return BytesIO(content)
     except Exception as e:
         print("Error fetching PDF:", e)
         return None
 
 def extract_text_from_pdf(pdf_bytes, debug=False):
     """Ekstrak teks PDF menggunakan pdfplumber, berhenti jika menemukan 'Go to Indonesian Page'"""
+    import pdfplumber
+
     text = ""
     try:
         pdf_bytes.seek(0)  # reset pointer ke awal
@@ -56,6 +76,8 @@ def extract_text_from_pdf(pdf_bytes, debug=False):
 
 def extract_text_with_ocr_space(pdf_bytes, max_pages=5, debug=False):
     """Fallback OCR menggunakan OCR.space API dengan PDF diubah ke image dulu"""
+    from pdf2image import convert_from_bytes
+
     try:
         pdf_bytes.seek(0)
         images = convert_from_bytes(pdf_bytes.read())
@@ -75,8 +97,10 @@ def extract_text_with_ocr_space(pdf_bytes, max_pages=5, debug=False):
                 'scale': True
             }
 
-            r = requests.post("https://api.ocr.space/parse/image", files=files, data=data)
-            result = r.json()
+            with metrics.timed("ocr_page", page=i) as m:
+                r = requests.post("https://api.ocr.space/parse/image", files=files, data=data)
+                result = r.json()
+                m.values["chars"] = sum(len(p.get("ParsedText", "")) for p in result.get("ParsedResults") or [])
             if debug: print(f"OCR result for page {i}: {result}")
 
             if result.get("ParsedResults"):
@@ -95,45 +119,52 @@ def extract_text_with_ocr_space(pdf_bytes, max_pages=5, debug=False):
         print("OCR.space error:", e)
         return ""
 
-def summarize_text(text, judul=None):
+def summarize_text(text, judul=None, prompt_name=None):
     """Gunakan Groq API untuk merangkum teks dengan prompt yang sesuai"""
-    # Tentukan prompt berdasarkan keyword di judul
-    prompt = load_prompt(judul)
+    # Tentukan prompt berdasarkan routing judul (atau prompt dari job)
+    prompt = load_prompt(judul, prompt_name)
     
     try:
-        completion = client.chat.completions.create(
-            model="meta-llama/llama-4-scout-17b-16e-instruct",
-            messages=[
-                {"role": "system", "content": prompt},
-                {"role": "user", "content": text}
-            ],
-            temperature=0.2,
-            max_completion_tokens=512,
-            top_p=1,
-            stream=False
-        )
+        with metrics.timed("groq", prompt=prompt_name or "auto") as m:
+            completion = get_client().chat.completions.create(
+                model="meta-llama/llama-4-scout-17b-16e-instruct",
+                messages=[
+                    {"role": "system", "content": prompt},
+                    {"role": "user", "content": text}
+                ],
+                temperature=0.2,
+                max_completion_tokens=512,
+                top_p=1,
+                stream=False
+            )
+            usage = getattr(completion, "usage", None)
+            if usage is not None:
+                m.values["prompt_tokens"] = usage.prompt_tokens or 0
+                m.values["completion_tokens"] = usage.completion_tokens or 0
         return completion.choices[0].message.content
     except Exception as e:
         return f"Error summarizing: {e}"
 
-def load_prompt(judul=None):
-    """Load prompt berdasarkan keyword di judul"""
-    if judul:
-        judul_lower = judul.lower()
-        
-        # Check volatilitas
-        if "volatilitas" in judul_lower:
-            return volatilitas_system_prompt
-    
-    # Default
-    return default_system_prompt
-
-def process_summary(url, tanggal=None, judul=None, kode_emiten=None, debug=False):
+def load_prompt(judul=None, prompt_name=None):
+    """
+    Load prompt berdasarkan route summary yang cocok dengan judul (routes.json).
+    Prompt <nama> diambil dari prompts/<nama>_prompt.py variabel <nama>_system_prompt.
+    """
+    if not prompt_name and judul:
+        from routing import get_router, route_for_handler
+
+        route = route_for_handler(get_router().classify(judul), "summary")
+        prompt_name = route.prompt if route else None
+    prompt_name = prompt_name or "default"
+    module = importlib.import_module(f"prompts.{prompt_name}_prompt")
+    return getattr(module, f"{prompt_name}_system_prompt")
+
+def process_summary(url, tanggal=None, judul=None, kode_emiten=None, debug=False, prompt_name=None, attachment_id=None):
     result = {"success": False, "method": "none", "summary": "", "error": "", "extracted_text": ""}
     
     if debug: print("Starting PDF fetch...")
     start_time = time.time()
-    pdf_bytes = fetch_pdf_in_memory(url)
+    pdf_bytes = fetch_pdf_in_memory(url, attachment_id)
     fetch_time = time.time() - start_time
     if debug: print(f"Fetch completed in {fetch_time:.2f}s")
     
@@ -177,7 +208,7 @@ def process_summary(url, tanggal=None, judul=None, kode_emiten=None, debug=False
 
     if debug: print("Starting summarization with Groq...")
     start_time = time.time()
-    summary = summarize_text(text, judul)
+    summary = summarize_text(text, judul, prompt_name)
     summary_time = time.time() - start_time
     if debug: print(f"Summarization completed in {summary_time:.2f}s")
     
@@ -0,0 +1,75 @@
+# Unit test BulkWriter: hanya error sementara yang di-retry saat upsert.
+#   python test_bulk_writer.py        (atau lewat pytest)
+import httpx
+from postgrest.exceptions import APIError
+
+import metrics
+from bulk_writer import BulkWriter, is_retryable_write
+
+# Jangan menulis metrics.jsonl ke repo saat test
+metrics.METRICS_ENABLED = False
+
+
+class FakeClient:
+    """Client Supabase palsu: upsert().execute() raise error berikutnya dari `errors`"""
+
+    def __init__(self, errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def table(self, name):
+        return self
+
+    def upsert(self, rows, **kwargs):
+        return self
+
+    def execute(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+
+
+def write(errors):
+    client = FakeClient(errors)
+    failed = []
+    writer = BulkWriter(lambda: client, "t", max_retries=4, backoff_base=0.001,
+                        on_error=lambda rows, e: failed.append(e))
+    writer.add([{"tanggal": "2025-12-01T10:00:00", "judul": "a"}])
+    writer.close()
+    return client.calls, failed
+
+
+def test_classification():
+    assert not is_retryable_write(APIError({"code": "23502", "message": "null value"}))
+    assert not is_retryable_write(APIError({"code": "42703", "message": "column does not exist"}))
+    assert not is_retryable_write(APIError({"code": "PGRST301", "message": "JWT expired"}))
+    assert not is_retryable_write(APIError({"code": 401, "message": "JSON could not be generated"}))
+    assert not is_retryable_write(APIError({"message": "Invalid API key"}))
+    assert is_retryable_write(APIError({"code": 503, "message": "JSON could not be generated"}))
+    assert is_retryable_write(APIError({"code": 429, "message": "JSON could not be generated"}))
+    assert is_retryable_write(APIError({"code": "PGRST001", "message": "could not connect"}))
+    assert is_retryable_write(APIError({"code": "57014", "message": "statement timeout"}))
+    assert is_retryable_write(APIError({"code": "40P01", "message": "deadlock detected"}))
+    assert is_retryable_write(httpx.ConnectError("reset"))
+    assert is_retryable_write(httpx.ReadTimeout("timeout"))
+    assert not is_retryable_write(ValueError("bug"))
+
+
+def test_permanent_error_is_not_retried():
+    calls, failed = write([APIError({"code": "42P01", "message": "relation does not exist"})])
+    assert calls == 1
+    assert len(failed) == 1
+
+
+def test_transient_error_is_retried():
+    calls, failed = write([httpx.ConnectError("reset"), APIError({"code": 502, "message": "bad gateway"})])
+    assert calls == 3
+    assert not failed
+
+
+if __name__ == "__main__":
+    tests = [(name, fn) for name, fn in sorted(globals().items()) if name.startswith("test_") and callable(fn)]
+    for name, fn in tests:
+        fn()
+        print(f"✔ {name}")
+    print(f"✔ {len(tests)} test lulus")
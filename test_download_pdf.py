@@ -1,15 +1,13 @@
-import cloudscraper
 import datetime
 import subprocess
 from pathlib import Path
+from pdf_cache import get_cache
+from download_manager import get_manager
 
 # --- Setup folder untuk PDF Lamp1 ---
 lamp1_folder = Path("5_persen/pdf")
 lamp1_folder.mkdir(parents=True, exist_ok=True)
 
-# --- Setup cloudscraper ---
-scraper = cloudscraper.create_scraper()
-
 # --- Fungsi untuk download dan extract PDF Lamp1 ---
 def process_lamp1_pdf(attachments):
     """
@@ -31,15 +29,13 @@ def process_lamp1_pdf(attachments):
         filename = lamp1_attachment.get("OriginalFilename")
         
         print(f"📥 Download: {filename}")
-        resp = scraper.get(url_pdf, stream=True, timeout=30)
-        resp.raise_for_status()
-        
         filepath = lamp1_folder / filename
-        with open(filepath, 'wb') as f:
-            for chunk in resp.iter_content(8192):
-                if chunk:
-                    f.write(chunk)
-        print(f"✔ Download selesai: {filepath}")
+
+        _, hit = get_cache().fetch_to(
+            url_pdf, filepath, lambda: get_manager().get_bytes(url_pdf, timeout=30),
+            attachment_id=lamp1_attachment.get("Id"),
+        )
+        print(f"✔ {'Diambil dari cache' if hit else 'Download selesai'}: {filepath}")
         
         # Panggil extract_pdf_to_csv.js
         print(f"🔄 Menjalankan extract_pdf_to_csv.js...")
@@ -0,0 +1,148 @@
+# Unit test recovery JobQueue: job running hanya diambil alih jika pemiliknya mati atau lease habis.
+#   python test_job_queue.py        (atau lewat pytest)
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from job_queue import JobQueue, _owner
+
+
+def open_queue(tmp, **kwargs):
+    queue = JobQueue(Path(tmp) / "jobs.sqlite3", **kwargs)
+    queue.register("t", lambda payload: None)
+    return queue
+
+
+def add_running(queue, owner, lease_until):
+    """Sisipkan job 'running' seolah di-claim oleh `owner`"""
+    queue.enqueue("t", {})
+    job_id = queue._conn.execute("SELECT MAX(id) FROM jobs").fetchone()[0]
+    queue._conn.execute(
+        "UPDATE jobs SET status = 'running', attempts = 1, owner = ?, lease_until = ? WHERE id = ?",
+        (owner, lease_until, job_id)
+    )
+    return job_id
+
+
+def status(queue, job_id):
+    return queue._conn.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()[0]
+
+
+def dead_pid():
+    proc = subprocess.Popen([sys.executable, "-c", "pass"])
+    proc.wait()
+    return proc.pid
+
+
+def test_open_queue_does_not_touch_running_jobs():
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = open_queue(tmp)
+        job_id = add_running(queue, "host-lain:1", time.time() - 10)
+        # Membuka queue (mis. import scrape di anak backfill) tidak boleh melakukan recovery
+        other = open_queue(tmp)
+        assert status(other, job_id) == "running"
+
+
+def test_recover_only_dead_or_expired_owners():
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = open_queue(tmp)
+        host = socket.gethostname()
+        future = time.time() + 600
+        live = add_running(queue, _owner(), future)
+        remote = add_running(queue, "host-lain:1", future)
+        dead = add_running(queue, f"{host}:{dead_pid()}", future)
+        expired = add_running(queue, "host-lain:2", time.time() - 1)
+        legacy = add_running(queue, None, None)
+        assert open_queue(tmp).recover() == 3
+        assert status(queue, live) == "running"
+        assert status(queue, remote) == "running"
+        for job_id in (dead, expired, legacy):
+            assert status(queue, job_id) == "pending"
+
+
+def test_backfill_shard_does_not_steal_running_job():
+    # Regresi: backfill menjalankan worker di parent lalu start `scrape.py --no-jobs` per shard;
+    # dulu setiap shard yang membuka queue mengembalikan job parent yang sedang berjalan ke pending
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = JobQueue(Path(tmp) / "jobs.sqlite3")
+        started = threading.Event()
+        release = threading.Event()
+
+        def handler(payload):
+            started.set()
+            release.wait(10)
+
+        queue.register("t", handler)
+        queue.enqueue("t", {})
+        queue.start()
+        assert started.wait(5)
+        shard = (
+            "import sys; from job_queue import JobQueue\n"
+            "q = JobQueue(sys.argv[1]); q.register('t', print); q.enqueue('t', {})\n"
+            "print(q.recover())\n"
+        )
+        out = subprocess.run(
+            [sys.executable, "-c", shard, str(Path(tmp) / "jobs.sqlite3")],
+            cwd=str(Path(__file__).parent), capture_output=True, text=True, check=True
+        ).stdout
+        # Pemilik job (proses ini) masih hidup: tidak ada yang diambil alih
+        assert out.strip() == "0"
+        assert queue._conn.execute("SELECT status FROM jobs WHERE id = 1").fetchone()[0] == "running"
+        release.set()
+        assert queue.join(timeout=10)
+        queue.stop()
+        assert queue._conn.execute("SELECT attempts FROM jobs WHERE id = 1").fetchone()[0] == 1
+
+
+def test_worker_records_owner_and_clears_it_when_done():
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = JobQueue(Path(tmp) / "jobs.sqlite3")
+        seen = []
+        release = threading.Event()
+
+        def handler(payload):
+            seen.append(queue._conn.execute("SELECT owner, lease_until FROM jobs").fetchone())
+            release.wait(5)
+
+        queue.register("t", handler)
+        queue.enqueue("t", {})
+        queue.start()
+        while not seen:
+            time.sleep(0.01)
+        # Proses lain yang recover saat job berjalan tidak mengambil alih job ini
+        assert open_queue(tmp).recover() == 0
+        release.set()
+        assert queue.join(timeout=5)
+        queue.stop()
+        owner, lease_until = seen[0]
+        assert owner == f"{socket.gethostname()}:{os.getpid()}"
+        assert lease_until > time.time()
+        assert queue._conn.execute("SELECT status, owner, lease_until FROM jobs").fetchone() == ("done", None, None)
+
+
+def test_heartbeat_renews_lease():
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = JobQueue(Path(tmp) / "jobs.sqlite3", lease_seconds=1.5)
+        release = threading.Event()
+        queue.register("t", lambda payload: release.wait(5))
+        queue.enqueue("t", {})
+        queue.start()
+        time.sleep(2.5)
+        # Lease awal 1.5s sudah lewat, tapi diperpanjang heartbeat
+        assert open_queue(tmp).recover() == 0
+        release.set()
+        assert queue.join(timeout=5)
+        queue.stop()
+
+
+if __name__ == "__main__":
+    tests = [(name, fn) for name, fn in sorted(globals().items()) if name.startswith("test_") and callable(fn)]
+    for name, fn in tests:
+        fn()
+        print(f"✔ {name}")
+    print(f"✔ {len(tests)} test lulus")
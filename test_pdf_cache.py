@@ -0,0 +1,62 @@
+# Unit test validasi PdfCache: hanya PDF utuh yang masuk cache.
+#   python test_pdf_cache.py        (atau lewat pytest)
+import tempfile
+
+import metrics
+from pdf_cache import InvalidPdf, PdfCache
+
+# Jangan menulis metrics.jsonl ke repo saat test
+metrics.METRICS_ENABLED = False
+
+PDF = b"%PDF-1.7\n" + b"x" * 200 + b"\n%%EOF\n"
+URL = "https://www.idx.co.id/Lamp1.pdf"
+
+
+def rejected(cache, download):
+    try:
+        cache.fetch(URL, download)
+    except InvalidPdf:
+        return cache.get(URL) is None
+    return False
+
+
+def test_fetch_stores_valid_pdf():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = PdfCache(tmp)
+        assert cache.fetch(URL, lambda: PDF) == (PDF, False)
+        assert cache.fetch(URL, lambda: b"tidak dipanggil") == (PDF, True)
+        # Sampah sebelum header masih diterima (di dalam 1024 byte pertama)
+        assert cache.fetch(URL + "?v=2", lambda: b"\r\n" + PDF)[0] == b"\r\n" + PDF
+
+
+def test_fetch_rejects_non_pdf():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = PdfCache(tmp)
+        assert rejected(cache, lambda: b"<html>Just a moment...</html>")
+        assert rejected(cache, lambda: b"")
+        assert cache.stats()["objects"] == 0
+
+
+def test_fetch_checks_content_length():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = PdfCache(tmp)
+        assert rejected(cache, lambda: (PDF[:100], len(PDF)))
+        assert cache.fetch(URL, lambda: (PDF, len(PDF))) == (PDF, False)
+
+
+def test_get_drops_invalid_entry_from_old_cache():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = PdfCache(tmp)
+        # Entry yang tersimpan sebelum ada validasi
+        cache.put(URL, b"<html>error</html>")
+        assert cache.get(URL) is None
+        assert cache.stats()["objects"] == 0
+        assert cache.fetch(URL, lambda: PDF) == (PDF, False)
+
+
+if __name__ == "__main__":
+    tests = [(name, fn) for name, fn in sorted(globals().items()) if name.startswith("test_") and callable(fn)]
+    for name, fn in tests:
+        fn()
+        print(f"✔ {name}")
+    print(f"✔ {len(tests)} test lulus")
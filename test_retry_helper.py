@@ -0,0 +1,249 @@
+# Unit test RetryPolicy, CircuitBreaker dan retry_call (tanpa jaringan).
+#   python test_retry_helper.py        (atau lewat pytest)
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import retry_helper
+from retry_helper import PROBE, CircuitBreaker, CircuitOpenError, RetryPolicy, is_retryable, parse_retry_after, retry_call
+
+FAST = RetryPolicy(max_attempts=3, base_delay=0.001, max_delay=0.002)
+
+
+class HttpError(Exception):
+    def __init__(self, status_code, retry_after=None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+def use_breaker(host, **kwargs):
+    """Pasang breaker tanpa file state untuk host tes (tidak menyentuh circuit_state.json)"""
+    breaker = CircuitBreaker(host, state_path=None, **kwargs)
+    with retry_helper._registry_lock:
+        retry_helper._breakers[host] = breaker
+    return breaker
+
+
+def expire(breaker):
+    """Anggap cooldown breaker sudah selesai"""
+    breaker._open_until = time.time() - 1
+
+
+# ----- RetryPolicy -----
+def test_delay_grows_with_jitter_and_cap():
+    policy = RetryPolicy(base_delay=1, max_delay=8)
+    for attempt, full in ((1, 1), (2, 2), (3, 4), (4, 8), (6, 8)):
+        for _ in range(50):
+            delay = policy.delay_for(attempt)
+            assert full / 2 <= delay <= full, (attempt, delay)
+
+
+def test_delay_respects_retry_after():
+    policy = RetryPolicy(base_delay=1, max_delay=8, max_retry_after=30)
+    assert policy.delay_for(1, retry_after=20) == 20
+    assert policy.delay_for(1, retry_after=31) is None
+    assert policy.delay_for(4, retry_after=0) >= 4
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("7") == 7
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("bukan angka") is None
+    http_date = time.strftime("%a, %d %b %Y %H:%M:%S GMT", time.gmtime(time.time() + 60))
+    assert 55 <= parse_retry_after(http_date) <= 60
+
+
+def test_is_retryable():
+    assert is_retryable(HttpError(503))
+    assert is_retryable(HttpError(429))
+    assert not is_retryable(HttpError(404))
+    assert is_retryable(ConnectionResetError())
+    assert not is_retryable(ValueError())
+    assert not is_retryable(CircuitOpenError("h", 1))
+
+
+# ----- CircuitBreaker -----
+def test_breaker_opens_after_threshold():
+    breaker = CircuitBreaker("h", failure_threshold=3, reset_timeout=60, state_path=None)
+    for _ in range(2):
+        breaker.record_failure()
+        assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.is_open()
+    assert not breaker.allow()
+    assert 0 < breaker.retry_in() <= 60
+
+
+def test_breaker_half_open_allows_single_probe():
+    breaker = CircuitBreaker("h", failure_threshold=1, reset_timeout=60, state_path=None)
+    breaker.record_failure()
+    expire(breaker)
+    assert breaker.allow() == PROBE
+    assert not breaker.allow()  # probe masih berjalan
+    breaker.record_success()
+    assert breaker.allow() is True and breaker.allow() is True
+
+
+def test_breaker_failed_probe_reopens():
+    breaker = CircuitBreaker("h", failure_threshold=5, reset_timeout=60, state_path=None)
+    for _ in range(5):
+        breaker.record_failure()
+    expire(breaker)
+    assert breaker.allow() == PROBE
+    breaker.record_failure(probe=True)
+    assert breaker.is_open()
+    assert not breaker.allow()
+
+
+def test_breaker_non_probe_failure_counts_toward_threshold():
+    breaker = CircuitBreaker("h", failure_threshold=3, reset_timeout=60, state_path=None)
+    for _ in range(3):
+        breaker.record_failure()
+    expire(breaker)
+    assert breaker.allow() == PROBE
+    # Request lama yang gagal saat half-open tidak dianggap probe gagal
+    breaker.record_failure()
+    assert not breaker.is_open()
+    assert not breaker.allow()  # probe masih berjalan
+
+
+def test_breaker_released_probe_allows_next_probe():
+    breaker = CircuitBreaker("h", failure_threshold=1, reset_timeout=60, state_path=None)
+    breaker.record_failure()
+    expire(breaker)
+    assert breaker.allow() == PROBE
+    breaker.release_probe()
+    assert breaker.allow() == PROBE
+
+
+def test_breaker_state_persists_between_runs():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "circuit_state.json"
+        breaker = CircuitBreaker("h", failure_threshold=1, reset_timeout=60, state_path=path)
+        breaker.record_failure()
+        assert CircuitBreaker("h", state_path=path).is_open()
+        assert not CircuitBreaker("lain", state_path=path).is_open()
+        breaker.record_success()
+        assert not CircuitBreaker("h", state_path=path).is_open()
+
+
+# ----- retry_call -----
+def test_retry_call_retries_then_succeeds():
+    use_breaker("retry.test", failure_threshold=5)
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise HttpError(503)
+        return "ok"
+
+    assert retry_call(flaky, host="retry.test", policy=FAST) == "ok"
+    assert len(calls) == 3
+
+
+def test_retry_call_does_not_retry_client_error():
+    use_breaker("client.test")
+    calls = []
+
+    def missing():
+        calls.append(1)
+        raise HttpError(404)
+
+    try:
+        retry_call(missing, host="client.test", policy=FAST)
+    except HttpError as e:
+        assert e.status_code == 404
+    else:
+        raise AssertionError("404 harus di-raise")
+    assert len(calls) == 1
+
+
+def test_retry_call_raises_circuit_open():
+    breaker = use_breaker("down.test", failure_threshold=2, reset_timeout=60)
+
+    def down():
+        raise HttpError(503)
+
+    try:
+        retry_call(down, host="down.test", policy=FAST)
+    except HttpError:
+        pass
+    assert breaker.is_open()
+    try:
+        retry_call(lambda: "ok", host="down.test", policy=FAST)
+    except CircuitOpenError as e:
+        assert e.host == "down.test"
+    else:
+        raise AssertionError("circuit terbuka harus menolak request")
+
+
+def test_retry_call_uses_given_bucket_instead_of_host_bucket():
+    # Download IDX memakai budget sendiri, tidak mengambil token page dari bucket host
+    use_breaker("budget.test")
+    retry_helper.configure_host("budget.test", rate=1000, capacity=5)
+    use_breaker("budget.test")
+    host_bucket = retry_helper.get_bucket("budget.test")
+    own_bucket = retry_helper.TokenBucket(1000, capacity=5)
+    retry_call(lambda: "ok", host="budget.test", policy=FAST, bucket=own_bucket)
+    assert host_bucket._tokens == 5
+    assert own_bucket._tokens < 5
+
+
+def test_normal_call_does_not_release_probe():
+    # Regresi: finally di retry_call dulu selalu release_probe(), jadi request biasa yang
+    # selesai saat half-open membuka jalan untuk probe kedua
+    breaker = use_breaker("inflight.test", failure_threshold=1, reset_timeout=60)
+    started, release = threading.Event(), threading.Event()
+
+    def slow_bad_request():
+        started.set()
+        release.wait(5)
+        raise HttpError(400)
+
+    def run():
+        try:
+            retry_call(slow_bad_request, host="inflight.test", policy=FAST)
+        except HttpError:
+            pass
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    assert started.wait(5)
+    breaker.record_failure()
+    expire(breaker)
+    assert breaker.allow() == PROBE
+    release.set()
+    thread.join()
+    assert not breaker.allow(), "probe kedua lolos saat probe pertama masih berjalan"
+    breaker.release_probe()
+
+
+def test_non_retryable_probe_does_not_wedge_breaker():
+    # Regresi: probe half-open yang gagal dengan error non-retryable dulu membuat
+    # _half_open tetap True sehingga allow() selalu False selamanya
+    breaker = use_breaker("probe.test", failure_threshold=1, reset_timeout=60)
+    breaker.record_failure()
+    expire(breaker)
+
+    def bad_request():
+        raise HttpError(400)
+
+    try:
+        retry_call(bad_request, host="probe.test", policy=FAST)
+    except HttpError:
+        pass
+    assert breaker.allow() == PROBE, "breaker terkunci setelah probe non-retryable"
+    breaker.release_probe()
+    assert retry_call(lambda: "ok", host="probe.test", policy=FAST) == "ok"
+    assert not breaker.is_open() and breaker.allow()
+
+
+if __name__ == "__main__":
+    tests = [(name, fn) for name, fn in sorted(globals().items()) if name.startswith("test_") and callable(fn)]
+    for name, fn in tests:
+        fn()
+        print(f"✔ {name}")
+    print(f"✔ {len(tests)} test lulus")
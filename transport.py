@@ -0,0 +1,311 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+
+# Transport untuk request JSON ke IDX. Urutan dari yang paling murah:
+#   requests      -> session biasa dengan header browser
+#   cloudscraper  -> bisa menyelesaikan challenge JS Cloudflare sederhana
+#   playwright    -> fetch() dari dalam Chromium (paling mahal, paling tahan blokir)
+# AdaptiveTransport mulai dari transport yang terakhir berhasil dan naik ke transport
+# berikutnya hanya jika Cloudflare membalas 403 / halaman challenge.
+
+# IDX_BASE_URL bisa diarahkan ke server pengganti lokal (replay.py serve) untuk benchmark
+IDX_BASE = os.environ.get("IDX_BASE_URL", "https://www.idx.co.id").rstrip("/")
+DEFAULT_STATE_PATH = Path(os.environ.get("TRANSPORT_STATE_PATH", Path(__file__).parent / "transport_state.json"))
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/120.0.0.0 Safari/537.36"
+)
+CHALLENGE_MARKERS = ("Just a moment", "cf-chl", "challenge-platform", "Attention Required", "cf_chl_opt")
+# Batas tunggu homepage IDX selesai (challenge Cloudflare) sebelum fetch pertama
+HOMEPAGE_SETTLE_MS = 10000
+
+
+class TransportBlocked(Exception):
+    """Request diblokir Cloudflare (403 atau halaman challenge)"""
+    retryable = True
+
+
+def is_blocked(status_code, content_type, text):
+    if status_code == 403:
+        return True
+    if "html" in (content_type or "").lower() or status_code == 503:
+        head = (text or "")[:5000]
+        return any(marker in head for marker in CHALLENGE_MARKERS)
+    return False
+
+
+def parse_json_response(name, status_code, content_type, text, retry_after=None):
+    """Validasi balasan: raise TransportBlocked jika diblokir, HTTPError jika status error"""
+    if is_blocked(status_code, content_type, text):
+        raise TransportBlocked(f"{name}: diblokir Cloudflare (status {status_code})")
+    if status_code >= 400:
+        error = requests.exceptions.HTTPError(f"{name}: HTTP {status_code}")
+        # Dibaca retry_helper untuk menentukan retry / Retry-After
+        error.status_code = status_code
+        error.retry_after = retry_after
+        raise error
+    try:
+        return json.loads(text)
+    except ValueError:
+        # Balasan bukan JSON (biasanya halaman HTML dari proxy / challenge)
+        raise TransportBlocked(f"{name}: balasan bukan JSON (status {status_code})")
+
+
+class RequestsTransport:
+    name = "requests"
+
+    def __init__(self):
+        self.session = requests.Session()
+        self.session.headers.update({
+            "User-Agent": USER_AGENT,
+            "Accept": "application/json, text/plain, */*",
+            "Referer": IDX_BASE + "/",
+        })
+
+    def get_json(self, url, params=None, timeout=15):
+        resp = self.session.get(url, params=params, timeout=timeout)
+        data = parse_json_response(self.name, resp.status_code, resp.headers.get("Content-Type"), resp.text,
+                                   resp.headers.get("Retry-After"))
+        return data, resp.status_code
+
+    def close(self):
+        self.session.close()
+
+
+class CloudscraperTransport(RequestsTransport):
+    name = "cloudscraper"
+
+    def __init__(self, session=None):
+        if session is None:
+            import cloudscraper
+            session = cloudscraper.create_scraper()
+        self.session = session
+
+
+class PlaywrightTransport:
+    """
+    fetch() dari dalam Chromium. Playwright sync API hanya boleh dipakai dari thread
+    yang membuatnya, jadi semua panggilan dijalankan lewat satu thread khusus.
+    """
+    name = "playwright"
+
+    def __init__(self, headless=True):
+        self.headless = headless
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="playwright")
+        self._pw = None
+        self._browser = None
+        self._page = None
+
+    def _ensure_page(self):
+        if self._page is not None:
+            return self._page
+        from playwright.sync_api import sync_playwright
+
+        self._pw = sync_playwright().start()
+        self._browser = self._pw.chromium.launch(headless=self.headless, channel="chromium")
+        context = self._browser.new_context(
+            locale="id-ID",
+            timezone_id="Asia/Jakarta",
+            user_agent=USER_AGENT,
+        )
+        self._page = context.new_page()
+        # WAJIB buka homepage dulu (Cloudflare). Tunggu sampai jaringan tenang
+        # (challenge selesai) alih-alih sleep tetap 5 detik.
+        self._page.goto(IDX_BASE, wait_until="domcontentloaded")
+        try:
+            self._page.wait_for_load_state("networkidle", timeout=HOMEPAGE_SETTLE_MS)
+        except Exception:
+            pass
+        return self._page
+
+    def _fetch(self, url, params, timeout):
+        try:
+            page = self._ensure_page()
+            result = self._evaluate(page, url, params, timeout)
+        except Exception as e:
+            # Samakan dengan transport lain: error jaringan/browser dianggap RequestException
+            raise requests.exceptions.ConnectionError(f"{self.name}: {e}") from e
+        data = parse_json_response(self.name, result["status"], result["contentType"], result["text"],
+                                   result.get("retryAfter"))
+        return data, result["status"]
+
+    def _evaluate(self, page, url, params, timeout):
+        return page.evaluate(
+            """([url, params, timeoutMs]) => {
+                const query = new URLSearchParams(params).toString();
+                const controller = new AbortController();
+                setTimeout(() => controller.abort(), timeoutMs);
+                return fetch(url + "?" + query, { credentials: 'include', signal: controller.signal })
+                    .then(async r => ({
+                        status: r.status,
+                        contentType: r.headers.get('content-type') || '',
+                        retryAfter: r.headers.get('retry-after'),
+                        text: await r.text()
+                    }));
+            }""",
+            [url, {k: str(v) for k, v in (params or {}).items()}, int(timeout * 1000)]
+        )
+
+    def get_json(self, url, params=None, timeout=15):
+        return self._executor.submit(self._fetch, url, params, timeout).result()
+
+    def _fetch_batch(self, url, params_list, timeout):
+        try:
+            page = self._ensure_page()
+            # Semua page di-fetch paralel (Promise.all) dalam satu round trip evaluate
+            results = page.evaluate(
+                """([url, paramsList, timeoutMs]) => Promise.all(paramsList.map(params => {
+                    const query = new URLSearchParams(params).toString();
+                    const controller = new AbortController();
+                    setTimeout(() => controller.abort(), timeoutMs);
+                    return fetch(url + "?" + query, { credentials: 'include', signal: controller.signal })
+                        .then(async r => ({
+                            status: r.status,
+                            contentType: r.headers.get('content-type') || '',
+                            retryAfter: r.headers.get('retry-after'),
+                            text: await r.text()
+                        }))
+                        .catch(e => ({ error: String(e) }));
+                }))""",
+                [url, [{k: str(v) for k, v in (params or {}).items()} for params in params_list], int(timeout * 1000)]
+            )
+        except Exception as e:
+            raise requests.exceptions.ConnectionError(f"{self.name}: {e}") from e
+
+        batch = []
+        for result in results:
+            if "error" in result:
+                batch.append(requests.exceptions.ConnectionError(f"{self.name}: {result['error']}"))
+                continue
+            try:
+                data = parse_json_response(self.name, result["status"], result["contentType"], result["text"],
+                                       result.get("retryAfter"))
+                batch.append((data, result["status"]))
+            except (requests.exceptions.RequestException, TransportBlocked) as e:
+                batch.append(e)
+        return batch
+
+    def get_json_batch(self, url, params_list, timeout=15):
+        """
+        Fetch beberapa page sekaligus. Return list sepanjang params_list berisi
+        (data, status_code) atau exception untuk page yang gagal.
+        """
+        return self._executor.submit(self._fetch_batch, url, params_list, timeout).result()
+
+    def _close(self):
+        if self._browser is not None:
+            self._browser.close()
+        if self._pw is not None:
+            self._pw.stop()
+        self._pw = self._browser = self._page = None
+
+    def close(self):
+        self._executor.submit(self._close).result()
+        self._executor.shutdown(wait=True)
+
+
+TRANSPORT_ORDER = ["requests", "cloudscraper", "playwright"]
+
+
+class AdaptiveTransport:
+    """
+    Pilih transport termurah yang berhasil. Transport yang terakhir berhasil disimpan
+    di state file supaya run berikutnya langsung mulai dari sana. Setelah `state_ttl`
+    detik, run berikutnya mencoba lagi dari transport termurah.
+    """
+
+    def __init__(self, order=None, state_path=DEFAULT_STATE_PATH, state_ttl=6 * 3600, factories=None):
+        self.order = list(order or TRANSPORT_ORDER)
+        self.state_path = Path(state_path) if state_path else None
+        self.state_ttl = state_ttl
+        self.factories = factories or {
+            "requests": RequestsTransport,
+            "cloudscraper": CloudscraperTransport,
+            "playwright": PlaywrightTransport,
+        }
+        self._instances = {}
+        self._lock = threading.Lock()
+        self._index = self._load_start_index()
+
+    @property
+    def current(self):
+        return self.order[self._index]
+
+    @property
+    def supports_batch(self):
+        """True jika transport saat ini bisa fetch banyak page dalam satu panggilan"""
+        return hasattr(self._get(self.current), "get_json_batch")
+
+    def get_json_batch(self, url, params_list, timeout=15):
+        name = self.current
+        transport = self._get(name)
+        if not hasattr(transport, "get_json_batch"):
+            raise NotImplementedError(f"Transport {name} tidak mendukung batch")
+        return transport.get_json_batch(url, params_list, timeout=timeout)
+
+    def reload(self):
+        """Baca ulang transport awal dari state file (dipanggil di awal setiap run)"""
+        with self._lock:
+            self._index = self._load_start_index()
+
+    def _load_start_index(self):
+        if not self.state_path or not self.state_path.exists():
+            return 0
+        try:
+            state = json.loads(self.state_path.read_text())
+            if time.time() - state.get("updated_at", 0) > self.state_ttl:
+                return 0
+            return self.order.index(state["transport"])
+        except (ValueError, KeyError, OSError):
+            return 0
+
+    def _save_state(self, name):
+        if not self.state_path:
+            return
+        try:
+            self.state_path.write_text(json.dumps({"transport": name, "updated_at": time.time()}))
+        except OSError as e:
+            print(f"⚠ Gagal menyimpan state transport: {e}")
+
+    def _get(self, name):
+        with self._lock:
+            if name not in self._instances:
+                self._instances[name] = self.factories[name]()
+            return self._instances[name]
+
+    def get_json(self, url, params=None, timeout=15):
+        index = self._index
+        while True:
+            name = self.order[index]
+            try:
+                result = self._get(name).get_json(url, params=params, timeout=timeout)
+            except TransportBlocked as e:
+                if index + 1 >= len(self.order):
+                    raise
+                print(f"🛡 {e} → eskalasi ke {self.order[index + 1]}")
+                index += 1
+                continue
+
+            with self._lock:
+                changed = index != self._index
+                # Jangan turun ke transport lebih murah di tengah run
+                self._index = max(self._index, index)
+            if changed or not self.state_path or not self.state_path.exists():
+                self._save_state(self.order[self._index])
+            return result
+
+    def close(self):
+        with self._lock:
+            instances, self._instances = self._instances, {}
+        for transport in instances.values():
+            try:
+                transport.close()
+            except Exception as e:
+                print(f"⚠ Gagal menutup transport {transport.name}: {e}")